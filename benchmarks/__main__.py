@@ -0,0 +1,65 @@
+"""
+Runs benchmarks and writes machine-readable results.
+
+    python -m benchmarks --suites decode codec http --output results.json
+"""
+import argparse
+import asyncio
+import json
+import platform
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+import nsfw_detector
+from benchmarks.common import BenchmarkResult
+from benchmarks.suites import SUITES, SuiteOptions, run_suites
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Benchmarks of nsfw_detector with local stand-ins of Redis, gen-api and the model",
+    )
+    parser.add_argument("--suites", nargs="+", choices=sorted(SUITES), default=list(SUITES))
+    parser.add_argument("--iterations", type=int, default=200, help="Operations per benchmark")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent operations in end-to-end suites")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of generated images")
+    parser.add_argument("--output", type=Path, default=None, help="Path of JSON report, stdout if omitted")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> None:
+    args: argparse.Namespace = parse_args(argv)
+    options: SuiteOptions = SuiteOptions(iterations=args.iterations, concurrency=args.concurrency, seed=args.seed)
+    results, skipped = asyncio.run(run_suites(args.suites, options))
+
+    report: dict[str, Any] = {
+        "version": nsfw_detector.__version__,
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "options": {"iterations": args.iterations, "concurrency": args.concurrency, "seed": args.seed},
+        "results": [result.as_dict() for result in results],
+        "skipped": skipped,
+    }
+    dumped: str = json.dumps(report, indent=2)
+
+    if args.output is None:
+        print(dumped)  # noqa: T201
+    else:
+        args.output.write_text(dumped)
+
+    for result in results:
+        print(  # noqa: T201
+            f"{result.suite:>8} {result.name:<28} {result.ops_per_second:>12.1f} ops/s "
+            f"p50 {result.latency_ms['p50']:.3f}ms p99 {result.latency_ms['p99']:.3f}ms",
+            file=sys.stderr,
+        )
+    for name, reason in skipped.items():
+        print(f"{name:>8} skipped: {reason}", file=sys.stderr)  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+import statistics
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Awaitable, Callable
+
+
+@dataclass(frozen=True, slots=True)
+class BenchmarkResult:
+    suite: str
+    name: str
+    iterations: int
+    total_seconds: float
+    ops_per_second: float
+    latency_ms: dict[str, float]
+    params: dict[str, Any] = field(default_factory=dict)
+
+    def as_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+def summarize(
+        suite: str,
+        name: str,
+        latencies: list[float],
+        total_seconds: float,
+        operations: int | None = None,
+        params: dict[str, Any] | None = None,
+) -> BenchmarkResult:
+    """Builds result from latencies of single operations in seconds"""
+    ordered: list[float] = sorted(latencies)
+    operations = operations if operations is not None else len(latencies)
+
+    def percentile(share: float) -> float:
+        return ordered[min(len(ordered) - 1, int(share * len(ordered)))] * 1000
+
+    return BenchmarkResult(
+        suite=suite,
+        name=name,
+        iterations=len(latencies),
+        total_seconds=total_seconds,
+        ops_per_second=operations / total_seconds if total_seconds else 0.0,
+        latency_ms={
+            "mean": statistics.fmean(ordered) * 1000,
+            "p50": percentile(0.50),
+            "p90": percentile(0.90),
+            "p99": percentile(0.99),
+            "max": ordered[-1] * 1000,
+        },
+        params=params or {},
+    )
+
+
+def measure(
+        suite: str,
+        name: str,
+        operation: Callable[[], Any],
+        iterations: int,
+        warmup: int = 3,
+        params: dict[str, Any] | None = None,
+) -> BenchmarkResult:
+    for _ in range(warmup):
+        operation()
+
+    latencies: list[float] = []
+    started_at: float = time.perf_counter()
+
+    for _ in range(iterations):
+        operation_started_at: float = time.perf_counter()
+        operation()
+        latencies.append(time.perf_counter() - operation_started_at)
+
+    return summarize(suite, name, latencies, time.perf_counter() - started_at, params=params)
+
+
+async def measure_async(
+        suite: str,
+        name: str,
+        operation: Callable[[], Awaitable[Any]],
+        iterations: int,
+        concurrency: int = 1,
+        warmup: int = 3,
+        params: dict[str, Any] | None = None,
+) -> BenchmarkResult:
+    """Runs ``iterations`` operations, at most ``concurrency`` of them at the same time"""
+    import asyncio
+
+    for _ in range(warmup):
+        await operation()
+
+    latencies: list[float] = []
+    remaining: list[int] = [iterations]
+
+    async def worker() -> None:
+        while remaining[0] > 0:
+            remaining[0] -= 1
+            operation_started_at: float = time.perf_counter()
+            await operation()
+            latencies.append(time.perf_counter() - operation_started_at)
+
+    started_at: float = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+    return summarize(
+        suite,
+        name,
+        latencies,
+        time.perf_counter() - started_at,
+        params={"concurrency": concurrency, **(params or {})},
+    )
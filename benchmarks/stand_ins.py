@@ -0,0 +1,201 @@
+"""Local stand-ins for external services, so benchmarks measure the service itself"""
+import asyncio
+import fnmatch
+import json
+import time
+import uuid
+from typing import Any, AsyncIterator, Sequence
+
+from aiohttp import web
+
+from nsfw_detector.infrastructure.inference.base import ScoreVector
+from nsfw_detector.infrastructure.inference.decoding import DecodeStatsSnapshot
+
+
+class InMemoryRedis:
+    """
+    Subset of ``redis.asyncio.Redis`` used by the service, kept in memory of the process.
+    Every command, or a whole pipeline, costs one simulated network round trip.
+    """
+
+    def __init__(self, round_trip_seconds: float = 0.0) -> None:
+        self._round_trip_seconds: float = round_trip_seconds
+        self._values: dict[str, tuple[float | None, Any]] = {}
+
+    async def round_trip(self) -> None:
+        if self._round_trip_seconds:
+            await asyncio.sleep(self._round_trip_seconds)
+
+    def execute_command_now(self, command: str, *args: Any, **kwargs: Any) -> Any:
+        return getattr(self, f"_{command}")(*args, **kwargs)
+
+    def __getattr__(self, command: str) -> Any:
+        if not hasattr(type(self), f"_{command}"):
+            raise AttributeError(command)
+
+        async def execute(*args: Any, **kwargs: Any) -> Any:
+            await self.round_trip()
+            return self.execute_command_now(command, *args, **kwargs)
+
+        return execute
+
+    def _alive(self, name: str) -> Any:
+        entry: tuple[float | None, Any] | None = self._values.get(name)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._values[name]
+            return None
+        return value
+
+    def _get(self, name: str) -> Any:
+        return self._alive(name)
+
+    def _mget(self, keys: Sequence[str], *args: str) -> list[Any]:
+        return [self._alive(name) for name in [*keys, *args]]
+
+    def _pttl(self, name: str) -> int:
+        if self._alive(name) is None:
+            return -2
+        expires_at: float | None = self._values[name][0]
+        return -1 if expires_at is None else int((expires_at - time.monotonic()) * 1000)
+
+    def _set(self, name: str, value: Any, ex: int | None = None, nx: bool = False) -> bool | None:
+        if nx and self._alive(name) is not None:
+            return None
+        self._values[name] = (time.monotonic() + ex if ex else None, value)
+        return True
+
+    def _exists(self, *names: str) -> int:
+        return sum(self._alive(name) is not None for name in names)
+
+    def _delete(self, *names: str) -> int:
+        return sum(self._values.pop(name, None) is not None for name in names)
+
+    def _unlink(self, *names: str) -> int:
+        return self._delete(*names)
+
+    def _incr(self, name: str, amount: int = 1) -> int:
+        value: int = int(self._alive(name) or 0) + amount
+        self._values[name] = (None, str(value).encode())
+        return value
+
+    def _hset(self, name: str, key: str, value: Any) -> int:
+        mapping: dict[str, Any] = self._alive(name) or {}
+        mapping[key] = value
+        self._values[name] = (None, mapping)
+        return 1
+
+    async def scan_iter(self, match: str | None = None, count: int | None = None) -> AsyncIterator[str]:
+        for name in list(self._values):
+            if match is None or fnmatch.fnmatchcase(name, match):
+                yield name
+
+    async def hscan_iter(self, name: str) -> AsyncIterator[tuple[str, Any]]:
+        for item in dict(self._alive(name) or {}).items():
+            yield item
+
+    def pipeline(self, transaction: bool = True) -> "InMemoryPipeline":
+        return InMemoryPipeline(self)
+
+    async def aclose(self) -> None:
+        ...
+
+
+class InMemoryPipeline:
+    """Buffers commands and executes them in one round trip"""
+
+    def __init__(self, redis: InMemoryRedis) -> None:
+        self._redis: InMemoryRedis = redis
+        self._commands: list[tuple[str, tuple[Any, ...], dict[str, Any]]] = []
+
+    async def __aenter__(self) -> "InMemoryPipeline":
+        return self
+
+    async def __aexit__(self, *args: object) -> None:
+        self._commands.clear()
+
+    def __getattr__(self, command: str) -> Any:
+        def buffer(*args: Any, **kwargs: Any) -> "InMemoryPipeline":
+            self._commands.append((command, args, kwargs))
+            return self
+        return buffer
+
+    async def execute(self) -> list[Any]:
+        await self._redis.round_trip()
+        results: list[Any] = [
+            self._redis.execute_command_now(command, *args, **kwargs)
+            for command, args, kwargs in self._commands
+        ]
+        self._commands.clear()
+        return results
+
+
+class StubInferenceBackend:
+    """Inference backend with fixed latency per batch, for benchmarks without the model"""
+
+    def __init__(self, batch_latency_seconds: float = 0.005) -> None:
+        self._batch_latency_seconds: float = batch_latency_seconds
+
+    @property
+    def decode_stats(self) -> DecodeStatsSnapshot:
+        return DecodeStatsSnapshot()
+
+    async def start(self) -> None:
+        ...
+
+    async def close(self) -> None:
+        ...
+
+    async def predict_batch(self, batch: Sequence[bytes]) -> list[ScoreVector | Exception]:
+        await asyncio.sleep(self._batch_latency_seconds)
+        return [ScoreVector(neutral=0.9, low=0.1, medium=0.05, high=0.01) for _ in batch]
+
+
+def create_mock_gen_api(latency_seconds: float = 0.0) -> web.Application:
+    """
+    Mock of api.gen-api.ru with the same shape of responses.
+    Synchronous requests answer after the latency, asynchronous ones are polled until it passes.
+    """
+    ready_at: dict[str, float] = {}
+
+    async def check_image(request: web.Request) -> web.Response:
+        form = await request.post()
+        request_id: str = str(uuid.uuid4())
+        # Field with content type is parsed as a file
+        field: Any = form.get("input")
+        parameters: dict[str, Any] = json.loads(field.file.read() if hasattr(field, "file") else field or "{}")
+
+        if parameters.get("is_sync", 1):
+            if latency_seconds:
+                await asyncio.sleep(latency_seconds)
+            return web.json_response({"request_id": request_id, "status": "success", "output": "0.91"})
+
+        ready_at[request_id] = time.monotonic() + latency_seconds
+        return web.json_response({"request_id": request_id, "status": "starting"})
+
+    async def get_result(request: web.Request) -> web.Response:
+        request_id: str = request.match_info["request_id"]
+        if request_id not in ready_at:
+            return web.json_response({"status": "error", "message": "unknown request"}, status=404)
+        if time.monotonic() < ready_at[request_id]:
+            return web.json_response({"request_id": request_id, "status": "processing"})
+        del ready_at[request_id]
+        return web.json_response({"request_id": request_id, "status": "success", "result": ["0.91"]})
+
+    app: web.Application = web.Application()
+    app.router.add_post("/api/v1/networks/image-nsfw-checker", check_image)
+    app.router.add_get("/api/v1/request/get/{request_id}", get_result)
+    return app
+
+
+async def start_mock_gen_api(latency_seconds: float = 0.0) -> tuple[web.AppRunner, str]:
+    """Starts mock server on a free local port, returns its runner and base URL"""
+    runner: web.AppRunner = web.AppRunner(create_mock_gen_api(latency_seconds))
+    await runner.setup()
+    site: web.TCPSite = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    host, port = runner.addresses[0][:2]
+    return runner, f"http://{host}:{port}"
+
@@ -0,0 +1,450 @@
+"""
+Benchmark suites. Each suite measures one layer of the service, external services are
+replaced with local stand-ins, so results depend only on the code of the service.
+"""
+import asyncio
+import io
+import os
+import random
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Final
+
+from PIL import Image
+
+from benchmarks.common import BenchmarkResult, measure, measure_async
+from benchmarks.stand_ins import InMemoryRedis, StubInferenceBackend, start_mock_gen_api
+
+
+class SuiteSkipped(Exception):  # noqa: N818
+    """Suite can't run in the current environment, e.g. optional dependency is not installed"""
+
+
+@dataclass(frozen=True, slots=True)
+class SuiteOptions:
+    iterations: int
+    concurrency: int
+    seed: int = 0
+
+
+def make_photo(width: int, height: int, image_format: str, seed: int = 0) -> bytes:
+    """Builds photo-like image: smooth gradient with noise, so codecs don't compress it unrealistically well"""
+    generator: random.Random = random.Random(seed)  # noqa: S311
+    small: Image.Image = Image.frombytes("RGB", (64, 48), generator.randbytes(64 * 48 * 3))
+    image: Image.Image = small.resize((width, height), Image.Resampling.BICUBIC)
+    buffer: io.BytesIO = io.BytesIO()
+    image.save(buffer, image_format, **({"quality": 90} if image_format == "JPEG" else {}))
+    return buffer.getvalue()
+
+
+def make_distinct_images(amount: int, seed: int = 0, size: int = 96) -> list[bytes]:
+    """Builds small images with different exact and perceptual hashes"""
+    return [make_photo(size, size, "PNG", seed=seed + index) for index in range(amount)]
+
+
+async def run_decode(options: SuiteOptions) -> list[BenchmarkResult]:
+    from nsfw_detector.infrastructure.inference.decoding import DecodeStats, ImageDecoder
+
+    decoder: ImageDecoder = ImageDecoder(target_size=448, sample_rate=0.0, stats=DecodeStats())
+    iterations: int = max(1, options.iterations // 10)
+    results: list[BenchmarkResult] = []
+
+    for image_format in ("JPEG", "PNG"):
+        data: bytes = make_photo(4000, 3000, image_format, seed=options.seed)
+        params: dict[str, Any] = {"format": image_format, "resolution": "4000x3000", "bytes": len(data)}
+
+        results.append(measure(
+            "decode",
+            f"full_{image_format.lower()}",
+            lambda data=data: Image.open(io.BytesIO(data)).convert("RGB"),
+            iterations=iterations,
+            warmup=1,
+            params=params,
+        ))
+        results.append(measure(
+            "decode",
+            f"reduced_{image_format.lower()}",
+            lambda data=data: decoder.decode(data),
+            iterations=iterations,
+            warmup=1,
+            params={**params, "target_size": 448},
+        ))
+
+    return results
+
+
+async def run_predict(options: SuiteOptions) -> list[BenchmarkResult]:
+    """Measures PyTorch model and exported ONNX model, whichever of them is available"""
+    from nsfw_detector.setup.configs import InferenceConfig
+
+    image: bytes = make_photo(1024, 768, "JPEG", seed=options.seed)
+    iterations: int = max(1, options.iterations // 10)
+    results: list[BenchmarkResult] = []
+    reasons: list[str] = []
+
+    try:
+        from nsfw_image_detector import NSFWDetector
+    except ImportError as error:
+        reasons.append(f"nsfw_image_detector is not installed: {error}")
+    else:
+        from nsfw_detector.infrastructure.inference.decoding import DecodeStats, ImageDecoder
+        from nsfw_detector.infrastructure.inference.detector import predict_with_detector
+
+        detector: NSFWDetector = NSFWDetector()
+        decoder: ImageDecoder = ImageDecoder(target_size=448, sample_rate=0.0, stats=DecodeStats())
+
+        for batch_size in (1, 8):
+            batch: list[bytes] = [image] * batch_size
+            results.append(measure(
+                "predict",
+                f"torch_batch_{batch_size}",
+                lambda batch=batch: predict_with_detector(detector, decoder, batch),
+                iterations=iterations,
+                warmup=1,
+                params={"batch_size": batch_size},
+            ))
+
+    config: InferenceConfig = InferenceConfig(**os.environ)
+    try:
+        from nsfw_detector.infrastructure.inference.onnx_backend import OnnxInferenceBackend
+    except ImportError as error:
+        reasons.append(f"onnx extra is not installed: {error}")
+    else:
+        if not os.path.exists(config.onnx_model_path):
+            reasons.append(f"no ONNX model at {config.onnx_model_path}, run python -m nsfw_detector export-onnx")
+        else:
+            backend: OnnxInferenceBackend = OnnxInferenceBackend(config.model_copy(update={"workers": 1}))
+            await backend.start()
+            try:
+                for batch_size in (1, 8):
+                    results.append(await measure_async(
+                        "predict",
+                        f"onnx_batch_{batch_size}",
+                        lambda batch_size=batch_size: backend.predict_batch([image] * batch_size),
+                        iterations=iterations,
+                        warmup=1,
+                        params={"batch_size": batch_size, "model": config.onnx_model_path},
+                    ))
+            finally:
+                await backend.close()
+
+    if not results:
+        raise SuiteSkipped("; ".join(reasons))
+
+    return results
+
+
+async def run_codec(options: SuiteOptions) -> list[BenchmarkResult]:
+    from nsfw_detector.infrastructure.cache.codecs import CacheCodec, CompactCodec, PickleZlibCodec
+
+    codecs: dict[str, CacheCodec] = {"compact": CompactCodec(), "pickle": PickleZlibCodec()}
+    values: dict[str, Any] = {"verdict": "0.912345", "scores": (0.91, 0.09, 0.03, 0.01)}
+    iterations: int = options.iterations * 100
+    results: list[BenchmarkResult] = []
+
+    for codec_name, codec in codecs.items():
+        for value_name, value in values.items():
+            encoded: bytes = codec.encode(value)
+            params: dict[str, Any] = {"codec": codec_name, "value": value_name, "encoded_bytes": len(encoded)}
+            results.append(measure(
+                "codec",
+                f"{codec_name}_encode_{value_name}",
+                lambda codec=codec, value=value: codec.encode(value),
+                iterations=iterations,
+                params=params,
+            ))
+            results.append(measure(
+                "codec",
+                f"{codec_name}_decode_{value_name}",
+                lambda codec=codec, encoded=encoded: codec.decode(encoded),
+                iterations=iterations,
+                params=params,
+            ))
+
+    return results
+
+
+async def run_gateway(options: SuiteOptions) -> list[BenchmarkResult]:
+    from nsfw_detector.application.common.ports.images.query_gateway import ImageQueryGateway
+    from nsfw_detector.application.queries.images.view_models import NSFWImageInformation
+    from nsfw_detector.infrastructure.adapters.images.cached_query_gateway import ImageCachedQueryGateway
+    from nsfw_detector.infrastructure.cache.base import CacheEntry, CacheStore, Key, KeyWithPrefix, Prefix
+    from nsfw_detector.infrastructure.cache.codecs import CompactCodec
+    from nsfw_detector.infrastructure.cache.impl import RedisCacheStore
+    from nsfw_detector.infrastructure.cache.memory import InMemoryCacheStore
+    from nsfw_detector.infrastructure.cache.namespaces import CacheNamespace
+    from nsfw_detector.infrastructure.cache.tiered import TieredCacheStore
+    from nsfw_detector.infrastructure.concurrency.single_flight import SingleFlight
+    from nsfw_detector.setup.configs import CacheConfig
+
+    class StubImageQueryGateway(ImageQueryGateway):
+        async def check_image_is_nsfw_by_file(
+                self,
+                data: bytes,
+                content_hash: str | None = None,
+        ) -> NSFWImageInformation:
+            await asyncio.sleep(0)
+            return NSFWImageInformation(request_id="benchmark", status="success", output="0.91")
+
+    round_trip_seconds: float = 0.0002
+    images: list[bytes] = make_distinct_images(options.iterations + 3, seed=options.seed)
+
+    def build(tiered: bool) -> ImageCachedQueryGateway:
+        redis: InMemoryRedis = InMemoryRedis(round_trip_seconds=round_trip_seconds)
+        redis_store: RedisCacheStore = RedisCacheStore(
+            redis=redis,  # type: ignore[arg-type]
+            codec=CompactCodec(),
+            cache_config=CacheConfig(),
+        )
+        cache_store: CacheStore = (
+            TieredCacheStore(l1=InMemoryCacheStore(max_entries=10_000), l2=redis_store, l1_max_ttl=30)
+            if tiered else redis_store
+        )
+        return ImageCachedQueryGateway(
+            gateway=StubImageQueryGateway(),
+            cache_store=cache_store,
+            cache_config=CacheConfig(),
+            cache_namespace=CacheNamespace(
+                redis=redis,  # type: ignore[arg-type]
+                name="nsfw_image",
+                model_version="benchmark",
+                refresh_seconds=5.0,
+            ),
+            single_flight=SingleFlight(),
+        )
+
+    results: list[BenchmarkResult] = []
+    params: dict[str, Any] = {"redis_round_trip_ms": round_trip_seconds * 1000}
+
+    for tiered in (True, False):
+        gateway: ImageCachedQueryGateway = build(tiered)
+        layer: str = "l1" if tiered else "redis"
+        await gateway.check_image_is_nsfw_by_file(images[0])
+
+        results.append(await measure_async(
+            "gateway",
+            f"hit_{layer}",
+            lambda gateway=gateway: gateway.check_image_is_nsfw_by_file(images[0]),
+            iterations=options.iterations,
+            params=params,
+        ))
+
+    miss_gateway: ImageCachedQueryGateway = build(tiered=True)
+    misses: list[bytes] = list(images)
+    results.append(await measure_async(
+        "gateway",
+        "miss",
+        lambda: miss_gateway.check_image_is_nsfw_by_file(misses.pop()),
+        iterations=options.iterations,
+        params=params,
+    ))
+
+    # Bulk operations cost one round trip for all keys, single ones cost a round trip per key
+    bulk_store: RedisCacheStore = RedisCacheStore(
+        redis=InMemoryRedis(round_trip_seconds=round_trip_seconds),  # type: ignore[arg-type]
+        codec=CompactCodec(),
+        cache_config=CacheConfig(),
+    )
+    keys: list[KeyWithPrefix] = [
+        KeyWithPrefix(key=Key(f"benchmark-{index}"), prefix=Prefix("benchmark"))
+        for index in range(16)
+    ]
+    entries: list[CacheEntry] = [CacheEntry(key=key, value=(0.91, 0.05, 0.03, 0.01)) for key in keys]
+    bulk_params: dict[str, Any] = {**params, "keys": len(keys)}
+
+    async def get_each() -> None:
+        for key in keys:
+            await bulk_store.get(key)
+
+    async def set_each() -> None:
+        for entry in entries:
+            await bulk_store.set(key=entry.key, value=entry.value, ttl=entry.ttl)
+
+    for name, operation in (
+            ("set_each", set_each),
+            ("set_many", lambda: bulk_store.set_many(entries)),
+            ("get_each", get_each),
+            ("get_many", lambda: bulk_store.get_many(keys)),
+    ):
+        results.append(await measure_async(
+            "gateway",
+            name,
+            operation,
+            iterations=options.iterations,
+            params=bulk_params,
+        ))
+
+    return results
+
+
+async def run_genai(options: SuiteOptions) -> list[BenchmarkResult]:
+    from contextlib import aclosing
+
+    from aiohttp import ClientSession
+
+    from nsfw_detector.infrastructure.adapters.images.gen_ai_query_gateway import GenAIImageQueryGateway
+    from nsfw_detector.infrastructure.clients.http.impl import AioHTTPClient
+    from nsfw_detector.infrastructure.clients.http.providers import get_client
+    from nsfw_detector.setup.configs import GenAPIConfig, HttpClientConfig
+
+    latency_seconds: float = 0.005
+    runner, base_url = await start_mock_gen_api(latency_seconds=latency_seconds)
+    image: bytes = make_photo(640, 480, "JPEG", seed=options.seed)
+    api_config: GenAPIConfig = GenAPIConfig(API_KEY_FOR_NSFW_CONTENT="benchmark", GEN_API_BASE_URL=base_url)
+    params: dict[str, Any] = {"mock_latency_ms": latency_seconds * 1000, "image_bytes": len(image)}
+
+    async def check_with_new_session() -> None:
+        # How the gateway worked before the session became app scoped: new connection for every request
+        async with ClientSession() as session:
+            await GenAIImageQueryGateway(
+                http_client=AioHTTPClient(session),
+                api_config=api_config,
+            ).check_image_is_nsfw_by_file(image)
+
+    try:
+        async with aclosing(get_client(HttpClientConfig())) as sessions:
+            http_client: AioHTTPClient = AioHTTPClient(await anext(sessions))
+            gateway: GenAIImageQueryGateway = GenAIImageQueryGateway(http_client=http_client, api_config=api_config)
+            polling_gateway: GenAIImageQueryGateway = GenAIImageQueryGateway(
+                http_client=http_client,
+                api_config=api_config.model_copy(update={"mode": "async", "poll_interval": latency_seconds / 4}),
+            )
+            pooled: BenchmarkResult = await measure_async(
+                "genai",
+                "check_image_pooled_session",
+                lambda: gateway.check_image_is_nsfw_by_file(image),
+                iterations=options.iterations,
+                concurrency=options.concurrency,
+                params=params,
+            )
+            polled: BenchmarkResult = await measure_async(
+                "genai",
+                "check_image_submit_and_poll",
+                lambda: polling_gateway.check_image_is_nsfw_by_file(image),
+                iterations=options.iterations,
+                concurrency=options.concurrency,
+                params={**params, "poll_interval_ms": latency_seconds / 4 * 1000},
+            )
+
+        return [
+            pooled,
+            polled,
+            await measure_async(
+                "genai",
+                "check_image_session_per_request",
+                check_with_new_session,
+                iterations=options.iterations,
+                concurrency=options.concurrency,
+                params=params,
+            ),
+        ]
+    finally:
+        await runner.cleanup()
+
+
+async def run_http(options: SuiteOptions) -> list[BenchmarkResult]:
+    try:
+        import httpx
+        # Providers import the model lazily, so its absence is checked before the container is built
+        import nsfw_image_detector  # noqa: F401
+        from nsfw_detector.setup.ioc import setup_providers
+    except ImportError as error:
+        raise SuiteSkipped(f"httpx or model dependencies are not installed: {error}") from error
+
+    from dishka import AsyncContainer, Provider, Scope, make_async_container
+    from dishka.integrations.fastapi import setup_dishka
+    from fastapi import FastAPI
+    from fastapi.responses import ORJSONResponse
+    from redis.asyncio import Redis
+
+    from nsfw_detector.infrastructure.inference.base import InferenceBackend
+    from nsfw_detector.setup.bootstrap import setup_context, setup_exc_handlers, setup_middlewares, setup_routes
+    from nsfw_detector.setup.configs import Configs
+    from nsfw_detector.web import lifespan
+
+    os.environ.setdefault("API_KEY_FOR_NSFW_CONTENT", "benchmark")
+    configs: Configs = Configs()
+    batch_latency_seconds: float = 0.005
+
+    # Redis and the model are replaced with stand-ins, everything else is the production wiring
+    stand_ins: Provider = Provider(scope=Scope.APP)
+    stand_ins.provide(lambda: InMemoryRedis(round_trip_seconds=0.0002), provides=Redis)
+    stand_ins.provide(lambda: StubInferenceBackend(batch_latency_seconds), provides=InferenceBackend)
+
+    app: FastAPI = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
+    container: AsyncContainer = make_async_container(
+        *setup_providers(configs),
+        stand_ins,
+        context=setup_context(configs),
+    )
+    setup_routes(app)
+    setup_exc_handlers(app)
+    setup_middlewares(app, api_config=configs.asgi, moderation_config=configs.moderation)
+    setup_dishka(container, app)
+    app.state.started_at = time.perf_counter()
+
+    warmup: int = 3
+    images: list[bytes] = make_distinct_images(options.iterations + warmup, seed=options.seed)
+    params: dict[str, Any] = {"stub_batch_latency_ms": batch_latency_seconds * 1000}
+    results: list[BenchmarkResult] = []
+
+    async with lifespan(app), httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app),
+            base_url="http://benchmark",
+    ) as client:
+
+        async def moderate(image: bytes) -> None:
+            response: httpx.Response = await client.post(
+                "/v1/images/moderate",
+                files={"image": ("image.png", image, "image/png")},
+            )
+            response.raise_for_status()
+
+        misses: list[bytes] = list(images)
+        results.append(await measure_async(
+            "http",
+            "moderate_miss",
+            lambda: moderate(misses.pop()),
+            iterations=options.iterations,
+            concurrency=options.concurrency,
+            warmup=warmup,
+            params=params,
+        ))
+        results.append(await measure_async(
+            "http",
+            "moderate_hit",
+            lambda: moderate(images[0]),
+            iterations=options.iterations,
+            concurrency=options.concurrency,
+            warmup=warmup,
+            params=params,
+        ))
+
+    return results
+
+
+SUITES: Final[dict[str, Callable[[SuiteOptions], Awaitable[list[BenchmarkResult]]]]] = {
+    "decode": run_decode,
+    "predict": run_predict,
+    "codec": run_codec,
+    "gateway": run_gateway,
+    "genai": run_genai,
+    "http": run_http,
+}
+
+
+async def run_suites(names: list[str], options: SuiteOptions) -> tuple[list[BenchmarkResult], dict[str, str]]:
+    """Runs suites one by one, so they don't affect each other's timings"""
+    results: list[BenchmarkResult] = []
+    skipped: dict[str, str] = {}
+
+    for name in names:
+        started_at: float = time.perf_counter()
+        try:
+            results.extend(await SUITES[name](options))
+        except SuiteSkipped as reason:
+            skipped[name] = str(reason)
+            continue
+        print(f"Suite {name} finished in {time.perf_counter() - started_at:.2f}s")  # noqa: T201
+
+    return results, skipped
@@ -0,0 +1,4 @@
+#!/bin/sh
+set -e
+
+python -m nsfw_detector worker
\ No newline at end of file
@@ -1,5 +1,8 @@
+import argparse
 import asyncio
 import logging
+import socket
+from pathlib import Path
 from typing import Final
 
 import uvicorn
@@ -12,7 +15,7 @@ from nsfw_detector.web import create_app_production
 logger: Final[logging.Logger] = logging.getLogger(__name__)
 
 
-async def create_uvicorn_server(app: FastAPI) -> None:
+async def create_uvicorn_server(app: FastAPI, sockets: list[socket.socket] | None = None) -> None:
     configs: Configs = setup_configs()
     setup_logging(logger_config=configs.logging)
 
@@ -25,11 +28,155 @@ async def create_uvicorn_server(app: FastAPI) -> None:
 
     server = uvicorn.Server(config)
     logger.info("Running API")
-    await server.serve()
+    await server.serve(sockets=sockets)
+
+
+def serve_api(args: argparse.Namespace) -> None:
+    configs: Configs = setup_configs()
+    workers: int = args.workers or configs.asgi.workers
+
+    if workers == 1:
+        asyncio.run(create_uvicorn_server(create_app_production()))
+        return
+
+    from nsfw_detector.prefork import serve_prefork
+
+    setup_logging(logger_config=configs.logging)
+    # App is created in each worker after fork, so connections and event loops are not shared
+    serve_prefork(
+        configs,
+        workers=workers,
+        serve_worker=lambda sock: asyncio.run(create_uvicorn_server(create_app_production(), sockets=[sock])),
+    )
+
+
+def export_onnx_model(args: argparse.Namespace) -> None:
+    from nsfw_detector.infrastructure.inference.onnx_export import export_onnx
+
+    configs: Configs = setup_configs()
+    setup_logging(logger_config=configs.logging)
+    output_path: Path = export_onnx(
+        output_path=args.output or Path(configs.inference.onnx_model_path),
+        model_name=args.model_name,
+        quantize=args.quantize,
+        opset=args.opset,
+        verify=args.verify,
+    )
+    logger.info("ONNX model is saved to %s", output_path)
+
+
+def run_cache_invalidation(args: argparse.Namespace) -> None:
+    from nsfw_detector.cache_commands import invalidate_cache
+
+    asyncio.run(invalidate_cache(purge=args.purge))
+
+
+def run_cache_warming(args: argparse.Namespace) -> None:
+    from nsfw_detector.cache_commands import warm_cache
+
+    asyncio.run(warm_cache(
+        source=args.source,
+        concurrency=args.concurrency,
+        batch_size=args.batch_size,
+        checkpoint=args.checkpoint,
+        ttl=args.ttl,
+    ))
+
+
+def run_moderation_worker() -> None:
+    from nsfw_detector.worker import run_worker
+
+    asyncio.run(run_worker())
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(prog="python -m nsfw_detector")
+    commands = parser.add_subparsers(dest="command")
+    serve_parser: argparse.ArgumentParser = commands.add_parser("serve", help="Run API (default)")
+    serve_parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Amount of forked server processes sharing the preloaded model, defaults to UVICORN_WORKERS",
+    )
+    commands.add_parser("worker", help="Run worker of asynchronous moderation jobs")
+
+    invalidate_parser: argparse.ArgumentParser = commands.add_parser(
+        "invalidate-cache",
+        help="Invalidate all cached verdicts by switching to the next cache generation",
+    )
+    invalidate_parser.add_argument(
+        "--purge",
+        action="store_true",
+        help="Unlink entries of the previous generation instead of waiting for their TTL",
+    )
+
+    warm_parser: argparse.ArgumentParser = commands.add_parser(
+        "warm-cache",
+        help="Cache verdicts of known images before traffic arrives",
+    )
+    warm_parser.add_argument(
+        "source",
+        type=Path,
+        help="Directory with jpg, png, gif and webp images, or a manifest with one path per line",
+    )
+    warm_parser.add_argument("--concurrency", type=int, default=16, help="Images checked at once")
+    warm_parser.add_argument("--batch-size", type=int, default=256, help="Images looked up in the cache at once")
+    warm_parser.add_argument(
+        "--checkpoint",
+        type=Path,
+        default=None,
+        help="File with progress, an interrupted run is resumed from it",
+    )
+    warm_parser.add_argument(
+        "--ttl",
+        type=int,
+        default=None,
+        help="Lifetime of warmed verdicts in seconds, defaults to CACHE_TTL",
+    )
+
+    export_parser: argparse.ArgumentParser = commands.add_parser(
+        "export-onnx",
+        help="Export the model to ONNX for INFERENCE_BACKEND=onnx",
+    )
+    export_parser.add_argument("--output", type=Path, default=None, help="Defaults to INFERENCE_ONNX_MODEL_PATH")
+    export_parser.add_argument("--model-name", default="Freepik/nsfw_image_detector")
+    export_parser.add_argument("--opset", type=int, default=17)
+    export_parser.add_argument(
+        "--no-quantize",
+        dest="quantize",
+        action="store_false",
+        help="Keep float32 weights instead of dynamic int8 quantization",
+    )
+    export_parser.add_argument(
+        "--no-verify",
+        dest="verify",
+        action="store_false",
+        help="Skip comparison of scores with the PyTorch model",
+    )
+    return parser.parse_args(argv)
 
 
 def main() -> None:
-    asyncio.run(create_uvicorn_server(create_app_production()))
+    args: argparse.Namespace = parse_args()
+
+    if args.command == "export-onnx":
+        export_onnx_model(args)
+        return
+
+    if args.command == "invalidate-cache":
+        run_cache_invalidation(args)
+        return
+
+    if args.command == "warm-cache":
+        run_cache_warming(args)
+        return
+
+    if args.command == "worker":
+        run_moderation_worker()
+        return
+
+    serve_api(args)
 
 
 if __name__ == "__main__":
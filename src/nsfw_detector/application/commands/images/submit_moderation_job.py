@@ -0,0 +1,42 @@
+from dataclasses import dataclass
+from typing import final, Final
+
+from nsfw_detector.application.common.ports.jobs.moderation_job_gateway import ModerationJobGateway
+from nsfw_detector.application.queries.images.check_image_is_nsfw import ensure_allowed_extension
+from nsfw_detector.application.queries.images.policies import ModerationPolicies
+
+
+@dataclass(frozen=True, slots=True)
+class SubmitModerationJobCommand:
+    content_of_image: bytes
+    filename_with_extension: str
+    content_hash: str
+    policy_name: str | None = None
+
+
+@final
+class SubmitModerationJobCommandHandler:
+    def __init__(
+            self,
+            moderation_job_gateway: ModerationJobGateway,
+            policies: ModerationPolicies,
+    ) -> None:
+        """
+        Command for checking image later by workers, instead of during the request
+        :param moderation_job_gateway: gateway of moderation jobs
+        :param policies: known moderation policies
+        """
+        self._moderation_job_gateway: Final[ModerationJobGateway] = moderation_job_gateway
+        self._policies: Final[ModerationPolicies] = policies
+
+    async def __call__(self, data: SubmitModerationJobCommand) -> str:
+        # Invalid images are rejected at once, workers only get images they can check
+        ensure_allowed_extension(data.filename_with_extension)
+        self._policies.get(data.policy_name)
+
+        return await self._moderation_job_gateway.submit(
+            data=data.content_of_image,
+            content_hash=data.content_hash,
+            filename_with_extension=data.filename_with_extension,
+            policy_name=data.policy_name,
+        )
@@ -9,3 +9,21 @@ class FailedToProcessImage(ApplicationError):
     ...
 
 
+class TooManyImagesInBatch(ApplicationError):
+    ...
+
+
+class ImageTooLarge(ApplicationError):
+    ...
+
+
+class UnknownModerationPolicy(ApplicationError):
+    ...
+
+
+class NotAllowedImageUrl(ApplicationError):
+    ...
+
+
+class FailedToFetchImage(ApplicationError):
+    ...
@@ -0,0 +1,9 @@
+from nsfw_detector.application.common.errors.base import ApplicationError
+
+
+class ModerationJobNotFound(ApplicationError):
+    ...
+
+
+class ModerationJobQueueIsFull(ApplicationError):
+    ...
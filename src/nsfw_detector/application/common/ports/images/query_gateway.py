@@ -1,10 +1,23 @@
 from abc import abstractmethod
-from typing import Protocol
+from typing import NewType, Protocol
 
 from nsfw_detector.application.queries.images.view_models import NSFWImageInformation
 
 
 class ImageQueryGateway(Protocol):
     @abstractmethod
-    async def check_image_is_nsfw_by_file(self, data: bytes) -> NSFWImageInformation:
+    async def check_image_is_nsfw_by_file(
+            self,
+            data: bytes,
+            content_hash: str | None = None,
+    ) -> NSFWImageInformation:
+        """
+        Checks image for NSFW content
+        :param data: raw content of the image
+        :param content_hash: SHA-256 hex digest of the content if it was already computed
+        """
         ...
+
+
+# Gateway of the configured backend without cache decorators, for code which caches verdicts itself
+BackendImageQueryGateway = NewType("BackendImageQueryGateway", ImageQueryGateway)
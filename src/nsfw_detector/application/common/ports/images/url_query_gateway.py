@@ -0,0 +1,17 @@
+from abc import abstractmethod
+from typing import Protocol
+
+from nsfw_detector.application.queries.images.view_models import NSFWImageInformation
+
+
+class ImageUrlQueryGateway(Protocol):
+    @abstractmethod
+    async def check_image_is_nsfw_by_url(self, url: str) -> NSFWImageInformation:
+        """
+        Downloads image and checks it for NSFW content
+        :param url: http or https URL of the image
+        :raises NotAllowedImageUrl: if URL points to a host which is not allowed
+        :raises FailedToFetchImage: if image can't be downloaded
+        :raises ImageTooLarge: if image is larger than allowed
+        """
+        ...
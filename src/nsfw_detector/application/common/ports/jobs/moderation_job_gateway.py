@@ -0,0 +1,33 @@
+from abc import abstractmethod
+from typing import Protocol
+
+from nsfw_detector.application.queries.images.view_models import ModerationJobInformation
+
+
+class ModerationJobGateway(Protocol):
+    @abstractmethod
+    async def submit(
+            self,
+            data: bytes,
+            content_hash: str,
+            filename_with_extension: str,
+            policy_name: str | None = None,
+    ) -> str:
+        """
+        Enqueues image to be checked by workers
+        :param data: raw content of the image
+        :param content_hash: SHA-256 hex digest of the content
+        :param filename_with_extension: name of the uploaded file
+        :param policy_name: moderation policy to check the image with, the default one if None
+        :return: id of the job
+        :raises ModerationJobQueueIsFull: if too many jobs are not finished yet
+        """
+        ...
+
+    @abstractmethod
+    async def get(self, job_id: str) -> ModerationJobInformation | None:
+        """
+        Returns status and result of the job, or None if it is unknown or expired
+        :param job_id: id of the job
+        """
+        ...
@@ -0,0 +1,50 @@
+from dataclasses import dataclass
+from typing import Final, Iterable, final
+from urllib.parse import SplitResult, urlsplit
+
+from nsfw_detector.application.common.errors.images import FailedToProcessImage, NotAllowedImageUrl
+from nsfw_detector.application.common.ports.images.url_query_gateway import ImageUrlQueryGateway
+from nsfw_detector.application.queries.images.policies import DEFAULT_MODERATION_POLICY, ModerationPolicy
+from nsfw_detector.application.queries.images.view_models import NSFWImageInformation
+
+ALLOWED_URL_SCHEMES: Final[Iterable[str]] = ("http", "https")
+
+
+def ensure_allowed_url(url: str) -> None:
+    parts: SplitResult = urlsplit(url)
+
+    if parts.scheme not in ALLOWED_URL_SCHEMES or not parts.hostname:
+        raise NotAllowedImageUrl(
+            f"{url} is not an allowed URL. Please provide URL with schemes: {', '.join(ALLOWED_URL_SCHEMES)}"
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class CheckImageIsNSFWByUrlQuery:
+    url: str
+    policy: ModerationPolicy = DEFAULT_MODERATION_POLICY
+
+
+@final
+class CheckImageIsNSFWByUrlQueryHandler:
+    def __init__(
+            self,
+            image_url_query_gateway: ImageUrlQueryGateway
+    ) -> None:
+        """
+        Query for getting information if image by URL contains NSFW content,
+        :param image_url_query_gateway: gateway which downloads and checks images
+        """
+        self._image_url_query_gateway: Final[ImageUrlQueryGateway] = image_url_query_gateway
+
+    async def __call__(self, data: CheckImageIsNSFWByUrlQuery) -> bool:
+        ensure_allowed_url(data.url)
+
+        information_about_image: NSFWImageInformation = await self._image_url_query_gateway.check_image_is_nsfw_by_url(
+            url=data.url,
+        )
+
+        if information_about_image.status != "success":
+            raise FailedToProcessImage(f"{data.url} can't be processed. Please try again later.")
+
+        return data.policy.is_allowed(information_about_image)
@@ -3,16 +3,26 @@ from typing import final, Final, Iterable
 
 from nsfw_detector.application.common.errors.images import NotAllowedExtensionOfImage, FailedToProcessImage
 from nsfw_detector.application.common.ports.images.query_gateway import ImageQueryGateway
+from nsfw_detector.application.queries.images.policies import DEFAULT_MODERATION_POLICY, ModerationPolicy
 from nsfw_detector.application.queries.images.view_models import NSFWImageInformation
 
-ALLOWED_EXTENSIONS: Final[Iterable[str]] = ("jpg", "png")
-MINIMAL_NSFW_SCORE: Final[float] = 0.7
+ALLOWED_EXTENSIONS: Final[Iterable[str]] = ("jpg", "png", "gif", "webp")
+
+
+def ensure_allowed_extension(filename_with_extension: str) -> None:
+    if not any(filename_with_extension.endswith(f".{extension}") for extension in ALLOWED_EXTENSIONS):
+        raise NotAllowedExtensionOfImage(
+            f"{filename_with_extension} is not an allowed extensions."
+            f" Please provide image with extensions: {', '.join(ALLOWED_EXTENSIONS)}"
+        )
 
 
 @dataclass(frozen=True, slots=True)
 class CheckImageIsNSFWQuery:
     content_of_image: bytes
     filename_with_extension: str
+    content_hash: str | None = None
+    policy: ModerationPolicy = DEFAULT_MODERATION_POLICY
 
 
 @final
@@ -28,18 +38,16 @@ class CheckImageIsNSFWQueryHandler:
         self._image_query_gateway: Final[ImageQueryGateway] = image_query_gateway
 
     async def __call__(self, data: CheckImageIsNSFWQuery) -> bool:
-        if not any(data.filename_with_extension.endswith(extension) for extension in (".png", ".jpg")):
-            raise NotAllowedExtensionOfImage(
-                f"{data.filename_with_extension} is not an allowed extensions."
-                f" Please provide image with extensions: {', '.join(ALLOWED_EXTENSIONS)}"
-            )
+        ensure_allowed_extension(data.filename_with_extension)
 
         information_about_image: NSFWImageInformation = await self._image_query_gateway.check_image_is_nsfw_by_file(
-            data=data.content_of_image
+            data=data.content_of_image,
+            content_hash=data.content_hash,
         )
 
         if information_about_image.status != "success":
             raise FailedToProcessImage(f"{data.filename_with_extension} can't be processed. Please try again later.")
 
-        return float(information_about_image.output) > MINIMAL_NSFW_SCORE
+        # Policy is evaluated on cached scores, so changing it doesn't require checking images again
+        return data.policy.is_allowed(information_about_image)
 
@@ -0,0 +1,32 @@
+from dataclasses import dataclass
+from typing import final, Final
+
+from nsfw_detector.application.common.errors.jobs import ModerationJobNotFound
+from nsfw_detector.application.common.ports.jobs.moderation_job_gateway import ModerationJobGateway
+from nsfw_detector.application.queries.images.view_models import ModerationJobInformation
+
+
+@dataclass(frozen=True, slots=True)
+class GetModerationJobQuery:
+    job_id: str
+
+
+@final
+class GetModerationJobQueryHandler:
+    def __init__(
+            self,
+            moderation_job_gateway: ModerationJobGateway
+    ) -> None:
+        """
+        Query for getting status and result of the moderation job
+        :param moderation_job_gateway: gateway of moderation jobs
+        """
+        self._moderation_job_gateway: Final[ModerationJobGateway] = moderation_job_gateway
+
+    async def __call__(self, data: GetModerationJobQuery) -> ModerationJobInformation:
+        information_about_job: ModerationJobInformation | None = await self._moderation_job_gateway.get(data.job_id)
+
+        if information_about_job is None:
+            raise ModerationJobNotFound(f"Job {data.job_id} is not found or its result has expired")
+
+        return information_about_job
@@ -0,0 +1,69 @@
+from dataclasses import dataclass
+from typing import Any, Final, Mapping
+
+from nsfw_detector.application.common.errors.images import UnknownModerationPolicy
+from nsfw_detector.application.queries.images.view_models import NSFWImageInformation, NSFWScores
+
+DEFAULT_POLICY_NAME: Final[str] = "default"
+
+
+@dataclass(frozen=True, slots=True)
+class ModerationPolicy:
+    """
+    Thresholds which the scores of an image must pass.
+
+    Image is allowed if its neutral score is above ``min_neutral`` and no level score is above
+    its maximum. Thresholds set to None are not checked. Image with the neutral score only
+    is not allowed by a policy with level maximums, because they can't be checked.
+    """
+
+    min_neutral: float | None = 0.7
+    max_low: float | None = None
+    max_medium: float | None = None
+    max_high: float | None = None
+
+    def is_allowed(self, information: NSFWImageInformation) -> bool:
+        scores: NSFWScores | None = information.scores
+
+        # GenAI API returns only the neutral score, so the policy passes it only if nothing else is required
+        if scores is None:
+            has_level_limits: bool = any(
+                limit is not None for limit in (self.max_low, self.max_medium, self.max_high)
+            )
+            return not has_level_limits and (
+                self.min_neutral is None or float(information.output) > self.min_neutral
+            )
+
+        return (
+            (self.min_neutral is None or scores.neutral > self.min_neutral)
+            and (self.max_low is None or scores.low <= self.max_low)
+            and (self.max_medium is None or scores.medium <= self.max_medium)
+            and (self.max_high is None or scores.high <= self.max_high)
+        )
+
+
+DEFAULT_MODERATION_POLICY: Final[ModerationPolicy] = ModerationPolicy()
+
+
+@dataclass(frozen=True, slots=True)
+class ModerationPolicies:
+    policies: Mapping[str, ModerationPolicy]
+
+    @classmethod
+    def from_thresholds(cls, thresholds: Mapping[str, Mapping[str, Any]]) -> "ModerationPolicies":
+        return cls(policies={name: ModerationPolicy(**values) for name, values in thresholds.items()})
+
+    def get(self, name: str | None) -> ModerationPolicy:
+        """
+        Returns policy by name, or the default one if name is not given
+        :raises UnknownModerationPolicy: if there is no policy with this name
+        """
+        if name is None:
+            return self.policies.get(DEFAULT_POLICY_NAME, DEFAULT_MODERATION_POLICY)
+
+        if (policy := self.policies.get(name)) is None:
+            raise UnknownModerationPolicy(
+                f"Moderation policy {name} is unknown. Please provide one of: {', '.join(self.policies)}"
+            )
+
+        return policy
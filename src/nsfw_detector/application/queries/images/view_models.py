@@ -2,8 +2,27 @@ from dataclasses import dataclass
 from typing import Literal
 
 
+@dataclass(frozen=True, slots=True)
+class NSFWScores:
+    """Scores of NSFW levels, each one is the probability of this level or a more dangerous one"""
+
+    neutral: float
+    low: float
+    medium: float
+    high: float
+
+
 @dataclass(frozen=True, slots=True)
 class NSFWImageInformation:
     request_id: str
     status: Literal["success", "error", "processing"]
     output: str
+    scores: NSFWScores | None = None
+
+
+@dataclass(frozen=True, slots=True)
+class ModerationJobInformation:
+    job_id: str
+    status: Literal["queued", "processing", "done", "failed"]
+    is_allowed: bool | None = None
+    error: str | None = None
@@ -0,0 +1,93 @@
+import logging
+from pathlib import Path
+from typing import Final
+
+from dishka import AsyncContainer, make_async_container
+
+from nsfw_detector.application.common.ports.images.query_gateway import BackendImageQueryGateway
+from nsfw_detector.infrastructure.cache.base import CacheStore, Prefix
+from nsfw_detector.infrastructure.cache.impl import RedisCacheStore
+from nsfw_detector.infrastructure.cache.namespaces import CacheNamespace
+from nsfw_detector.infrastructure.cache.warming import CacheWarmer, CacheWarmingProgress
+from nsfw_detector.setup.bootstrap import setup_configs, setup_context, setup_logging, warm_up_local_model
+from nsfw_detector.setup.configs import Configs
+from nsfw_detector.setup.ioc import setup_providers
+
+logger: Final[logging.Logger] = logging.getLogger(__name__)
+
+
+async def invalidate_cache(purge: bool) -> None:
+    """
+    Invalidates all cached verdicts at once by switching the cache namespace to the next generation.
+
+    Running instances pick up the new generation within ``CACHE_VERSION_REFRESH_SECONDS``.
+    Entries of the previous generation expire by TTL, or are unlinked right away with ``purge``.
+
+    Args:
+        purge: Whether to delete entries of the previous generation
+    """
+    configs: Configs = setup_configs()
+    setup_logging(logger_config=configs.logging)
+
+    container: AsyncContainer = make_async_container(*setup_providers(configs), context=setup_context(configs))
+    try:
+        namespace: CacheNamespace = await container.get(CacheNamespace)
+        previous: Prefix = await namespace.invalidate()
+        logger.info("Cached verdicts are invalidated, new prefix is %s", (await namespace.prefix()).value)
+
+        if purge:
+            store: RedisCacheStore = await container.get(RedisCacheStore)
+            await store.clear_by_prefix(previous)
+    finally:
+        await container.close()
+
+
+async def warm_cache(
+        source: Path,
+        concurrency: int,
+        batch_size: int,
+        checkpoint: Path | None,
+        ttl: int | None,
+) -> None:
+    """
+    Caches verdicts of a corpus of known images, so their uploads are not cold misses.
+
+    Images are checked by the same backend as requests, with the current ``CACHE_MODEL_VERSION``,
+    so the cache of a new model version can be warmed before traffic is switched to it.
+    Cache decorators of the backend are skipped, so verdicts are written only by the warmer, with its TTL.
+
+    Args:
+        source: Directory with images or a manifest with their paths
+        concurrency: Maximum amount of images checked at once
+        batch_size: Amount of images looked up in the cache at once, progress is saved after each batch
+        checkpoint: File with progress, an interrupted run is resumed from it
+        ttl: Lifetime of warmed verdicts in seconds, ``CACHE_TTL`` if not set
+    """
+    configs: Configs = setup_configs()
+    setup_logging(logger_config=configs.logging)
+
+    container: AsyncContainer = make_async_container(*setup_providers(configs), context=setup_context(configs))
+    try:
+        await warm_up_local_model(container)
+
+        async with container() as request_container:
+            warmer: CacheWarmer = CacheWarmer(
+                gateway=await request_container.get(BackendImageQueryGateway),
+                cache_store=await container.get(CacheStore),
+                cache_namespace=await container.get(CacheNamespace),
+                concurrency=concurrency,
+                batch_size=batch_size,
+                max_image_bytes=configs.moderation.max_image_bytes,
+                ttl=configs.cache.ttl if ttl is None else ttl,
+            )
+            progress: CacheWarmingProgress = await warmer.run(source, checkpoint=checkpoint)
+
+        logger.info(
+            "Cache is warmed from %s: %s images warmed, %s already cached, %s failed",
+            source,
+            progress.warmed,
+            progress.skipped,
+            progress.failed,
+        )
+    finally:
+        await container.close()
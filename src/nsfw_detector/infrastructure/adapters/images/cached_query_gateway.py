@@ -1,10 +1,20 @@
 import hashlib
-import uuid
+import time
 
 from nsfw_detector.application.common.ports.images.query_gateway import ImageQueryGateway
 from nsfw_detector.application.queries.images.view_models import NSFWImageInformation
-from nsfw_detector.infrastructure.cache.base import CacheStore, KeyWithPrefix, Prefix, Key
-from typing import Final
+from nsfw_detector.infrastructure.adapters.images.verdicts import from_cached_verdict, to_cached_verdict
+from nsfw_detector.infrastructure.cache.base import MISSING, CacheStore, KeyWithPrefix, Key
+from nsfw_detector.infrastructure.cache.namespaces import CacheNamespace
+from nsfw_detector.infrastructure.concurrency.single_flight import SingleFlight
+from nsfw_detector.infrastructure.metrics.instruments import (
+    CACHE_LOOKUP_DURATION,
+    EXACT_CACHE_HITS,
+    EXACT_CACHE_MISSES,
+    HASH_DURATION,
+)
+from nsfw_detector.setup.configs import CacheConfig
+from typing import Any, Final
 
 
 class ImageCachedQueryGateway(ImageQueryGateway):
@@ -12,37 +22,66 @@ class ImageCachedQueryGateway(ImageQueryGateway):
             self,
             gateway: ImageQueryGateway,
             cache_store: CacheStore,
+            cache_config: CacheConfig,
+            cache_namespace: CacheNamespace,
+            single_flight: SingleFlight[str, NSFWImageInformation],
     ) -> None:
         self._gateway: Final[ImageQueryGateway] = gateway
         self._cache_store: Final[CacheStore] = cache_store
+        self._cache_namespace: Final[CacheNamespace] = cache_namespace
+        self._single_flight: Final[SingleFlight[str, NSFWImageInformation]] = single_flight
+        self._ttl: Final[int] = cache_config.ttl
 
-    async def check_image_is_nsfw_by_file(self, data: bytes) -> NSFWImageInformation:
+    async def check_image_is_nsfw_by_file(
+            self,
+            data: bytes,
+            content_hash: str | None = None,
+    ) -> NSFWImageInformation:
+        if content_hash is None:
+            content_hash = self.__generate_image_hash(data)
+
+        # One round trip: miss is reported by default value instead of separate exists()
+        started_at: float = time.perf_counter()
         key_with_prefix = KeyWithPrefix(
-            prefix=Prefix("nsfw_image"),
-            key=Key(self.__generate_image_hash(data))
+            prefix=await self._cache_namespace.prefix(),
+            key=Key(content_hash)
         )
+        cached_output: Any = await self._cache_store.get(key_with_prefix, default=MISSING)
+        CACHE_LOOKUP_DURATION.observe(time.perf_counter() - started_at)
 
-        exists: bool = await self._cache_store.exists(key_with_prefix)
+        if cached_output is not MISSING:
+            EXACT_CACHE_HITS.inc()
+            return from_cached_verdict(cached_output)
 
-        if exists:
-            return NSFWImageInformation(
-                request_id=str(uuid.uuid4()),
-                status="success",
-                output=await self._cache_store.get(key_with_prefix)
-            )
+        EXACT_CACHE_MISSES.inc()
 
+        # Concurrent uploads of the same image wait for one check instead of starting their own
+        return await self._single_flight.do(
+            content_hash,
+            lambda: self.__check_and_cache(data, content_hash, key_with_prefix),
+        )
+
+    async def __check_and_cache(
+            self,
+            data: bytes,
+            content_hash: str,
+            key_with_prefix: KeyWithPrefix,
+    ) -> NSFWImageInformation:
         nsfw_image_information: NSFWImageInformation = await self._gateway.check_image_is_nsfw_by_file(
             data=data,
+            content_hash=content_hash,
         )
 
+        # Whole score vector is cached, so any moderation policy can be evaluated on a hit
         await self._cache_store.set(
             key=key_with_prefix,
-            value=nsfw_image_information.output,
-            ttl=50
+            value=to_cached_verdict(nsfw_image_information),
+            ttl=self._ttl
         )
 
         return nsfw_image_information
 
     @staticmethod
     def __generate_image_hash(data: bytes) -> str:
-        return hashlib.sha256(data).hexdigest()
+        with HASH_DURATION.time():
+            return hashlib.sha256(data).hexdigest()
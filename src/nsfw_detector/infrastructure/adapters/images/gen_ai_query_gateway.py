@@ -1,6 +1,9 @@
+import asyncio
 import io
 import logging
 import json
+import random
+import time
 from typing import Final, Any
 
 from typing_extensions import override
@@ -8,13 +11,29 @@ from typing_extensions import override
 from nsfw_detector.application.common.ports.images.query_gateway import ImageQueryGateway
 from nsfw_detector.application.queries.images.view_models import NSFWImageInformation
 from nsfw_detector.infrastructure.clients.http.base import HttpClient, HttpResponse, DataForForm
-from nsfw_detector.infrastructure.errors.http import NoFieldFoundInHTTPRequestError, ServiceUnAvailableError
+from nsfw_detector.infrastructure.errors.http import (
+    NoFieldFoundInHTTPRequestError,
+    RemoteRequestFailedError,
+    RemoteRequestTimeoutError,
+    ServiceUnAvailableError,
+)
+from nsfw_detector.infrastructure.metrics.instruments import BACKEND_ERRORS, REMOTE_CALL_DURATION
 from nsfw_detector.setup.configs import GenAPIConfig
 
 logger: Final[logging.Logger] = logging.getLogger(__name__)
 
+_FAILED_STATUSES: Final[frozenset[str]] = frozenset({"failed", "error"})
+
 
 class GenAIImageQueryGateway(ImageQueryGateway):
+    """
+    Checks images with GenAI API.
+
+    In ``sync`` mode the request is held open until the model answers. In ``async`` mode the image
+    is submitted with ``is_sync=0`` and the result is polled by ``request_id`` with growing delays,
+    so slow remote checks don't hold sockets: polls are short requests over the shared connection pool.
+    """
+
     def __init__(
             self,
             http_client: HttpClient,
@@ -24,33 +43,47 @@ class GenAIImageQueryGateway(ImageQueryGateway):
         self._api_config: Final[GenAPIConfig] = api_config
 
     @override
-    async def check_image_is_nsfw_by_file(self, data: bytes) -> NSFWImageInformation | None:
-        url: str = "https://api.gen-api.ru/api/v1/networks/image-nsfw-checker"
-        logger.info(
+    async def check_image_is_nsfw_by_file(
+            self,
+            data: bytes,
+            content_hash: str | None = None,
+    ) -> NSFWImageInformation | None:
+        started_at: float = time.perf_counter()
+        try:
+            return await self.__check(data)
+        except Exception as error:
+            BACKEND_ERRORS.labels("remote", type(error).__name__).inc()
+            raise
+        finally:
+            REMOTE_CALL_DURATION.observe(time.perf_counter() - started_at)
+
+    async def __check(self, data: bytes) -> NSFWImageInformation:
+        url: str = f"{self._api_config.base_url}/api/v1/networks/image-nsfw-checker"
+        is_sync: bool = self._api_config.mode == "sync"
+        logger.debug(
             "Making request to checking nsfw content to %s",
             url
         )
 
-        token: str = f"Bearer {self._api_config.api_key}"
-
         response: HttpResponse = await self._http_client.post_with_form(
             url=url,
-            headers={
-                "Accept": "application/json",
-                "Authorization": token
-            },
+            headers=self.__headers(),
             form_data=[
-                DataForForm(field_name="input", value=json.dumps({"is_sync": 1}), content_type="application/json"),
+                DataForForm(
+                    field_name="input",
+                    value=json.dumps({"is_sync": int(is_sync)}),
+                    content_type="application/json",
+                ),
                 DataForForm(field_name="image", value=io.BytesIO(data)),
             ],
         )
 
-        logger.info("Received response from nsfw checker API: %s", response)
+        logger.debug("Received response from nsfw checker API: %s", response)
 
         if response.status >= 500:
             raise ServiceUnAvailableError("api.gen-api.ru not responding")
 
-        data: Any = response.json()
+        data: Any = self.__parse(response, url)
 
         if not (request_id := data.get("request_id")):
             raise NoFieldFoundInHTTPRequestError(
@@ -58,20 +91,86 @@ class GenAIImageQueryGateway(ImageQueryGateway):
                 url
             )
 
+        if not is_sync:
+            data = await self.__wait_for_result(request_id)
+
         if not (status := data.get("status")):
             raise NoFieldFoundInHTTPRequestError(
                 "status not found in response from url %s",
                 url
             )
 
-        if not (output := data.get("output")):
+        if not (output := self.__extract_output(data)):
             raise NoFieldFoundInHTTPRequestError(
                 "output not found in response from url %s",
                 url
             )
 
         return NSFWImageInformation(
-            request_id=request_id,
+            request_id=str(request_id),
             status=status,
             output=output
         )
+
+    async def __wait_for_result(self, request_id: Any) -> Any:
+        url: str = f"{self._api_config.base_url}/api/v1/request/get/{request_id}"
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        deadline: float = loop.time() + self._api_config.poll_timeout
+        interval: float = self._api_config.poll_interval
+
+        while True:
+            # Jitter spreads polls of requests submitted at the same moment
+            await asyncio.sleep(min(interval * random.uniform(0.8, 1.2), max(deadline - loop.time(), 0)))  # noqa: S311
+
+            response: HttpResponse = await self._http_client.get(url=url, headers=self.__headers())
+            logger.debug("Polled result of request %s: %s", request_id, response)
+
+            # Client errors don't go away by polling again, only server errors are retried
+            if 400 <= response.status < 500:
+                raise RemoteRequestFailedError(
+                    f"Result of request {request_id} to api.gen-api.ru responded with status {response.status}"
+                )
+
+            if response.status < 500:
+                data: Any = self.__parse(response, url)
+                status: str | None = data.get("status")
+
+                if status == "success":
+                    return data
+                if status in _FAILED_STATUSES:
+                    raise RemoteRequestFailedError(f"Request {request_id} to api.gen-api.ru failed: {data}")
+
+            if loop.time() >= deadline:
+                raise RemoteRequestTimeoutError(
+                    f"Result of request {request_id} to api.gen-api.ru is not ready "
+                    f"after {self._api_config.poll_timeout}s"
+                )
+
+            interval = min(interval * 2, self._api_config.poll_max_interval)
+
+    def __headers(self) -> dict[str, str]:
+        return {
+            "Accept": "application/json",
+            "Authorization": f"Bearer {self._api_config.api_key}",
+        }
+
+    @staticmethod
+    def __parse(response: HttpResponse, url: str) -> dict[str, Any]:
+        try:
+            data: Any = response.json()
+        except ValueError as error:
+            raise RemoteRequestFailedError(f"{url} responded with invalid JSON") from error
+
+        if not isinstance(data, dict):
+            raise RemoteRequestFailedError(f"{url} responded with JSON which is not an object")
+        return data
+
+    @staticmethod
+    def __extract_output(data: Any) -> str | None:
+        # Synchronous responses have ``output``, polled results have ``result``, usually as a list
+        output: Any = data.get("output", data.get("result"))
+
+        if isinstance(output, list):
+            output = output[0] if output else None
+
+        return None if output is None or output == "" else str(output)
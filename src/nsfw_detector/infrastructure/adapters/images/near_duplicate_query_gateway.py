@@ -0,0 +1,77 @@
+import asyncio
+import logging
+import time
+from typing import Final
+
+from typing_extensions import override
+
+from nsfw_detector.application.common.ports.images.query_gateway import ImageQueryGateway
+from nsfw_detector.application.queries.images.view_models import NSFWImageInformation
+from nsfw_detector.infrastructure.adapters.images.verdicts import (
+    CachedVerdict,
+    from_cached_verdict,
+    to_cached_verdict,
+)
+from nsfw_detector.infrastructure.cache.namespaces import CacheNamespace
+from nsfw_detector.infrastructure.cache.perceptual import PerceptualHashIndex, compute_dhash
+from nsfw_detector.infrastructure.metrics.instruments import (
+    PERCEPTUAL_CACHE_HITS,
+    PERCEPTUAL_CACHE_MISSES,
+    PERCEPTUAL_HASH_DURATION,
+)
+
+logger: Final[logging.Logger] = logging.getLogger(__name__)
+
+
+class ImageNearDuplicateQueryGateway(ImageQueryGateway):
+    """
+    Reuses verdict of a known image for its near duplicates: re-saved JPEG, thumbnail or
+    a copy with stripped metadata, which don't match by exact content hash.
+    """
+
+    def __init__(
+            self,
+            gateway: ImageQueryGateway,
+            perceptual_hash_index: PerceptualHashIndex,
+            cache_namespace: CacheNamespace,
+    ) -> None:
+        self._gateway: Final[ImageQueryGateway] = gateway
+        self._perceptual_hash_index: Final[PerceptualHashIndex] = perceptual_hash_index
+        self._cache_namespace: Final[CacheNamespace] = cache_namespace
+
+    @override
+    async def check_image_is_nsfw_by_file(
+            self,
+            data: bytes,
+            content_hash: str | None = None,
+    ) -> NSFWImageInformation:
+        started_at: float = time.perf_counter()
+        try:
+            dhash: int | None = await asyncio.to_thread(compute_dhash, data)
+        except Exception:  # noqa: BLE001
+            # Image can't be decoded, underlying gateway reports the error
+            logger.debug("Failed to compute perceptual hash, checking without index")
+            return await self._gateway.check_image_is_nsfw_by_file(data=data, content_hash=content_hash)
+
+        if dhash is None:
+            return await self._gateway.check_image_is_nsfw_by_file(data=data, content_hash=content_hash)
+
+        PERCEPTUAL_HASH_DURATION.observe(time.perf_counter() - started_at)
+        await self._perceptual_hash_index.use_namespace((await self._cache_namespace.prefix()).value)
+
+        if (verdict := self._perceptual_hash_index.find(dhash)) is not None:
+            PERCEPTUAL_CACHE_HITS.inc()
+            logger.debug("Found near duplicate for perceptual hash %x", dhash)
+            return from_cached_verdict(verdict)
+
+        PERCEPTUAL_CACHE_MISSES.inc()
+        nsfw_image_information: NSFWImageInformation = await self._gateway.check_image_is_nsfw_by_file(
+            data=data,
+            content_hash=content_hash,
+        )
+
+        if nsfw_image_information.status == "success":
+            cached_verdict: CachedVerdict = to_cached_verdict(nsfw_image_information)
+            await self._perceptual_hash_index.add(dhash, cached_verdict)
+
+        return nsfw_image_information
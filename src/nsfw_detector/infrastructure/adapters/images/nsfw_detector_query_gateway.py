@@ -1,40 +1,51 @@
-import asyncio
-import io
 import uuid
-from asyncio import AbstractEventLoop
-from concurrent.futures import ThreadPoolExecutor
-from typing import Final, cast
+from typing import Final
 
-from PIL import Image
-from PIL.ImageFile import ImageFile
-from nsfw_image_detector import NSFWDetector, NSFWLevel
+from PIL import Image, UnidentifiedImageError
 
+from nsfw_detector.application.common.errors.images import FailedToProcessImage, ImageTooLarge
 from nsfw_detector.application.common.ports.images.query_gateway import ImageQueryGateway
-from nsfw_detector.application.queries.images.view_models import NSFWImageInformation
+from nsfw_detector.application.queries.images.view_models import NSFWImageInformation, NSFWScores
+from nsfw_detector.infrastructure.errors.inference import AnimationTooLargeError
+from nsfw_detector.infrastructure.inference.animation import AnimatedImageSampler
+from nsfw_detector.infrastructure.inference.base import ScoreVector
+from nsfw_detector.infrastructure.inference.batcher import InferenceBatcher
+from nsfw_detector.infrastructure.metrics.instruments import BACKEND_ERRORS
 
 
 class NSFWDetectorImageQueryGateway(ImageQueryGateway):
-    def __init__(self, detector: NSFWDetector) -> None:
-        self._detector: Final[NSFWDetector] = detector
-        self._thread_pool_executor: Final[ThreadPoolExecutor] = ThreadPoolExecutor(max_workers=4)
+    def __init__(self, batcher: InferenceBatcher, animated_image_sampler: AnimatedImageSampler) -> None:
+        self._batcher: Final[InferenceBatcher] = batcher
+        self._animated_image_sampler: Final[AnimatedImageSampler] = animated_image_sampler
 
-    async def check_image_is_nsfw_by_file(self, data: bytes) -> NSFWImageInformation:
-        loop: AbstractEventLoop = asyncio.get_running_loop()
-        return await loop.run_in_executor(
-            self._thread_pool_executor,
-            self.__process_image_in_executor,
-            data
-        )
-
-    def __process_image_in_executor(self, data: bytes) -> NSFWImageInformation:
-        pillow_image: ImageFile = Image.open(io.BytesIO(data))
-        dictionary_with_labels: dict[NSFWLevel, float] = cast(
-            dict[NSFWLevel, float],
-            self._detector.predict_proba(pillow_image)
-        )
+    async def check_image_is_nsfw_by_file(
+            self,
+            data: bytes,
+            content_hash: str | None = None,
+    ) -> NSFWImageInformation:
+        try:
+            # Animated images are checked by a sample of frames, others by themselves
+            scores: ScoreVector = (
+                await self._animated_image_sampler.predict(data)
+                or await self._batcher.predict(data)
+            )
+        except (UnidentifiedImageError, Image.DecompressionBombError) as error:
+            # Broken image is an error of the input, not of the backend
+            raise FailedToProcessImage("Image can't be decoded") from error
+        except AnimationTooLargeError as error:
+            raise ImageTooLarge(str(error)) from error
+        except Exception as error:
+            BACKEND_ERRORS.labels("local", type(error).__name__).inc()
+            raise
 
         return NSFWImageInformation(
             request_id=str(uuid.uuid4()),
             status="success",
-            output=str(dictionary_with_labels[NSFWLevel.NEUTRAL])
+            output=str(scores.neutral),
+            scores=NSFWScores(
+                neutral=scores.neutral,
+                low=scores.low,
+                medium=scores.medium,
+                high=scores.high,
+            ),
         )
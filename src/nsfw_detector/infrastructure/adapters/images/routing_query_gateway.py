@@ -0,0 +1,86 @@
+import asyncio
+import logging
+import time
+from typing import Final, Sequence
+
+from typing_extensions import override
+
+from nsfw_detector.application.common.errors.base import ApplicationError
+from nsfw_detector.application.common.ports.images.query_gateway import ImageQueryGateway
+from nsfw_detector.application.queries.images.view_models import NSFWImageInformation
+from nsfw_detector.infrastructure.errors.inference import InferenceOverloadedError
+from nsfw_detector.infrastructure.errors.routing import NoAvailableBackendError
+from nsfw_detector.infrastructure.routing.health import BackendHealth
+
+logger: Final[logging.Logger] = logging.getLogger(__name__)
+
+
+class RoutingImageQueryGateway(ImageQueryGateway):
+    """
+    Sends each image to the backend expected to answer fastest, e.g. to the remote API
+    when local workers are saturated.
+
+    Backends with open circuit are skipped. If the chosen backend fails, the image is sent
+    to the next one, so a failing backend costs one extra attempt instead of an error.
+    Errors of the input, e.g. an image which can't be decoded, are raised as is: another backend
+    would fail the same way, and they don't say anything about health of the backend.
+    """
+
+    def __init__(self, backends: Sequence[tuple[ImageQueryGateway, BackendHealth]]) -> None:
+        self._backends: Final[Sequence[tuple[ImageQueryGateway, BackendHealth]]] = backends
+
+    @override
+    async def check_image_is_nsfw_by_file(
+            self,
+            data: bytes,
+            content_hash: str | None = None,
+    ) -> NSFWImageInformation | None:
+        candidates: list[tuple[ImageQueryGateway, BackendHealth]] = sorted(
+            (backend for backend in self._backends if backend[1].is_available()),
+            key=lambda backend: backend[1].expected_latency,
+        )
+
+        if not candidates:
+            raise NoAvailableBackendError("All backends for checking images are unavailable")
+
+        last_error: Exception | None = None
+
+        for gateway, health in candidates:
+            # Circuit may have opened while the previous candidate was tried
+            if last_error is not None and not health.is_available():
+                continue
+
+            health.on_start()
+            started_at: float = time.perf_counter()
+
+            try:
+                result: NSFWImageInformation | None = await gateway.check_image_is_nsfw_by_file(
+                    data=data,
+                    content_hash=content_hash,
+                )
+            except asyncio.CancelledError:
+                health.on_cancel()
+                raise
+            except ApplicationError:
+                health.on_cancel()
+                raise
+            except InferenceOverloadedError as error:
+                # Saturated backend is healthy, its circuit is not opened for shedding load
+                health.on_cancel()
+                logger.debug("Backend %s is overloaded: %s", health.name, error)
+                last_error = error
+                continue
+            except Exception as error:  # noqa: BLE001
+                health.on_failure()
+                logger.warning("Backend %s failed to check image: %r", health.name, error)
+                last_error = error
+                continue
+
+            health.on_success(time.perf_counter() - started_at)
+            return result
+
+        if isinstance(last_error, InferenceOverloadedError):
+            # Client should back off instead of getting an error, the remote API was not available anyway
+            raise last_error
+
+        raise NoAvailableBackendError("All backends for checking images failed") from last_error
@@ -0,0 +1,161 @@
+import asyncio
+import hashlib
+import logging
+from typing import Any, Final
+from urllib.parse import urljoin, urlsplit
+
+from typing_extensions import override
+
+from nsfw_detector.application.common.errors.images import FailedToFetchImage, ImageTooLarge, NotAllowedImageUrl
+from nsfw_detector.application.common.ports.images.query_gateway import ImageQueryGateway
+from nsfw_detector.application.common.ports.images.url_query_gateway import ImageUrlQueryGateway
+from nsfw_detector.application.queries.images.check_image_by_url import ensure_allowed_url
+from nsfw_detector.application.queries.images.view_models import NSFWImageInformation
+from nsfw_detector.infrastructure.adapters.images.verdicts import from_cached_verdict, to_cached_verdict
+from nsfw_detector.infrastructure.cache.base import MISSING, CacheStore, Key, KeyWithPrefix, Prefix
+from nsfw_detector.infrastructure.cache.namespaces import CacheNamespace
+from nsfw_detector.infrastructure.clients.http.base import HttpResponse, UrlFetchHttpClient
+from nsfw_detector.infrastructure.clients.http.resolver import IPAddress, is_global_address, parse_address
+from nsfw_detector.infrastructure.concurrency.host_limiter import PerHostLimiter
+from nsfw_detector.infrastructure.errors.http import (
+    NotAllowedHostError,
+    RemoteRequestFailedError,
+    RemoteRequestTimeoutError,
+    ResponseTooLargeError,
+)
+from nsfw_detector.infrastructure.metrics.instruments import URL_CACHE_HITS, URL_CACHE_MISSES
+from nsfw_detector.setup.configs import ModerationConfig, UrlFetchConfig
+
+logger: Final[logging.Logger] = logging.getLogger(__name__)
+
+_REDIRECT_STATUSES: Final[frozenset[int]] = frozenset((301, 302, 303, 307, 308))
+
+
+class HttpImageUrlQueryGateway(ImageUrlQueryGateway):
+    """
+    Downloads images through the shared HTTP client and checks them with the image gateway.
+
+    Body is streamed and dropped as soon as it crosses the size limit, the whole download is limited
+    in time and amount of concurrent downloads from one host is limited. Redirects are followed
+    manually, so each target is validated like the original URL. Names are resolved by the client
+    only to global addresses, when it connects, so a name can't point a download into the private network.
+
+    Verdict is cached by URL together with ETag and Last-Modified of the image, so an unchanged image
+    is answered after a conditional request, without downloading and checking it again.
+    Downloaded images are still checked through the cached gateway, so the same image
+    under another URL is not checked twice.
+    """
+
+    def __init__(
+            self,
+            http_client: UrlFetchHttpClient,
+            gateway: ImageQueryGateway,
+            cache_store: CacheStore,
+            cache_namespace: CacheNamespace,
+            host_limiter: PerHostLimiter,
+            url_fetch_config: UrlFetchConfig,
+            moderation_config: ModerationConfig,
+    ) -> None:
+        self._http_client: Final[UrlFetchHttpClient] = http_client
+        self._gateway: Final[ImageQueryGateway] = gateway
+        self._cache_store: Final[CacheStore] = cache_store
+        self._cache_namespace: Final[CacheNamespace] = cache_namespace
+        self._host_limiter: Final[PerHostLimiter] = host_limiter
+        self._config: Final[UrlFetchConfig] = url_fetch_config
+        self._max_image_bytes: Final[int] = moderation_config.max_image_bytes
+
+    @override
+    async def check_image_is_nsfw_by_url(self, url: str) -> NSFWImageInformation:
+        prefix: Prefix = await self._cache_namespace.prefix()
+        key_with_prefix: KeyWithPrefix = KeyWithPrefix(
+            prefix=Prefix(f"{prefix.value}:url"),
+            key=Key(hashlib.sha256(url.encode()).hexdigest()),
+        )
+        # Cached as (ETag, Last-Modified, verdict)
+        cached: Any = await self._cache_store.get(key_with_prefix, default=MISSING)
+
+        headers: dict[str, str] = {}
+        if cached is not MISSING:
+            etag, last_modified, _ = cached
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+
+        try:
+            response: HttpResponse = await asyncio.wait_for(
+                self.__fetch(url, headers),
+                timeout=self._config.timeout,
+            )
+        except asyncio.TimeoutError as error:
+            raise RemoteRequestTimeoutError(f"{url} wasn't downloaded in {self._config.timeout}s") from error
+
+        if response.status == 304 and cached is not MISSING:
+            URL_CACHE_HITS.inc()
+            # Image is confirmed to be unchanged, so the verdict lives as long as it is used
+            await self._cache_store.set(key=key_with_prefix, value=cached, ttl=self._config.cache_ttl)
+            return from_cached_verdict(cached[2])
+
+        URL_CACHE_MISSES.inc()
+        if response.status != 200:
+            raise FailedToFetchImage(f"{url} responded with status {response.status}")
+
+        information: NSFWImageInformation = await self._gateway.check_image_is_nsfw_by_file(data=response.body)
+
+        etag: str = response.headers.get("ETag", "")
+        last_modified: str = response.headers.get("Last-Modified", "")
+        # Without validators unchanged image can't be confirmed, so such URLs are always downloaded
+        if information.status == "success" and (etag or last_modified):
+            await self._cache_store.set(
+                key=key_with_prefix,
+                value=(etag, last_modified, to_cached_verdict(information)),
+                ttl=self._config.cache_ttl,
+            )
+
+        return information
+
+    async def __fetch(self, url: str, headers: dict[str, str]) -> HttpResponse:
+        for _ in range(self._config.max_redirects + 1):
+            host: str = self.__ensure_allowed_host(url)
+
+            async with self._host_limiter.acquire(host):
+                try:
+                    response: HttpResponse = await self._http_client.get_limited(
+                        url,
+                        max_bytes=self._max_image_bytes,
+                        headers=headers,
+                        timeout=self._config.timeout,
+                    )
+                except ResponseTooLargeError as error:
+                    raise ImageTooLarge(f"Image is larger than {self._max_image_bytes} bytes") from error
+                except NotAllowedHostError as error:
+                    raise NotAllowedImageUrl(f"{url} points to a host which is not allowed") from error
+                except RemoteRequestFailedError as error:
+                    raise FailedToFetchImage(f"{url} can't be downloaded") from error
+
+            location: str | None = response.headers.get("Location")
+            if response.status not in _REDIRECT_STATUSES or not location:
+                return response
+
+            logger.debug("%s is redirected to %s", url, location)
+            url = urljoin(url, location)
+
+        raise FailedToFetchImage(f"Image is redirected more than {self._config.max_redirects} times")
+
+    def __ensure_allowed_host(self, url: str) -> str:
+        ensure_allowed_url(url)
+        host: str = urlsplit(url).hostname or ""
+
+        if self._config.allow_private_hosts:
+            return host
+
+        # Literal addresses, short IPv4 forms too, are not resolved by the client, so they are checked here.
+        # Names are checked by the client when it connects, this only saves a lookup of obvious ones
+        address: IPAddress | None = parse_address(host)
+        if (
+                host == "localhost"
+                or host.endswith(".localhost")
+                or (address is not None and not is_global_address(address))
+        ):
+            raise NotAllowedImageUrl(f"{url} points to a host which is not allowed")
+        return host
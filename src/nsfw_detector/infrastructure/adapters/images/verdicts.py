@@ -0,0 +1,28 @@
+import uuid
+
+from nsfw_detector.application.queries.images.view_models import NSFWImageInformation, NSFWScores
+
+# Scores of the local model are cached as a vector of neutral, low, medium and high scores,
+# outputs of GenAI API are cached as strings
+CachedVerdict = tuple[float, ...] | str
+
+
+def to_cached_verdict(information: NSFWImageInformation) -> CachedVerdict:
+    if information.scores is None:
+        return information.output
+
+    scores: NSFWScores = information.scores
+    return scores.neutral, scores.low, scores.medium, scores.high
+
+
+def from_cached_verdict(verdict: CachedVerdict) -> NSFWImageInformation:
+    if isinstance(verdict, str):
+        return NSFWImageInformation(request_id=str(uuid.uuid4()), status="success", output=verdict)
+
+    scores: NSFWScores = NSFWScores(*verdict)
+    return NSFWImageInformation(
+        request_id=str(uuid.uuid4()),
+        status="success",
+        output=str(scores.neutral),
+        scores=scores,
+    )
@@ -0,0 +1,106 @@
+import logging
+import time
+import uuid
+from typing import Any, Final
+
+from redis.asyncio import Redis
+from redis.asyncio.client import Pipeline
+from typing_extensions import override
+
+from nsfw_detector.application.common.errors.jobs import ModerationJobQueueIsFull
+from nsfw_detector.application.common.ports.jobs.moderation_job_gateway import ModerationJobGateway
+from nsfw_detector.application.queries.images.view_models import ModerationJobInformation
+from nsfw_detector.setup.configs import JobsConfig
+
+logger: Final[logging.Logger] = logging.getLogger(__name__)
+
+_JOB_KEY_PREFIX: Final[str] = "nsfw_image_job"
+_IMAGE_KEY_PREFIX: Final[str] = "nsfw_image_blob"
+
+
+def job_key(job_id: str) -> str:
+    return f"{_JOB_KEY_PREFIX}:{job_id}"
+
+
+def image_key(content_hash: str) -> str:
+    return f"{_IMAGE_KEY_PREFIX}:{content_hash}"
+
+
+class RedisStreamModerationJobGateway(ModerationJobGateway):
+    """
+    Keeps moderation jobs in Redis, so any worker connected to the same Redis can check them.
+
+    The image is stored once under its SHA-256, and the stream entry only references it, so entries
+    stay small and repeated submissions of the same image don't duplicate it. Status and result
+    of the job are kept in a hash, which is written by workers and read by pollers.
+
+    Finished entries are deleted from the stream, so its length is the backlog of unfinished jobs.
+    New jobs are rejected while the backlog holds ``stream_max_length`` entries, the stream is never trimmed,
+    because trimming would drop unfinished jobs whose status nobody would ever update. The limit is soft:
+    concurrent submissions may exceed it by the amount of submissions made at the same time.
+    """
+
+    def __init__(self, redis: Redis, jobs_config: JobsConfig) -> None:
+        self._redis: Final[Redis] = redis
+        self._jobs_config: Final[JobsConfig] = jobs_config
+
+    @override
+    async def submit(
+            self,
+            data: bytes,
+            content_hash: str,
+            filename_with_extension: str,
+            policy_name: str | None = None,
+    ) -> str:
+        backlog: int = await self._redis.xlen(self._jobs_config.stream)
+        if backlog >= self._jobs_config.stream_max_length:
+            raise ModerationJobQueueIsFull(f"{backlog} jobs are waiting for workers, try again later")
+
+        job_id: str = uuid.uuid4().hex
+
+        # Commands are executed in order, so the image and the job exist before the entry can be read
+        pipeline: Pipeline
+        async with self._redis.pipeline(transaction=False) as pipeline:
+            pipeline.set(image_key(content_hash), data, ex=self._jobs_config.image_ttl)
+            pipeline.hset(
+                job_key(job_id),
+                mapping={
+                    "status": "queued",
+                    "content_hash": content_hash,
+                    "filename": filename_with_extension,
+                    "attempts": 0,
+                    "submitted_at": time.time(),
+                },
+            )
+            pipeline.expire(job_key(job_id), self._jobs_config.result_ttl)
+            pipeline.xadd(
+                self._jobs_config.stream,
+                {
+                    "job_id": job_id,
+                    "content_hash": content_hash,
+                    "filename": filename_with_extension,
+                    # Empty name stands for the default policy, stream entries can't store None
+                    "policy": policy_name or "",
+                },
+            )
+            await pipeline.execute()
+
+        logger.debug("Job %s for image %s is queued", job_id, content_hash)
+        return job_id
+
+    @override
+    async def get(self, job_id: str) -> ModerationJobInformation | None:
+        fields: dict[bytes, bytes] = await self._redis.hgetall(job_key(job_id))
+
+        if not fields:
+            return None
+
+        is_allowed: Any = fields.get(b"is_allowed")
+        error: Any = fields.get(b"error")
+
+        return ModerationJobInformation(
+            job_id=job_id,
+            status=fields[b"status"].decode(),
+            is_allowed=None if is_allowed is None else is_allowed == b"1",
+            error=None if error is None else error.decode(),
+        )
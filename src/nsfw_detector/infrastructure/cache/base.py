@@ -1,7 +1,10 @@
 from abc import abstractmethod
-from typing import Any, Protocol
+from typing import Any, Final, Protocol, Sequence
 from dataclasses import dataclass
 
+# Default for get(), which distinguishes missing key from cached None without separate exists()
+MISSING: Final[Any] = object()
+
 
 @dataclass(frozen=True, slots=True)
 class Key:
@@ -19,6 +22,13 @@ class KeyWithPrefix:
     prefix: Prefix
 
 
+@dataclass(frozen=True, slots=True)
+class CacheEntry:
+    key: KeyWithPrefix
+    value: Any
+    ttl: int = 30
+
+
 class CacheStore(Protocol):
     """Абстракция для кэширования данных"""
 
@@ -41,6 +51,20 @@ class CacheStore(Protocol):
         """Получить данные по ключу"""
         ...
 
+    @abstractmethod
+    async def get_many(
+            self,
+            keys: Sequence[KeyWithPrefix],
+            default: Any | None = None
+    ) -> list[Any]:
+        """Получить данные по нескольким ключам, значения возвращаются в порядке ключей"""
+        ...
+
+    @abstractmethod
+    async def set_many(self, entries: Sequence[CacheEntry]) -> None:
+        """Сохранить несколько значений, у каждого свой TTL (в секундах)"""
+        ...
+
     @abstractmethod
     async def delete(self, key_with_prefix: KeyWithPrefix) -> None:
         """Удалить данные по ключу"""
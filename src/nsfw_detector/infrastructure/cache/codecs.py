@@ -0,0 +1,122 @@
+import pickle
+import struct
+import zlib
+from abc import abstractmethod
+from typing import Any, Final, Protocol
+
+from typing_extensions import override
+
+from nsfw_detector.infrastructure.errors.cache import CacheDecodeError
+
+
+class CacheCodec(Protocol):
+    """Converts cached values to bytes stored in the cache and back"""
+
+    @abstractmethod
+    def encode(self, value: Any) -> bytes:
+        ...
+
+    @abstractmethod
+    def decode(self, data: bytes) -> Any:
+        """
+        :raises CacheDecodeError: if data can't be decoded
+        """
+        ...
+
+
+class PickleZlibCodec(CacheCodec):
+    """Pickles and always compresses values, can store any picklable object"""
+
+    @override
+    def encode(self, value: Any) -> bytes:
+        return zlib.compress(pickle.dumps(value))
+
+    @override
+    def decode(self, data: bytes) -> Any:
+        try:
+            return pickle.loads(zlib.decompress(data))  # noqa: S301
+        except (pickle.UnpicklingError, zlib.error, EOFError, ValueError) as error:
+            raise CacheDecodeError("Failed to decode cached value") from error
+
+
+class CompactCodec(CacheCodec):
+    """
+    Compact binary format: one header byte followed by the payload.
+
+    Lower bits of the header store type of the value, so strings, numbers and float vectors
+    are stored without pickle overhead. Floats are stored as doubles, so they round trip exactly
+    and thresholds compare the same before and after caching. Other values fall back to pickle. Payload is compressed
+    only if it is not shorter than ``compress_threshold`` and compression makes it smaller,
+    so short verdicts are decoded without zlib at all.
+    """
+
+    _COMPRESSED_FLAG: Final[int] = 0x80
+    _NONE: Final[int] = 0x01
+    _STR: Final[int] = 0x02
+    _BYTES: Final[int] = 0x03
+    _INT: Final[int] = 0x04
+    _FLOAT: Final[int] = 0x05
+    _PICKLE: Final[int] = 0x07
+    _FLOAT_VECTOR: Final[int] = 0x08
+
+    def __init__(self, compress_threshold: int = 256) -> None:
+        self._compress_threshold: Final[int] = compress_threshold
+
+    @override
+    def encode(self, value: Any) -> bytes:
+        tag, payload = self.__encode_payload(value)
+
+        if len(payload) >= self._compress_threshold:
+            compressed: bytes = zlib.compress(payload)
+            if len(compressed) < len(payload):
+                return bytes((tag | self._COMPRESSED_FLAG,)) + compressed
+
+        return bytes((tag,)) + payload
+
+    @override
+    def decode(self, data: bytes) -> Any:
+        if not data:
+            raise CacheDecodeError("Cached value is empty")
+
+        header: int = data[0]
+        payload: bytes = data[1:]
+
+        try:
+            if header & self._COMPRESSED_FLAG:
+                payload = zlib.decompress(payload)
+            return self.__decode_payload(header & ~self._COMPRESSED_FLAG, payload)
+        except (zlib.error, struct.error, UnicodeDecodeError, pickle.UnpicklingError, EOFError) as error:
+            raise CacheDecodeError("Failed to decode cached value") from error
+
+    def __encode_payload(self, value: Any) -> tuple[int, bytes]:
+        # bool is subclass of int, so exact types are checked to keep it round trip safe
+        if value is None:
+            return self._NONE, b""
+        if type(value) is str:
+            return self._STR, value.encode()
+        if type(value) is bytes:
+            return self._BYTES, value
+        if type(value) is int and -(2 ** 63) <= value < 2 ** 63:
+            return self._INT, struct.pack("<q", value)
+        if type(value) is float:
+            return self._FLOAT, struct.pack("<d", value)
+        if type(value) is tuple and value and all(type(item) is float for item in value):
+            return self._FLOAT_VECTOR, struct.pack(f"<{len(value)}d", *value)
+        return self._PICKLE, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def __decode_payload(self, tag: int, payload: bytes) -> Any:
+        if tag == self._NONE:
+            return None
+        if tag == self._STR:
+            return payload.decode()
+        if tag == self._BYTES:
+            return payload
+        if tag == self._INT:
+            return struct.unpack("<q", payload)[0]
+        if tag == self._FLOAT:
+            return struct.unpack("<d", payload)[0]
+        if tag == self._FLOAT_VECTOR:
+            return struct.unpack(f"<{len(payload) // 8}d", payload)
+        if tag == self._PICKLE:
+            return pickle.loads(payload)  # noqa: S301
+        raise CacheDecodeError(f"Unknown type of cached value: {tag:#x}")
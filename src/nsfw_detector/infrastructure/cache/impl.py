@@ -1,20 +1,25 @@
+import asyncio
 import logging
-import pickle
-import zlib
-from collections import deque
-from typing import Final, Any
+import time
+from typing import Final, Any, Sequence
 
 from redis.asyncio import Redis
 from typing_extensions import override
 
-from nsfw_detector.infrastructure.cache.base import CacheStore, KeyWithPrefix, Prefix
+from nsfw_detector.infrastructure.cache.base import CacheEntry, CacheStore, KeyWithPrefix, Prefix
+from nsfw_detector.infrastructure.cache.codecs import CacheCodec
+from nsfw_detector.infrastructure.errors.cache import CacheDecodeError
+from nsfw_detector.setup.configs import CacheConfig
 
 logger: Final[logging.Logger] = logging.getLogger(__name__)
 
 
 class RedisCacheStore(CacheStore):
-    def __init__(self, redis: Redis) -> None:
+    def __init__(self, redis: Redis, codec: CacheCodec, cache_config: CacheConfig) -> None:
         self._redis: Final[Redis] = redis
+        self._codec: Final[CacheCodec] = codec
+        self._clear_batch_size: Final[int] = cache_config.clear_batch_size
+        self._clear_max_keys_per_second: Final[int] = cache_config.clear_max_keys_per_second
 
     @override
     async def set(
@@ -24,15 +29,14 @@ class RedisCacheStore(CacheStore):
             ttl: int = 30,
     ) -> None:
         full_key: str = self.__build_full_key(key)
-        serialized: bytes = pickle.dumps(value)
-        compressed: bytes = zlib.compress(serialized)
+        encoded: bytes = self._codec.encode(value)
 
         logger.debug("Caching data with key: %s and ttl: %s", full_key, ttl)
 
-        await self._redis.setex(
+        await self._redis.set(
             name=full_key,
-            value=compressed,
-            time=ttl
+            value=encoded,
+            ex=ttl
         )
 
     @override
@@ -41,24 +45,82 @@ class RedisCacheStore(CacheStore):
             key: KeyWithPrefix,
             default: Any | None = None
     ) -> Any:
+        """Получить данные по ключу за один запрос, при отсутствии ключа возвращается default"""
         full_key: str = self.__build_full_key(key)
-        serialized: Any = await self._redis.get(full_key)
+        encoded: bytes | None = await self._redis.get(full_key)
 
-        if serialized is None:
+        if encoded is None:
             return default
 
-        try:
-            deserialized: Any = pickle.loads(serialized)
-            decompressed: Any = zlib.decompress(deserialized)
-            logger.debug("Returning key")
-        except pickle.UnpicklingError:
-            logger.error("Failed to unpickle %s, returning default value", full_key)
-            return default
-        except zlib.error:
-            logger.error("Failed to uncompress %s, returning default value", full_key)
-            return default
-        else:
-            return decompressed
+        return self.__decode(full_key, encoded, default)
+
+    @override
+    async def get_many(
+            self,
+            keys: Sequence[KeyWithPrefix],
+            default: Any | None = None
+    ) -> list[Any]:
+        """Получить данные по всем ключам одним MGET, отсутствующие ключи получают default"""
+        if not keys:
+            return []
+
+        full_keys: list[str] = [self.__build_full_key(key) for key in keys]
+        encoded_values: list[bytes | None] = await self._redis.mget(full_keys)
+
+        return [
+            default if encoded is None else self.__decode(full_key, encoded, default)
+            for full_key, encoded in zip(full_keys, encoded_values)
+        ]
+
+    async def get_with_ttl(
+            self,
+            key: KeyWithPrefix,
+            default: Any | None = None
+    ) -> tuple[Any, float | None]:
+        """Получить данные вместе с оставшимся TTL в секундах, TTL равен None, если ключа нет или он без TTL"""
+        return (await self.get_many_with_ttl([key], default=default))[0]
+
+    async def get_many_with_ttl(
+            self,
+            keys: Sequence[KeyWithPrefix],
+            default: Any | None = None
+    ) -> list[tuple[Any, float | None]]:
+        """Получить данные и оставшиеся TTL по всем ключам за один round trip: MGET и PTTL в pipeline без транзакции"""
+        if not keys:
+            return []
+
+        full_keys: list[str] = [self.__build_full_key(key) for key in keys]
+
+        async with self._redis.pipeline(transaction=False) as pipe:
+            pipe.mget(full_keys)
+            for full_key in full_keys:
+                pipe.pttl(full_key)
+            encoded_values, *ttls_ms = await pipe.execute()
+
+        return [
+            (
+                default if encoded is None else self.__decode(full_key, encoded, default),
+                ttl_ms / 1000 if encoded is not None and ttl_ms >= 0 else None,
+            )
+            for full_key, encoded, ttl_ms in zip(full_keys, encoded_values, ttls_ms)
+        ]
+
+    @override
+    async def set_many(self, entries: Sequence[CacheEntry]) -> None:
+        """Сохранить все значения за один round trip: MSET не умеет TTL, поэтому SET с EX в pipeline без транзакции"""
+        if not entries:
+            return
+
+        logger.debug("Caching %s entries", len(entries))
+
+        async with self._redis.pipeline(transaction=False) as pipe:
+            for entry in entries:
+                pipe.set(
+                    name=self.__build_full_key(entry.key),
+                    value=self._codec.encode(entry.value),
+                    ex=entry.ttl,
+                )
+            await pipe.execute()
 
     @override
     async def delete(self, key_with_prefix: KeyWithPrefix) -> None:
@@ -68,33 +130,28 @@ class RedisCacheStore(CacheStore):
 
     @override
     async def clear_by_prefix(self, prefix: Prefix) -> None:
-        """Очистить все ключи с указанным префиксом"""
-        pattern: str = f"{prefix.value}:*"
-
-        keys: list[str] = []
-        async for key in self._redis.scan_iter(match=pattern):
-            keys.append(key)
-
-        if not keys:
-            return
+        """
+        Очистить все ключи с указанным префиксом.
 
-        batch_size: Final[int] = 5000
+        Страницы SCAN сразу удаляются через UNLINK, поэтому в памяти не больше одного батча ключей,
+        а память значений освобождается Redis в фоне. Скорость удаления ограничена, чтобы не нагружать Redis.
+        """
+        pattern: str = f"{prefix.value}:*"
+        started_at: float = time.monotonic()
+        deleted: int = 0
+        batch: list[bytes] = []
 
-        # Making batches to reduce server load
+        async for key in self._redis.scan_iter(match=pattern, count=self._clear_batch_size):
+            batch.append(key)
 
-        batches: list[list[str]] = [
-            keys[i:i + batch_size]
-            for i in range(0, len(keys), batch_size)
-        ]
+            if len(batch) >= self._clear_batch_size:
+                deleted += await self.__unlink(batch, deleted, started_at)
+                batch.clear()
 
-        for batch in batches:
-            async with self._redis.pipeline(transaction=False) as pipe:
-                for key in batch:
-                   await pipe.delete(key)
-                await pipe.execute()
+        if batch:
+            deleted += await self.__unlink(batch, deleted, started_at)
 
-        keys.clear()
-        batches.clear()
+        logger.info("Cleared %s keys with prefix %s in %.2fs", deleted, prefix.value, time.monotonic() - started_at)
 
     @override
     async def exists(self, key: KeyWithPrefix) -> bool:
@@ -103,6 +160,26 @@ class RedisCacheStore(CacheStore):
         logger.debug(f"Checking existence of {full_key}")
         return bool(await self._redis.exists(full_key))
 
+    async def __unlink(self, batch: list[bytes], deleted: int, started_at: float) -> int:
+        if self._clear_max_keys_per_second:
+            # Sleeps until the keys deleted so far fit into the rate limit
+            delay: float = deleted / self._clear_max_keys_per_second - (time.monotonic() - started_at)
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+        await self._redis.unlink(*batch)
+        return len(batch)
+
+    def __decode(self, full_key: str, encoded: bytes, default: Any) -> Any:
+        try:
+            decoded: Any = self._codec.decode(encoded)
+            logger.debug("Returning key")
+        except CacheDecodeError:
+            logger.error("Failed to decode %s, returning default value", full_key)
+            return default
+        else:
+            return decoded
+
     @staticmethod
     def __build_full_key(key: KeyWithPrefix) -> str:
         """Строит полный ключ в формате 'prefix:key'"""
@@ -0,0 +1,120 @@
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Final, Sequence
+
+from typing_extensions import override
+
+from nsfw_detector.infrastructure.cache.base import CacheEntry, CacheStore, KeyWithPrefix, Prefix
+
+logger: Final[logging.Logger] = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, slots=True)
+class CacheStats:
+    hits: int
+    misses: int
+    evictions: int
+    entries: int
+
+    @property
+    def hit_ratio(self) -> float:
+        total: int = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class InMemoryCacheStore(CacheStore):
+    """
+    Bounded cache in the memory of the current process.
+    Entries expire by TTL, and least recently used entries are evicted when cache is full.
+    """
+
+    def __init__(self, max_entries: int) -> None:
+        self._max_entries: Final[int] = max_entries
+        # Full key -> (expiration time by monotonic clock, value)
+        self._entries: Final[OrderedDict[str, tuple[float, Any]]] = OrderedDict()
+        self._hits: int = 0
+        self._misses: int = 0
+        self._evictions: int = 0
+
+    @property
+    def stats(self) -> CacheStats:
+        return CacheStats(
+            hits=self._hits,
+            misses=self._misses,
+            evictions=self._evictions,
+            entries=len(self._entries),
+        )
+
+    @override
+    async def set(
+            self,
+            key: KeyWithPrefix,
+            value: Any,
+            ttl: int = 30,
+    ) -> None:
+        full_key: str = self.__build_full_key(key)
+        self._entries[full_key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(full_key)
+
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+            self._evictions += 1
+
+    @override
+    async def get(
+            self,
+            key: KeyWithPrefix,
+            default: Any | None = None
+    ) -> Any:
+        full_key: str = self.__build_full_key(key)
+        entry: tuple[float, Any] | None = self._entries.get(full_key)
+
+        if entry is None:
+            self._misses += 1
+            return default
+
+        expires_at, value = entry
+
+        if expires_at <= time.monotonic():
+            del self._entries[full_key]
+            self._misses += 1
+            return default
+
+        self._entries.move_to_end(full_key)
+        self._hits += 1
+        return value
+
+    @override
+    async def get_many(
+            self,
+            keys: Sequence[KeyWithPrefix],
+            default: Any | None = None
+    ) -> list[Any]:
+        return [await self.get(key, default=default) for key in keys]
+
+    @override
+    async def set_many(self, entries: Sequence[CacheEntry]) -> None:
+        for entry in entries:
+            await self.set(key=entry.key, value=entry.value, ttl=entry.ttl)
+
+    @override
+    async def delete(self, key_with_prefix: KeyWithPrefix) -> None:
+        self._entries.pop(self.__build_full_key(key_with_prefix), None)
+
+    @override
+    async def clear_by_prefix(self, prefix: Prefix) -> None:
+        pattern: str = f"{prefix.value}:"
+
+        for full_key in [full_key for full_key in self._entries if full_key.startswith(pattern)]:
+            del self._entries[full_key]
+
+    @override
+    async def exists(self, key: KeyWithPrefix) -> bool:
+        entry: tuple[float, Any] | None = self._entries.get(self.__build_full_key(key))
+        return entry is not None and entry[0] > time.monotonic()
+
+    @staticmethod
+    def __build_full_key(key: KeyWithPrefix) -> str:
+        return f"{key.prefix.value}:{key.key.value}"
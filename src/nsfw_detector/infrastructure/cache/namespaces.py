@@ -0,0 +1,74 @@
+import logging
+import time
+from typing import Final
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from nsfw_detector.infrastructure.cache.base import Prefix
+
+logger: Final[logging.Logger] = logging.getLogger(__name__)
+
+
+class CacheNamespace:
+    """
+    Versioned prefix of cache keys: ``<name>:<model version>:<generation>``.
+
+    Verdicts of another model never match, because the model version is a part of the prefix.
+    Generation is a counter in Redis, so all entries of the namespace are invalidated at once
+    by incrementing it, without deleting them: old entries are not read anymore and expire by TTL.
+
+    Generation is cached in the process and re-read every ``refresh_seconds``, so an invalidation
+    made by one instance reaches the others within this interval without a round trip per request.
+    """
+
+    def __init__(self, redis: Redis, name: str, model_version: str, refresh_seconds: float) -> None:
+        self._redis: Final[Redis] = redis
+        self._name: Final[str] = name
+        self._model_version: Final[str] = model_version
+        self._refresh_seconds: Final[float] = refresh_seconds
+        # Counter lives outside the namespace, so clearing by its prefix doesn't reset it
+        self._generation_key: Final[str] = f"cache_generation:{name}"
+        self._generation: int = 0
+        self._refreshed_at: float | None = None
+
+    @property
+    def root(self) -> Prefix:
+        """Prefix of entries of all model versions and generations"""
+        return Prefix(self._name)
+
+    async def prefix(self) -> Prefix:
+        await self.__refresh()
+        return self.__build_prefix(self._generation)
+
+    async def invalidate(self) -> Prefix:
+        """
+        Switches the namespace to the next generation.
+
+        Returns:
+            Prefix: Prefix of the previous generation, its entries can be deleted
+        """
+        await self.__refresh()
+        previous: Prefix = self.__build_prefix(self._generation)
+
+        self._generation = await self._redis.incr(self._generation_key)
+        self._refreshed_at = time.monotonic()
+        logger.info("Cache namespace %s is switched to generation %s", self._name, self._generation)
+        return previous
+
+    async def __refresh(self) -> None:
+        if self._refreshed_at is not None and time.monotonic() - self._refreshed_at < self._refresh_seconds:
+            return
+
+        # Marked before the round trip, so concurrent requests don't refresh it at the same time
+        self._refreshed_at = time.monotonic()
+        try:
+            generation: bytes | None = await self._redis.get(self._generation_key)
+        except RedisError:
+            logger.warning("Failed to refresh generation of cache namespace %s, keeping %s", self._name, self._generation)
+            return
+
+        self._generation = int(generation or 0)
+
+    def __build_prefix(self, generation: int) -> Prefix:
+        return Prefix(f"{self._name}:{self._model_version}:{generation}")
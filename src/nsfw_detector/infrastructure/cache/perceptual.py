@@ -0,0 +1,239 @@
+import io
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Final
+
+from PIL import Image
+from redis.asyncio import Redis
+from redis.asyncio.client import Pipeline
+
+logger: Final[logging.Logger] = logging.getLogger(__name__)
+
+HASH_BITS: Final[int] = 64
+_HASH_WIDTH: Final[int] = 9
+_HASH_HEIGHT: Final[int] = 8
+
+
+def compute_dhash(data: bytes) -> int | None:
+    """
+    Computes 64-bit difference hash of the image.
+    Re-encoded, resized or metadata-stripped copies of the image get the same or a close hash.
+    Animations get no hash: it would describe only the first frame, while any frame can be NSFW.
+    """
+    image: Image.Image = Image.open(io.BytesIO(data))
+    if getattr(image, "is_animated", False):
+        return None
+
+    # JPEG is decoded at reduced scale right away, full resolution is not needed for 9x8 hash
+    image.draft("L", (_HASH_WIDTH * 8, _HASH_HEIGHT * 8))
+    pixels: bytes = (
+        image
+        .convert("L")
+        .resize((_HASH_WIDTH, _HASH_HEIGHT), Image.Resampling.BILINEAR, reducing_gap=2.0)
+        .tobytes()
+    )
+
+    dhash: int = 0
+    for row in range(_HASH_HEIGHT):
+        for column in range(_HASH_WIDTH - 1):
+            position: int = row * _HASH_WIDTH + column
+            dhash = (dhash << 1) | (pixels[position] > pixels[position + 1])
+
+    return dhash
+
+
+@dataclass(frozen=True, slots=True)
+class _IndexEntry:
+    value: Any
+    written_at: float
+
+
+class PerceptualHashIndex:
+    """
+    Index of perceptual hashes for lookups of the nearest hash within Hamming distance.
+
+    Uses multi-index hashing: hash is split into ``max_distance + 1`` bands, and by pigeonhole
+    principle any hash within ``max_distance`` equals the query in at least one band.
+    So lookup is a few dictionary probes and verification of a small set of candidates.
+
+    Entries live in memory, and can be persisted to a Redis hash to survive restarts.
+    Entries belong to a cache namespace, so they are dropped when the namespace is invalidated.
+    Each entry remembers when it was written and is a miss after ``ttl`` seconds, like the exact verdict
+    cached alongside it. When the index is full, the oldest entries are evicted, so new images are still indexed.
+    Persisted entries are expired and evicted the same way, and the whole hash expires ``ttl`` seconds
+    after the last write, so an index which is no longer written doesn't stay in Redis forever.
+    """
+
+    def __init__(
+            self,
+            max_distance: int,
+            max_entries: int,
+            redis: Redis | None = None,
+            ttl: int | None = None,
+    ) -> None:
+        self._max_distance: Final[int] = max_distance
+        self._max_entries: Final[int] = max_entries
+        self._redis: Final[Redis | None] = redis
+        self._ttl: Final[int | None] = ttl
+        self._bands: Final[list[tuple[int, int]]] = self.__split_into_bands(max_distance + 1)
+        self._tables: Final[list[dict[int, list[int]]]] = [{} for _ in self._bands]
+        # Ordered by time of writing, so the oldest entries are expired and evicted from the start
+        self._entries: Final[OrderedDict[int, _IndexEntry]] = OrderedDict()
+        self._namespace: str | None = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def _redis_key(self) -> str:
+        # Persisted entries live under the prefix of the namespace, so they are cleared with it
+        return f"{self._namespace}:phash"
+
+    async def use_namespace(self, namespace: str) -> None:
+        """
+        Switches the index to entries of the cache namespace and loads its persisted entries.
+        Entries of the previous namespace were computed by another model or before invalidation, so they are dropped.
+        """
+        if namespace == self._namespace:
+            return
+
+        if self._namespace is not None:
+            logger.info("Cache namespace is changed to %s, dropping %s perceptual hashes", namespace, len(self))
+
+        self._namespace = namespace
+        self._entries.clear()
+        for table in self._tables:
+            table.clear()
+
+        await self.__load()
+
+    async def __load(self) -> None:
+        """Loads the newest persisted entries from Redis, expired ones are deleted"""
+        if self._redis is None:
+            return
+
+        now: float = time.time()
+        persisted: list[tuple[int, _IndexEntry]] = []
+        expired: list[str] = []
+
+        async for field, value in self._redis.hscan_iter(self._redis_key):
+            field = field.decode() if isinstance(field, bytes) else field
+            entry: _IndexEntry = self.__deserialize(value.decode() if isinstance(value, bytes) else value)
+            if self.__is_expired(entry, now):
+                expired.append(field)
+            else:
+                persisted.append((int(field, 16), entry))
+
+        persisted.sort(key=lambda item: item[1].written_at)
+        for dhash, entry in persisted[-self._max_entries:]:
+            self.__insert(dhash, entry)
+
+        if expired:
+            await self._redis.hdel(self._redis_key, *expired)
+        logger.info("Loaded %s perceptual hashes, %s expired ones are deleted", len(self._entries), len(expired))
+
+    def find(self, dhash: int) -> Any | None:
+        """Returns value of the closest stored hash within ``max_distance`` which is not expired, or None"""
+        now: float = time.time()
+        if (exact := self._entries.get(dhash)) is not None and not self.__is_expired(exact, now):
+            return exact.value
+
+        best_distance: int = self._max_distance + 1
+        best_hash: int | None = None
+
+        for table, band in zip(self._tables, self._bands):
+            for candidate in table.get(self.__band_value(dhash, band), ()):
+                distance: int = (candidate ^ dhash).bit_count()
+                if distance < best_distance and not self.__is_expired(self._entries[candidate], now):
+                    best_distance, best_hash = distance, candidate
+
+        return None if best_hash is None else self._entries[best_hash].value
+
+    async def add(self, dhash: int, value: Any) -> None:
+        entry: _IndexEntry = _IndexEntry(value=value, written_at=time.time())
+        removed: list[int] = self.__remove_expired(entry.written_at)
+
+        if dhash not in self._entries and len(self._entries) >= self._max_entries:
+            evicted: int = next(iter(self._entries))
+            self.__remove(evicted)
+            removed.append(evicted)
+            logger.debug("Perceptual hash index is full, hash %x is evicted", evicted)
+
+        self.__insert(dhash, entry)
+
+        if self._redis is not None and self._namespace is not None:
+            pipeline: Pipeline
+            async with self._redis.pipeline(transaction=False) as pipeline:
+                pipeline.hset(self._redis_key, f"{dhash:016x}", self.__serialize(entry))
+                if deleted_fields := [f"{removed_hash:016x}" for removed_hash in removed if removed_hash != dhash]:
+                    pipeline.hdel(self._redis_key, *deleted_fields)
+                if self._ttl is not None:
+                    pipeline.expire(self._redis_key, self._ttl)
+                await pipeline.execute()
+
+    def __is_expired(self, entry: _IndexEntry, now: float) -> bool:
+        return self._ttl is not None and now - entry.written_at >= self._ttl
+
+    def __remove_expired(self, now: float) -> list[int]:
+        expired: list[int] = []
+        for dhash, entry in self._entries.items():
+            if not self.__is_expired(entry, now):
+                break
+            expired.append(dhash)
+
+        for dhash in expired:
+            self.__remove(dhash)
+        return expired
+
+    def __insert(self, dhash: int, entry: _IndexEntry) -> None:
+        if dhash not in self._entries:
+            for table, band in zip(self._tables, self._bands):
+                table.setdefault(self.__band_value(dhash, band), []).append(dhash)
+
+        # Rewritten entry is the newest one again
+        self._entries[dhash] = entry
+        self._entries.move_to_end(dhash)
+
+    def __remove(self, dhash: int) -> None:
+        del self._entries[dhash]
+        for table, band in zip(self._tables, self._bands):
+            band_value: int = self.__band_value(dhash, band)
+            candidates: list[int] = table[band_value]
+            candidates.remove(dhash)
+            if not candidates:
+                del table[band_value]
+
+    @staticmethod
+    def __serialize(entry: _IndexEntry) -> str:
+        # Stored as "<time of writing>;<value>". Vectors of scores are stored as comma separated floats,
+        # plain outputs never contain commas
+        value: Any = entry.value
+        serialized: str = ",".join(repr(item) for item in value) if isinstance(value, tuple) else str(value)
+        return f"{entry.written_at!r};{serialized}"
+
+    @staticmethod
+    def __deserialize(serialized: str) -> _IndexEntry:
+        written_at, _, value = serialized.partition(";")
+        if "," in value:
+            return _IndexEntry(value=tuple(float(item) for item in value.split(",")), written_at=float(written_at))
+        return _IndexEntry(value=value, written_at=float(written_at))
+
+    @staticmethod
+    def __band_value(dhash: int, band: tuple[int, int]) -> int:
+        shift, mask = band
+        return (dhash >> shift) & mask
+
+    @staticmethod
+    def __split_into_bands(amount: int) -> list[tuple[int, int]]:
+        """Splits bits of the hash into ``amount`` bands as even as possible, returns (shift, mask) of each"""
+        bands: list[tuple[int, int]] = []
+        shift: int = 0
+
+        for band in range(amount):
+            width: int = HASH_BITS // amount + (band < HASH_BITS % amount)
+            bands.append((shift, (1 << width) - 1))
+            shift += width
+
+        return bands
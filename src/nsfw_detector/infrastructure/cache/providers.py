@@ -1,21 +1,87 @@
 from typing import AsyncIterator
 
-from redis import ConnectionPool
-from redis.asyncio import Redis
+from redis.asyncio import BlockingConnectionPool, ConnectionPool, Redis
 
-from nsfw_detector.setup.configs import RedisConfig
+from nsfw_detector.infrastructure.cache.base import CacheStore
+from nsfw_detector.infrastructure.cache.codecs import CacheCodec, CompactCodec, PickleZlibCodec
+from nsfw_detector.infrastructure.cache.impl import RedisCacheStore
+from nsfw_detector.infrastructure.cache.memory import InMemoryCacheStore
+from nsfw_detector.infrastructure.cache.namespaces import CacheNamespace
+from nsfw_detector.infrastructure.cache.perceptual import PerceptualHashIndex
+from nsfw_detector.infrastructure.cache.tiered import TieredCacheStore
+from nsfw_detector.infrastructure.concurrency.single_flight import SingleFlight
+from nsfw_detector.infrastructure.metrics.instruments import CACHE_HIT_RATIO, IN_FLIGHT
+from nsfw_detector.setup.configs import CacheConfig, RedisConfig
 
 
-async def get_redis_pool(redis_config: RedisConfig) -> ConnectionPool:
-    return ConnectionPool.from_url(
+async def get_redis_pool(redis_config: RedisConfig) -> AsyncIterator[ConnectionPool]:
+    # Blocking pool makes bursts of concurrent commands wait for a connection instead of failing
+    pool: ConnectionPool = BlockingConnectionPool.from_url(
         url=redis_config.url,
-        max_connections=20,
+        max_connections=redis_config.max_connections,
+        timeout=redis_config.pool_timeout,
         decode_responses=False,
     )
+    try:
+        yield pool
+    finally:
+        await pool.disconnect()
+
 
 async def get_redis(connection_pool: ConnectionPool) -> AsyncIterator[Redis]:
-    client: Redis = Redis.from_pool(connection_pool=connection_pool)
+    # Client doesn't own the pool, so closing it only releases its connection
+    client: Redis = Redis(connection_pool=connection_pool)
     try:
         yield client
     finally:
-        await client.close()
+        await client.aclose()
+
+
+def get_cache_codec(cache_config: CacheConfig) -> CacheCodec:
+    if cache_config.codec == "pickle":
+        return PickleZlibCodec()
+    return CompactCodec(compress_threshold=cache_config.compress_threshold)
+
+
+def get_in_memory_cache_store(cache_config: CacheConfig) -> InMemoryCacheStore:
+    store: InMemoryCacheStore = InMemoryCacheStore(max_entries=cache_config.l1_max_entries)
+    CACHE_HIT_RATIO.labels("l1").set_function(lambda: store.stats.hit_ratio)
+    return store
+
+
+def get_single_flight() -> SingleFlight:
+    single_flight: SingleFlight = SingleFlight()
+    IN_FLIGHT.labels("coalesced_checks").set_function(lambda: single_flight.in_flight)
+    return single_flight
+
+
+def get_cache_store(
+        l1: InMemoryCacheStore,
+        l2: RedisCacheStore,
+        cache_config: CacheConfig,
+) -> CacheStore:
+    return TieredCacheStore(l1=l1, l2=l2, l1_max_ttl=cache_config.l1_max_ttl)
+
+
+def get_image_cache_namespace(redis: Redis, cache_config: CacheConfig) -> CacheNamespace:
+    return CacheNamespace(
+        redis=redis,
+        name="nsfw_image",
+        model_version=cache_config.model_version,
+        refresh_seconds=cache_config.version_refresh_seconds,
+    )
+
+
+async def get_perceptual_hash_index(
+        redis: Redis,
+        cache_config: CacheConfig,
+        cache_namespace: CacheNamespace,
+) -> PerceptualHashIndex:
+    index: PerceptualHashIndex = PerceptualHashIndex(
+        max_distance=cache_config.phash_max_distance,
+        max_entries=cache_config.phash_max_entries,
+        redis=redis if cache_config.phash_persist else None,
+        ttl=cache_config.ttl,
+    )
+    await index.use_namespace((await cache_namespace.prefix()).value)
+    return index
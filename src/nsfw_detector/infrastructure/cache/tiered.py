@@ -0,0 +1,108 @@
+import math
+from typing import Any, Final, Sequence
+
+from typing_extensions import override
+
+from nsfw_detector.infrastructure.cache.base import MISSING, CacheEntry, CacheStore, KeyWithPrefix, Prefix
+from nsfw_detector.infrastructure.cache.impl import RedisCacheStore
+from nsfw_detector.infrastructure.cache.memory import InMemoryCacheStore
+
+
+class TieredCacheStore(CacheStore):
+    """
+    Two level cache: in-process L1 in front of shared L2 (Redis).
+    Repeated reads are served from the memory of the process without network round trip.
+
+    L1 entries never outlive their L2 entries and live in L1 at most ``l1_max_ttl`` seconds.
+    Entries read through from L2 are read together with their remaining TTL in the same round trip,
+    so L1 doesn't serve them after Redis expired them.
+    """
+
+    def __init__(self, l1: InMemoryCacheStore, l2: RedisCacheStore, l1_max_ttl: int) -> None:
+        self._l1: Final[InMemoryCacheStore] = l1
+        self._l2: Final[RedisCacheStore] = l2
+        self._l1_max_ttl: Final[int] = l1_max_ttl
+
+    @override
+    async def set(
+            self,
+            key: KeyWithPrefix,
+            value: Any,
+            ttl: int = 30,
+    ) -> None:
+        await self._l2.set(key=key, value=value, ttl=ttl)
+        await self._l1.set(key=key, value=value, ttl=min(ttl, self._l1_max_ttl))
+
+    @override
+    async def get(
+            self,
+            key: KeyWithPrefix,
+            default: Any | None = None
+    ) -> Any:
+        value: Any = await self._l1.get(key, default=MISSING)
+
+        if value is not MISSING:
+            return value
+
+        value, remaining_ttl = await self._l2.get_with_ttl(key, default=MISSING)
+
+        if value is MISSING:
+            return default
+
+        if (l1_ttl := self.__l1_ttl(remaining_ttl)) > 0:
+            await self._l1.set(key=key, value=value, ttl=l1_ttl)
+        return value
+
+    @override
+    async def get_many(
+            self,
+            keys: Sequence[KeyWithPrefix],
+            default: Any | None = None
+    ) -> list[Any]:
+        values: list[Any] = await self._l1.get_many(keys, default=MISSING)
+        missed: list[int] = [position for position, value in enumerate(values) if value is MISSING]
+
+        if missed:
+            # Keys missed by L1 are read from L2 in one round trip
+            l2_values: list[tuple[Any, float | None]] = await self._l2.get_many_with_ttl(
+                [keys[position] for position in missed],
+                default=MISSING,
+            )
+            found: list[CacheEntry] = []
+
+            for position, (value, remaining_ttl) in zip(missed, l2_values):
+                values[position] = value
+                if value is not MISSING and (l1_ttl := self.__l1_ttl(remaining_ttl)) > 0:
+                    found.append(CacheEntry(key=keys[position], value=value, ttl=l1_ttl))
+
+            await self._l1.set_many(found)
+
+        return [default if value is MISSING else value for value in values]
+
+    @override
+    async def set_many(self, entries: Sequence[CacheEntry]) -> None:
+        await self._l2.set_many(entries)
+        await self._l1.set_many([
+            CacheEntry(key=entry.key, value=entry.value, ttl=min(entry.ttl, self._l1_max_ttl))
+            for entry in entries
+        ])
+
+    @override
+    async def delete(self, key_with_prefix: KeyWithPrefix) -> None:
+        await self._l1.delete(key_with_prefix)
+        await self._l2.delete(key_with_prefix)
+
+    @override
+    async def clear_by_prefix(self, prefix: Prefix) -> None:
+        await self._l1.clear_by_prefix(prefix)
+        await self._l2.clear_by_prefix(prefix)
+
+    @override
+    async def exists(self, key: KeyWithPrefix) -> bool:
+        return await self._l1.exists(key) or await self._l2.exists(key)
+
+    def __l1_ttl(self, remaining_ttl: float | None) -> int:
+        # Rounded down, so an L1 entry expires no later than its L2 entry
+        if remaining_ttl is None:
+            return self._l1_max_ttl
+        return min(self._l1_max_ttl, math.floor(remaining_ttl))
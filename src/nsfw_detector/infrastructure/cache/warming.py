@@ -0,0 +1,217 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from dataclasses import asdict, dataclass, replace
+from itertools import islice
+from pathlib import Path
+from typing import Any, Final, Iterator
+
+from nsfw_detector.application.common.ports.images.query_gateway import ImageQueryGateway
+from nsfw_detector.application.queries.images.check_image_is_nsfw import ALLOWED_EXTENSIONS
+from nsfw_detector.application.queries.images.view_models import NSFWImageInformation
+from nsfw_detector.infrastructure.adapters.images.verdicts import to_cached_verdict
+from nsfw_detector.infrastructure.cache.base import MISSING, CacheEntry, CacheStore, Key, KeyWithPrefix, Prefix
+from nsfw_detector.infrastructure.cache.namespaces import CacheNamespace
+from nsfw_detector.infrastructure.errors.inference import InferenceOverloadedError
+
+logger: Final[logging.Logger] = logging.getLogger(__name__)
+
+_MAX_OVERLOADED_ATTEMPTS: Final[int] = 5
+
+
+@dataclass(frozen=True, slots=True)
+class CacheWarmingProgress:
+    """
+    Progress of warming, it is also the checkpoint from which an interrupted run is resumed.
+
+    Prefix is the cache namespace the images were warmed in, so a run is not resumed after the model version
+    or the generation has changed: entries warmed before would not be read anymore.
+    """
+
+    source: str
+    prefix: str
+    processed: int = 0
+    warmed: int = 0
+    skipped: int = 0
+    failed: int = 0
+
+
+@dataclass(frozen=True, slots=True)
+class _ImageFile:
+    path: Path
+    data: bytes
+    content_hash: str
+
+
+def iter_image_paths(source: Path) -> Iterator[Path]:
+    """
+    Lists images of the corpus in a stable order, so a checkpoint refers to the same entries on resume.
+
+    Source is a directory, which is searched recursively, or a manifest: text file with one path per line,
+    relative to the manifest, empty lines and lines starting with ``#`` are ignored.
+    """
+    if source.is_dir():
+        for path in sorted(source.rglob("*")):
+            if path.is_file() and path.suffix.lower().lstrip(".") in ALLOWED_EXTENSIONS:
+                yield path
+        return
+
+    with source.open() as manifest:
+        for line in manifest:
+            if (entry := line.strip()) and not entry.startswith("#"):
+                yield source.parent / entry
+
+
+class CacheWarmer:
+    """
+    Checks a corpus of known images with the configured backend, so their verdicts are cached
+    before traffic arrives: after a Redis flush or before switching to a new model version.
+
+    Images are processed in batches: files are read and hashed, entries already cached are found
+    with one ``get_many`` and skipped, and the rest is checked with bounded concurrency.
+    Verdicts of a batch are written with one ``set_many`` under the same keys as verdicts of requests,
+    with their own TTL, so a warmed corpus may outlive entries cached by traffic. The gateway is expected
+    to be the backend without cache decorators, so the warmer is the only one writing these verdicts
+    and a corpus image never gets a verdict borrowed from its near duplicate.
+    Progress is saved after each batch, so an interrupted run continues where it stopped.
+    """
+
+    def __init__(
+            self,
+            gateway: ImageQueryGateway,
+            cache_store: CacheStore,
+            cache_namespace: CacheNamespace,
+            concurrency: int,
+            batch_size: int,
+            max_image_bytes: int,
+            ttl: int,
+    ) -> None:
+        self._gateway: Final[ImageQueryGateway] = gateway
+        self._cache_store: Final[CacheStore] = cache_store
+        self._cache_namespace: Final[CacheNamespace] = cache_namespace
+        self._semaphore: Final[asyncio.Semaphore] = asyncio.Semaphore(concurrency)
+        self._batch_size: Final[int] = batch_size
+        self._max_image_bytes: Final[int] = max_image_bytes
+        self._ttl: Final[int] = ttl
+
+    async def run(self, source: Path, checkpoint: Path | None = None) -> CacheWarmingProgress:
+        prefix: Prefix = await self._cache_namespace.prefix()
+        progress: CacheWarmingProgress = self.__load_checkpoint(source, prefix, checkpoint)
+        if progress.processed:
+            logger.info("Resuming warming of %s after %s images", source, progress.processed)
+
+        paths: Iterator[Path] = islice(iter_image_paths(source), progress.processed, None)
+        started_at: float = time.monotonic()
+
+        while batch := list(islice(paths, self._batch_size)):
+            progress = await self.__warm_batch(batch, progress)
+            self.__save_checkpoint(progress, checkpoint)
+
+            logger.info(
+                "Processed %s images in %.1fs: %s warmed, %s already cached, %s failed",
+                progress.processed,
+                time.monotonic() - started_at,
+                progress.warmed,
+                progress.skipped,
+                progress.failed,
+            )
+
+        return progress
+
+    async def __warm_batch(self, batch: list[Path], progress: CacheWarmingProgress) -> CacheWarmingProgress:
+        files: list[_ImageFile | None] = await asyncio.gather(*(asyncio.to_thread(self.__read, path) for path in batch))
+        readable: list[_ImageFile] = [file for file in files if file is not None]
+
+        prefix: Prefix = await self._cache_namespace.prefix()
+        if prefix.value != progress.prefix:
+            # Verdicts warmed so far are not read anymore, the run must be started over in the new namespace
+            raise ValueError(f"Cache namespace was switched from {progress.prefix} to {prefix.value} during warming")
+
+        cached: list[Any] = await self._cache_store.get_many(
+            [KeyWithPrefix(prefix=prefix, key=Key(file.content_hash)) for file in readable],
+            default=MISSING,
+        )
+        missing: list[_ImageFile] = [file for file, value in zip(readable, cached) if value is MISSING]
+
+        results: list[NSFWImageInformation | None] = await asyncio.gather(*(self.__warm(file) for file in missing))
+        entries: list[CacheEntry] = [
+            CacheEntry(
+                key=KeyWithPrefix(prefix=prefix, key=Key(file.content_hash)),
+                value=to_cached_verdict(information),
+                ttl=self._ttl,
+            )
+            for file, information in zip(missing, results)
+            if information is not None
+        ]
+        if entries:
+            await self._cache_store.set_many(entries)
+
+        return replace(
+            progress,
+            processed=progress.processed + len(batch),
+            warmed=progress.warmed + len(entries),
+            skipped=progress.skipped + len(readable) - len(missing),
+            failed=progress.failed + len(batch) - len(readable) + len(missing) - len(entries),
+        )
+
+    async def __warm(self, file: _ImageFile) -> NSFWImageInformation | None:
+        async with self._semaphore:
+            for attempt in range(1, _MAX_OVERLOADED_ATTEMPTS + 1):
+                try:
+                    information: NSFWImageInformation = await self._gateway.check_image_is_nsfw_by_file(
+                        data=file.data,
+                        content_hash=file.content_hash,
+                    )
+                except InferenceOverloadedError as error:
+                    # Warming must not push away real traffic, so it waits as long as it is asked to
+                    logger.warning("Inference is overloaded, attempt %s for %s is delayed", attempt, file.path)
+                    await asyncio.sleep(error.retry_after_seconds)
+                except Exception as error:  # noqa: BLE001
+                    logger.warning("Failed to check %s: %s", file.path, error)
+                    return None
+                else:
+                    return information if information.status == "success" else None
+
+        logger.warning("Inference stayed overloaded, %s is not warmed", file.path)
+        return None
+
+    def __read(self, path: Path) -> _ImageFile | None:
+        try:
+            if path.stat().st_size > self._max_image_bytes:
+                logger.warning("%s is larger than %s bytes, skipping it", path, self._max_image_bytes)
+                return None
+            data: bytes = path.read_bytes()
+        except OSError as error:
+            logger.warning("Failed to read %s: %s", path, error)
+            return None
+
+        return _ImageFile(path=path, data=data, content_hash=hashlib.sha256(data).hexdigest())
+
+    @staticmethod
+    def __load_checkpoint(source: Path, prefix: Prefix, checkpoint: Path | None) -> CacheWarmingProgress:
+        if checkpoint is None or not checkpoint.exists():
+            return CacheWarmingProgress(source=str(source), prefix=prefix.value)
+
+        saved: dict[str, Any] = json.loads(checkpoint.read_text())
+        if saved.get("source") != str(source):
+            raise ValueError(f"Checkpoint {checkpoint} belongs to {saved.get('source')}, not to {source}")
+        # Checkpoints without a prefix can't prove their entries are still read, so they are not resumed either
+        if saved.get("prefix") != prefix.value:
+            raise ValueError(
+                f"Checkpoint {checkpoint} was made in cache namespace {saved.get('prefix')}, not in {prefix.value}, "
+                "delete it to warm the cache from the start"
+            )
+        return CacheWarmingProgress(**saved)
+
+    @staticmethod
+    def __save_checkpoint(progress: CacheWarmingProgress, checkpoint: Path | None) -> None:
+        if checkpoint is None:
+            return
+
+        # Replaced atomically, so the checkpoint is never half written if the run is killed
+        temporary: Path = checkpoint.with_name(f"{checkpoint.name}.tmp")
+        temporary.write_text(json.dumps(asdict(progress)))
+        os.replace(temporary, checkpoint)
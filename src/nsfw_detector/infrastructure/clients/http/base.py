@@ -1,7 +1,7 @@
 import json
 from abc import abstractmethod
 from dataclasses import dataclass, field
-from typing import Any, Protocol
+from typing import Any, NewType, Protocol
 
 
 @dataclass(frozen=True, slots=True)
@@ -35,6 +35,25 @@ class HttpClient(Protocol):
     ) -> HttpResponse:
         ...
 
+    @abstractmethod
+    async def get_limited(
+            self,
+            url: str,
+            max_bytes: int,
+            headers: dict[str, str] | None = None,
+            timeout: float | None = None,
+            chunk_size: int = 65536,
+    ) -> HttpResponse:
+        """
+        GET which doesn't follow redirects and reads the body in chunks,
+        so a body larger than ``max_bytes`` is never held in memory.
+
+        :raises ResponseTooLargeError: if the body crosses ``max_bytes``
+        :raises RemoteRequestTimeoutError: if the response is not read in time
+        :raises RemoteRequestFailedError: if the connection fails
+        """
+        ...
+
     @abstractmethod
     async def post(
             self,
@@ -55,3 +74,7 @@ class HttpClient(Protocol):
             timeout: float | None = None
     ) -> HttpResponse:
         ...
+
+
+# Client of downloads by user supplied URLs, it doesn't connect to addresses outside of the internet
+UrlFetchHttpClient = NewType("UrlFetchHttpClient", HttpClient)
@@ -1,9 +1,15 @@
+import asyncio
 from typing import Final, Any
 
-from aiohttp import ClientSession, ClientTimeout, FormData
+from aiohttp import ClientError, ClientSession, ClientTimeout, FormData
 from typing_extensions import override
 
 from nsfw_detector.infrastructure.clients.http.base import HttpClient, HttpResponse, DataForForm
+from nsfw_detector.infrastructure.errors.http import (
+    RemoteRequestFailedError,
+    RemoteRequestTimeoutError,
+    ResponseTooLargeError,
+)
 
 
 class AioHTTPClient(HttpClient):
@@ -22,7 +28,7 @@ class AioHTTPClient(HttpClient):
                 url,
                 headers=headers,
                 params=params,
-                timeout=ClientTimeout(timeout)
+                timeout=self.__timeout(timeout)
         ) as response:
             return HttpResponse(
                 status=response.status,
@@ -30,6 +36,42 @@ class AioHTTPClient(HttpClient):
                 headers=response.headers,
             )
 
+    @override
+    async def get_limited(
+            self,
+            url: str,
+            max_bytes: int,
+            headers: dict[str, str] | None = None,
+            timeout: float | None = None,
+            chunk_size: int = 65536,
+    ) -> HttpResponse:
+        try:
+            async with self._session.get(
+                    url,
+                    headers=headers,
+                    timeout=self.__timeout(timeout),
+                    allow_redirects=False,
+            ) as response:
+                # Declared size is checked before the body is read, actual size is checked while reading
+                if response.content_length is not None and response.content_length > max_bytes:
+                    raise ResponseTooLargeError(f"Response of {url} is larger than {max_bytes} bytes")
+
+                body: bytearray = bytearray()
+                async for chunk in response.content.iter_chunked(chunk_size):
+                    if len(body) + len(chunk) > max_bytes:
+                        raise ResponseTooLargeError(f"Response of {url} is larger than {max_bytes} bytes")
+                    body += chunk
+
+                return HttpResponse(
+                    status=response.status,
+                    body=bytes(body),
+                    headers=response.headers,
+                )
+        except asyncio.TimeoutError as error:
+            raise RemoteRequestTimeoutError(f"Request to {url} timed out") from error
+        except ClientError as error:
+            raise RemoteRequestFailedError(f"Request to {url} failed: {error}") from error
+
     @override
     async def post(
             self,
@@ -44,7 +86,7 @@ class AioHTTPClient(HttpClient):
                 data=data,
                 json=json_data,
                 headers=headers,
-                timeout=ClientTimeout(timeout)
+                timeout=self.__timeout(timeout)
         ) as response:
             return HttpResponse(
                 status=response.status,
@@ -73,10 +115,16 @@ class AioHTTPClient(HttpClient):
                 url=url,
                 headers=headers,
                 data=form,
-                timeout=ClientTimeout(timeout)
+                timeout=self.__timeout(timeout)
         ) as response:
             return HttpResponse(
                 status=response.status,
                 body=await response.read(),
                 headers=response.headers,
             )
+
+    def __timeout(self, timeout: float | None) -> ClientTimeout:
+        # Without explicit timeout the defaults of the session are used instead of disabling timeouts at all
+        if timeout is None:
+            return self._session.timeout
+        return ClientTimeout(total=timeout, connect=self._session.timeout.connect)
@@ -1,8 +1,49 @@
 from typing import AsyncIterator
 
-from aiohttp import ClientSession
+from aiohttp import ClientSession, ClientTimeout, TCPConnector
+from aiohttp.abc import AbstractResolver
 
+from nsfw_detector.infrastructure.clients.http.base import UrlFetchHttpClient
+from nsfw_detector.infrastructure.clients.http.impl import AioHTTPClient
+from nsfw_detector.infrastructure.clients.http.resolver import GlobalAddressResolver
+from nsfw_detector.infrastructure.concurrency.host_limiter import PerHostLimiter
+from nsfw_detector.infrastructure.metrics.instruments import IN_FLIGHT
+from nsfw_detector.setup.configs import HttpClientConfig, UrlFetchConfig
 
-async def get_client() -> AsyncIterator[ClientSession]:
-    async with ClientSession() as session:
+
+async def get_client(http_client_config: HttpClientConfig) -> AsyncIterator[ClientSession]:
+    # Session owns the connector, so closing it closes all pooled connections
+    async with _open_session(http_client_config) as session:
         yield session
+
+
+async def get_url_fetch_client(
+        http_client_config: HttpClientConfig,
+        url_fetch_config: UrlFetchConfig,
+) -> AsyncIterator[UrlFetchHttpClient]:
+    # URLs come from users, so their downloads have own pool whose names are resolved only to global addresses
+    resolver: AbstractResolver | None = None if url_fetch_config.allow_private_hosts else GlobalAddressResolver()
+    async with _open_session(http_client_config, resolver=resolver) as session:
+        yield UrlFetchHttpClient(AioHTTPClient(session))
+
+
+def get_host_limiter(url_fetch_config: UrlFetchConfig) -> PerHostLimiter:
+    limiter: PerHostLimiter = PerHostLimiter(limit=url_fetch_config.max_concurrency_per_host)
+    IN_FLIGHT.labels("url_fetch_hosts").set_function(lambda: limiter.hosts)
+    return limiter
+
+
+def _open_session(http_client_config: HttpClientConfig, resolver: AbstractResolver | None = None) -> ClientSession:
+    connector: TCPConnector = TCPConnector(
+        limit=http_client_config.limit,
+        limit_per_host=http_client_config.limit_per_host,
+        ttl_dns_cache=http_client_config.ttl_dns_cache,
+        keepalive_timeout=http_client_config.keepalive_timeout,
+        resolver=resolver,
+    )
+    timeout: ClientTimeout = ClientTimeout(
+        total=http_client_config.total_timeout,
+        connect=http_client_config.connect_timeout,
+        sock_read=http_client_config.sock_read_timeout,
+    )
+    return ClientSession(connector=connector, timeout=timeout)
@@ -0,0 +1,70 @@
+import ipaddress
+import socket
+from typing import Final
+
+from aiohttp.abc import AbstractResolver, ResolveResult
+from aiohttp.resolver import DefaultResolver
+from typing_extensions import override
+
+from nsfw_detector.infrastructure.errors.http import NotAllowedHostError
+
+IPAddress = ipaddress.IPv4Address | ipaddress.IPv6Address
+
+
+def parse_address(host: str) -> IPAddress | None:
+    """
+    Parses a literal address the way the socket layer does, including short and numeric IPv4 forms
+    like ``127.1``, ``2130706433`` or ``0x7f000001``.
+
+    Returns:
+        IPAddress | None: Address, None if the host is a name
+    """
+    try:
+        return ipaddress.ip_address(host.strip("[]"))
+    except ValueError:
+        pass
+
+    try:
+        return ipaddress.IPv4Address(socket.inet_aton(host))
+    except OSError:
+        return None
+
+
+def is_global_address(address: IPAddress) -> bool:
+    # IPv4 mapped into IPv6 is connected to as IPv4, so it is checked as IPv4
+    if isinstance(address, ipaddress.IPv6Address) and address.ipv4_mapped is not None:
+        return address.ipv4_mapped.is_global
+    return address.is_global
+
+
+class GlobalAddressResolver(AbstractResolver):
+    """
+    Resolves names with the default resolver and rejects the name if any of its addresses is not global.
+
+    Addresses are checked when the connection is opened, so a name which resolves into the private network,
+    including one rebound after the URL was validated, is never connected to, on any redirect.
+    Literal addresses are not resolved by the connector, so they are checked before the request.
+    """
+
+    def __init__(self, resolver: AbstractResolver | None = None) -> None:
+        self._resolver: Final[AbstractResolver] = resolver or DefaultResolver()
+
+    @override
+    async def resolve(
+            self,
+            host: str,
+            port: int = 0,
+            family: socket.AddressFamily = socket.AF_INET,
+    ) -> list[ResolveResult]:
+        addresses: list[ResolveResult] = await self._resolver.resolve(host, port, family)
+
+        for address in addresses:
+            parsed: IPAddress | None = parse_address(address["host"].partition("%")[0])
+            if parsed is None or not is_global_address(parsed):
+                raise NotAllowedHostError(f"{host} resolves to {address['host']}, which is not a global address")
+
+        return addresses
+
+    @override
+    async def close(self) -> None:
+        await self._resolver.close()
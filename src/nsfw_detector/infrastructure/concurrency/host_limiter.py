@@ -0,0 +1,38 @@
+import asyncio
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from typing import Final
+
+
+class PerHostLimiter:
+    """
+    Limits amount of concurrent operations with each host, so one slow or popular host
+    can't take all connections of the shared pool.
+
+    Semaphore of a host exists only while someone holds or waits for it, so the amount of
+    distinct hosts seen since start doesn't grow memory.
+    """
+
+    def __init__(self, limit: int) -> None:
+        self._limit: Final[int] = limit
+        # Host -> (semaphore, amount of holders and waiters)
+        self._semaphores: Final[dict[str, tuple[asyncio.Semaphore, int]]] = {}
+
+    @property
+    def hosts(self) -> int:
+        return len(self._semaphores)
+
+    @asynccontextmanager
+    async def acquire(self, host: str) -> AsyncIterator[None]:
+        semaphore, users = self._semaphores.get(host) or (asyncio.Semaphore(self._limit), 0)
+        self._semaphores[host] = (semaphore, users + 1)
+
+        try:
+            async with semaphore:
+                yield
+        finally:
+            semaphore, users = self._semaphores[host]
+            if users == 1:
+                del self._semaphores[host]
+            else:
+                self._semaphores[host] = (semaphore, users - 1)
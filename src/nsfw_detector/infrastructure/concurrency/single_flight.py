@@ -0,0 +1,40 @@
+import asyncio
+from typing import Awaitable, Callable, Final, Generic, Hashable, TypeVar
+
+KeyT = TypeVar("KeyT", bound=Hashable)
+ResultT = TypeVar("ResultT")
+
+
+class SingleFlight(Generic[KeyT, ResultT]):
+    """
+    Coalesces concurrent calls with the same key into one underlying call.
+
+    The first caller starts the call as a separate task, callers which come while it is
+    in flight wait for the same task and share its result or its exception. Waiters are
+    shielded from the task, so cancellation of any waiter doesn't cancel the shared work.
+    """
+
+    def __init__(self) -> None:
+        self._in_flight: Final[dict[KeyT, asyncio.Task[ResultT]]] = {}
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._in_flight)
+
+    async def do(self, key: KeyT, call: Callable[[], Awaitable[ResultT]]) -> ResultT:
+        task: asyncio.Task[ResultT] | None = self._in_flight.get(key)
+
+        if task is None:
+            task = asyncio.ensure_future(call())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda finished: self.__forget(key, finished))
+
+        return await asyncio.shield(task)
+
+    def __forget(self, key: KeyT, task: asyncio.Task[ResultT]) -> None:
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+
+        # Exception is retrieved here, because all waiters may be already cancelled
+        if not task.cancelled():
+            task.exception()
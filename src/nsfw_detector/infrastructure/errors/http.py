@@ -7,3 +7,19 @@ class NoFieldFoundInHTTPRequestError(InfrastructureError):
 
 class ServiceUnAvailableError(InfrastructureError):
     ...
+
+
+class RemoteRequestFailedError(InfrastructureError):
+    ...
+
+
+class RemoteRequestTimeoutError(InfrastructureError):
+    ...
+
+
+class ResponseTooLargeError(InfrastructureError):
+    ...
+
+
+class NotAllowedHostError(InfrastructureError):
+    ...
@@ -0,0 +1,11 @@
+from nsfw_detector.infrastructure.errors.base import InfrastructureError
+
+
+class InferenceOverloadedError(InfrastructureError):
+    def __init__(self, message: str, retry_after_seconds: int) -> None:
+        super().__init__(message)
+        self.retry_after_seconds: int = retry_after_seconds
+
+
+class AnimationTooLargeError(InfrastructureError):
+    ...
@@ -0,0 +1,5 @@
+from nsfw_detector.infrastructure.errors.base import InfrastructureError
+
+
+class NoAvailableBackendError(InfrastructureError):
+    ...
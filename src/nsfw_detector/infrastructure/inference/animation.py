@@ -0,0 +1,263 @@
+import asyncio
+import io
+import logging
+from dataclasses import dataclass
+from typing import Final, Iterable, Sequence
+
+from PIL import Image, ImageChops, ImageStat
+
+from nsfw_detector.infrastructure.errors.inference import AnimationTooLargeError
+from nsfw_detector.infrastructure.inference.base import ScoreVector
+from nsfw_detector.infrastructure.inference.batcher import InferenceBatcher
+from nsfw_detector.infrastructure.metrics.instruments import ANIMATION_FRAMES
+from nsfw_detector.setup.configs import AnimationConfig, InferenceConfig
+
+logger: Final[logging.Logger] = logging.getLogger(__name__)
+
+# Frames are compared by tiny thumbnails, enough to notice a cut and cheap for long animations.
+# Colors are kept, because a cut between scenes of the same brightness changes only hue
+_SCENE_THUMBNAIL_SIZE: Final[tuple[int, int]] = (16, 16)
+
+
+def may_be_animated(data: bytes) -> bool:
+    """Cheap check by signature: only GIF, WebP and PNG (APNG) can be animated, so JPEG is never opened twice"""
+    return data.startswith((b"GIF87a", b"GIF89a", b"\x89PNG\r\n\x1a\n")) or (
+        data.startswith(b"RIFF") and data[8:12] == b"WEBP"
+    )
+
+
+@dataclass(frozen=True, slots=True)
+class AnimationTimeline:
+    """
+    Frames of an animation decoded for checking.
+
+    Only a sample of evenly spaced frames is kept, ``indices`` are their indices in the animation.
+    Sampling works with positions in the sample, scene cuts are positions too.
+    """
+
+    total_frames: int
+    indices: tuple[int, ...]
+    frames: tuple[bytes, ...]
+    scene_cuts: tuple[int, ...]
+
+
+def scan_animation(
+        data: bytes,
+        scene_cut_threshold: float,
+        sample_size: int,
+        frame_size: int,
+        max_frames: int,
+        max_pixels: int,
+) -> AnimationTimeline | None:
+    """
+    Decodes the animation once, keeping an evenly spaced sample of frames and finding which of them start
+    a new scene.
+
+    Frames depend on previous ones, so each frame up to the last sampled one is decoded, but only sampled
+    frames are converted. Animations longer than ``max_frames`` or with more than ``max_pixels`` pixels
+    in all frames together are rejected before anything is decoded.
+
+    Returns:
+        AnimationTimeline | None: Sampled frames of the animation, None if the image has one frame
+    :raises AnimationTooLargeError: if the animation is beyond the budget of decoding
+    """
+    image: Image.Image = Image.open(io.BytesIO(data))
+    if not getattr(image, "is_animated", False):
+        return None
+
+    # Amount of frames is read from headers without decoding pixels
+    total_frames: int = image.n_frames
+    if total_frames > max_frames:
+        raise AnimationTooLargeError(f"Animation has {total_frames} frames, more than {max_frames}")
+    if total_frames * image.width * image.height > max_pixels:
+        raise AnimationTooLargeError(
+            f"Animation has {total_frames} frames of {image.width}x{image.height}, more than {max_pixels} pixels"
+        )
+
+    indices: list[int] = _evenly_spaced(range(total_frames), sample_size)
+    frames: list[bytes] = []
+    scene_cuts: list[int] = []
+    previous: Image.Image | None = None
+
+    for position, index in enumerate(indices):
+        image.seek(index)
+        frame: Image.Image = image.convert("RGB")
+
+        # Sampled frames are compared, so a cut is found at the first sampled frame of a new scene
+        thumbnail: Image.Image = frame.resize(_SCENE_THUMBNAIL_SIZE, Image.Resampling.BILINEAR)
+        if previous is not None:
+            bands: list[float] = ImageStat.Stat(ImageChops.difference(thumbnail, previous)).mean
+            difference: float = sum(bands) / len(bands) / 255
+            if difference > scene_cut_threshold:
+                scene_cuts.append(position)
+        previous = thumbnail
+
+        frames.append(_encode_frame(frame, frame_size))
+
+    return AnimationTimeline(
+        total_frames=total_frames,
+        indices=tuple(indices),
+        frames=tuple(frames),
+        scene_cuts=tuple(scene_cuts),
+    )
+
+
+def _encode_frame(frame: Image.Image, frame_size: int) -> bytes:
+    """
+    Shrinks the frame so that its shorter side is not less than ``frame_size`` and stores it as BMP,
+    without compression, so the inference backend decodes it as cheap as raw pixels.
+    """
+    scale: float = frame_size / min(frame.size)
+    if scale < 1:
+        frame = frame.resize(
+            (max(1, round(frame.width * scale)), max(1, round(frame.height * scale))),
+            Image.Resampling.BILINEAR,
+        )
+
+    buffer: io.BytesIO = io.BytesIO()
+    frame.save(buffer, format="BMP")
+    return buffer.getvalue()
+
+
+def select_keyframes(timeline: AnimationTimeline, count: int) -> list[int]:
+    """
+    Positions of the first frame and scene cuts in the sample, evenly thinned or filled with evenly spaced
+    positions up to ``count``
+    """
+    keyframes: list[int] = _evenly_spaced([0, *timeline.scene_cuts], count)
+
+    # Long scenes are covered by evenly spaced frames, thinned evenly too, so no part of the animation is skipped
+    spaced: list[int] = [
+        position for position in _evenly_spaced(range(len(timeline.frames)), count) if position not in keyframes
+    ]
+    keyframes.extend(_evenly_spaced(spaced, count - len(keyframes)))
+
+    return sorted(keyframes)
+
+
+def worst_scores(scores: Iterable[ScoreVector]) -> ScoreVector:
+    """Lowest neutral and highest NSFW score of each level among frames, so any policy rejects the worst frame"""
+    vectors: list[ScoreVector] = list(scores)
+    return ScoreVector(
+        neutral=min(vector.neutral for vector in vectors),
+        low=max(vector.low for vector in vectors),
+        medium=max(vector.medium for vector in vectors),
+        high=max(vector.high for vector in vectors),
+    )
+
+
+def _evenly_spaced(items: Sequence[int], count: int) -> list[int]:
+    if count <= 0:
+        return []
+    if len(items) <= count:
+        return list(items)
+
+    step: float = len(items) / count
+    return [items[int(position * step)] for position in range(count)]
+
+
+class AnimatedImageSampler:
+    """
+    Checks animated GIF and WebP images by a sample of frames instead of each frame.
+
+    The animation is decoded once, keeping up to ``max_frames`` evenly spaced frames which can be checked.
+    The first pass checks keyframes: the first frame, scene cuts and evenly spaced frames.
+    While some checked frame is uncertain, frames halfway to its checked neighbours are checked next,
+    so sampling gets denser only where the verdict is unclear. Frames of a pass are submitted
+    to the batcher at once, so they share forward passes.
+
+    Checking stops as soon as a frame is clearly NSFW, frames of the pass still waiting for the model
+    are cancelled then, or when ``max_frames`` frames are checked.
+    The animation gets the worst scores among checked frames.
+    """
+
+    def __init__(
+            self,
+            batcher: InferenceBatcher,
+            animation_config: AnimationConfig,
+            inference_config: InferenceConfig,
+    ) -> None:
+        self._batcher: Final[InferenceBatcher] = batcher
+        self._config: Final[AnimationConfig] = animation_config
+        self._frame_size: Final[int] = inference_config.decode_size
+
+    async def predict(self, data: bytes) -> ScoreVector | None:
+        """
+        Predicts scores of an animated image.
+        :param data: raw content of the image
+        :return: worst scores among checked frames, None if the image is not animated
+        :raises InferenceOverloadedError: if frames are not admitted to the queue of the model
+        :raises AnimationTooLargeError: if the animation is beyond the budget of decoding
+        """
+        if not may_be_animated(data):
+            return None
+
+        timeline: AnimationTimeline | None = await asyncio.to_thread(
+            scan_animation,
+            data,
+            scene_cut_threshold=self._config.scene_cut_threshold,
+            sample_size=self._config.max_frames,
+            frame_size=self._frame_size,
+            max_frames=self._config.max_scan_frames,
+            max_pixels=self._config.max_scan_pixels,
+        )
+        if timeline is None:
+            return None
+
+        checked: dict[int, ScoreVector] = {}
+        positions: list[int] = select_keyframes(timeline, min(self._config.keyframes, self._config.max_frames))
+
+        while positions and not await self.__check(timeline, positions, checked):
+            positions = self.__refine(checked, len(timeline.frames))[:self._config.max_frames - len(checked)]
+
+        logger.debug("Checked %s of %s frames of animated image", len(checked), timeline.total_frames)
+        ANIMATION_FRAMES.observe(len(checked))
+        return worst_scores(checked.values())
+
+    async def __check(self, timeline: AnimationTimeline, positions: list[int], checked: dict[int, ScoreVector]) -> bool:
+        """
+        Checks frames of one pass, adding their scores to ``checked`` as they arrive.
+
+        Returns:
+            bool: Whether some frame is clearly NSFW, the rest of the pass is cancelled then
+        """
+        tasks: list[asyncio.Task[tuple[int, ScoreVector]]] = [
+            asyncio.create_task(self.__predict(position, timeline.frames[position])) for position in positions
+        ]
+        try:
+            for next_scores in asyncio.as_completed(tasks):
+                position, scores = await next_scores
+                checked[position] = scores
+                if scores.neutral <= self._config.early_exit_neutral:
+                    return True
+            return False
+        finally:
+            # Cancelled frames are dropped by the batcher before they reach the model
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def __predict(self, position: int, frame: bytes) -> tuple[int, ScoreVector]:
+        return position, await self._batcher.predict(frame)
+
+    def __refine(self, checked: dict[int, ScoreVector], frames: int) -> list[int]:
+        # Frame after the last one bounds the animation, so frames after the last checked one are refined too
+        bounds: list[int] = [*sorted(checked), frames]
+        uncertain: list[int] = sorted(
+            (position for position in range(len(bounds) - 1)
+             if checked[bounds[position]].neutral < self._config.uncertain_neutral),
+            key=lambda position: checked[bounds[position]].neutral,
+        )
+
+        # The most uncertain frames are refined first, so they get the frames left in the budget
+        indices: list[int] = []
+        for position in uncertain:
+            for neighbour in (position - 1, position + 1):
+                if neighbour < 0:
+                    continue
+
+                middle: int = (bounds[position] + bounds[neighbour]) // 2
+                if middle not in checked and middle not in indices:
+                    indices.append(middle)
+
+        return indices
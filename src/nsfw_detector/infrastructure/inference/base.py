@@ -0,0 +1,39 @@
+from abc import abstractmethod
+from typing import NamedTuple, Protocol, Sequence
+
+from nsfw_detector.infrastructure.inference.decoding import DecodeStatsSnapshot
+
+
+class ScoreVector(NamedTuple):
+    """Probabilities of the model for each NSFW level, in the order of ``NSFWLevel``"""
+
+    neutral: float
+    low: float
+    medium: float
+    high: float
+
+
+class InferenceBackend(Protocol):
+    """Runs a forward pass of the NSFW model for a batch of raw images"""
+
+    @property
+    @abstractmethod
+    def decode_stats(self) -> DecodeStatsSnapshot:
+        """Counters of image decoding since start of the backend"""
+        ...
+
+    @abstractmethod
+    async def start(self) -> None:
+        ...
+
+    @abstractmethod
+    async def close(self) -> None:
+        ...
+
+    @abstractmethod
+    async def predict_batch(self, batch: Sequence[bytes]) -> list[ScoreVector | Exception]:
+        """
+        Predicts scores for each image of the batch.
+        Images which can't be processed get an exception on their position instead of scores.
+        """
+        ...
@@ -0,0 +1,218 @@
+import asyncio
+import logging
+import math
+import time
+from dataclasses import dataclass
+from typing import Final
+
+from nsfw_detector.infrastructure.errors.inference import InferenceOverloadedError
+from nsfw_detector.infrastructure.inference.base import InferenceBackend, ScoreVector
+from nsfw_detector.infrastructure.metrics.instruments import (
+    EXPECTED_WAIT_REJECTIONS,
+    EXPIRED_REJECTIONS,
+    INFERENCE_BATCH_SIZE,
+    QUEUE_FULL_REJECTIONS,
+    QUEUE_WAIT_DURATION,
+)
+from nsfw_detector.setup.configs import InferenceConfig
+
+logger: Final[logging.Logger] = logging.getLogger(__name__)
+
+# Weight of the newest batch in smoothed duration of batches
+_BATCH_DURATION_ALPHA: Final[float] = 0.2
+
+
+@dataclass(frozen=True, slots=True)
+class _PendingImage:
+    data: bytes
+    future: asyncio.Future[ScoreVector]
+    enqueued_at: float
+
+
+class InferenceBatcher:
+    """
+    Collects concurrent inference requests into batches, so one forward pass of the model
+    serves many images at once.
+
+    The batch is closed when it reaches ``max_batch_size`` images or when ``max_batch_wait_ms``
+    passed since the first image of the batch arrived. While all workers are busy, images
+    accumulate in the queue, so batches grow with the load.
+
+    Admission control keeps the queue bounded: an image is rejected at once when ``max_queue_depth``
+    images are already waiting, or when the queue is expected to drain slower than ``max_queue_wait_ms``.
+    Images which waited longer than that anyway are rejected instead of being checked, because their
+    clients have likely given up. Rejections carry the expected time until the queue drains.
+    """
+
+    def __init__(self, backend: InferenceBackend, config: InferenceConfig) -> None:
+        self._backend: Final[InferenceBackend] = backend
+        self._max_batch_size: Final[int] = config.max_batch_size
+        self._max_batch_wait: Final[float] = config.max_batch_wait_ms / 1000
+        self._max_queue_depth: Final[int] = config.max_queue_depth
+        self._max_queue_wait: Final[float] = config.max_queue_wait_ms / 1000
+        self._workers: Final[int] = config.workers
+        self._batch_duration: float = 0.0
+        self._free_workers: Final[asyncio.Semaphore] = asyncio.Semaphore(config.workers)
+        self._queue: Final[asyncio.Queue[_PendingImage]] = asyncio.Queue()
+        self._image_arrived: Final[asyncio.Event] = asyncio.Event()
+        self._batches_in_progress: Final[set[asyncio.Task[None]]] = set()
+        self._scheduler: asyncio.Task[None] | None = None
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    @property
+    def batches_in_progress(self) -> int:
+        return len(self._batches_in_progress)
+
+    @property
+    def expected_queue_wait(self) -> float:
+        """Seconds until images already waiting are taken into batches, zero before the first batch"""
+        batches_ahead: int = math.ceil(self._queue.qsize() / (self._max_batch_size * self._workers))
+        return batches_ahead * self._batch_duration
+
+    def start(self) -> None:
+        if self._scheduler is None:
+            self._scheduler = asyncio.create_task(self.__schedule(), name="inference-batcher")
+
+    async def close(self) -> None:
+        if self._scheduler is not None:
+            self._scheduler.cancel()
+            await asyncio.gather(self._scheduler, return_exceptions=True)
+            self._scheduler = None
+
+        await asyncio.gather(*self._batches_in_progress, return_exceptions=True)
+
+        while not self._queue.empty():
+            pending: _PendingImage = self._queue.get_nowait()
+            if not pending.future.done():
+                pending.future.set_exception(RuntimeError("Inference batcher is closed"))
+
+    async def predict(self, data: bytes) -> ScoreVector:
+        """
+        Schedules image for the next batch and waits for its own probabilities.
+        :param data: raw content of the image
+        :return: scores for each NSFW level
+        :raises InferenceOverloadedError: if the image is not admitted to the queue or waited in it too long
+        """
+        if self._scheduler is None:
+            raise RuntimeError("Inference batcher is not started")
+
+        if self._queue.qsize() >= self._max_queue_depth:
+            QUEUE_FULL_REJECTIONS.inc()
+            raise self.__overloaded(f"{self._queue.qsize()} images are already waiting for the model")
+
+        if self.expected_queue_wait > self._max_queue_wait:
+            EXPECTED_WAIT_REJECTIONS.inc()
+            raise self.__overloaded(f"Images are expected to wait {self.expected_queue_wait:.1f}s for the model")
+
+        future: asyncio.Future[ScoreVector] = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait(_PendingImage(data=data, future=future, enqueued_at=time.perf_counter()))
+        self._image_arrived.set()
+        return await future
+
+    async def __schedule(self) -> None:
+        while True:
+            await self._free_workers.acquire()
+
+            try:
+                batch: list[_PendingImage] = await self.__collect_batch()
+            except asyncio.CancelledError:
+                self._free_workers.release()
+                raise
+
+            task: asyncio.Task[None] = asyncio.create_task(self.__process_batch(batch))
+            self._batches_in_progress.add(task)
+            task.add_done_callback(self.__on_batch_processed)
+
+    async def __collect_batch(self) -> list[_PendingImage]:
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        batch: list[_PendingImage] = [await self._queue.get()]
+        deadline: float = loop.time() + self._max_batch_wait
+
+        while len(batch) < self._max_batch_size:
+            self._image_arrived.clear()
+
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+
+            timeout: float = deadline - loop.time()
+            if timeout <= 0:
+                break
+
+            try:
+                await asyncio.wait_for(self._image_arrived.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def __process_batch(self, batch: list[_PendingImage]) -> None:
+        batch = [pending for pending in batch if not pending.future.done()]
+
+        if not batch:
+            return
+
+        logger.debug("Running inference for batch of %s images", len(batch))
+
+        started_at: float = time.perf_counter()
+        for pending in batch:
+            QUEUE_WAIT_DURATION.observe(started_at - pending.enqueued_at)
+
+        batch = self.__reject_expired(batch, started_at)
+
+        if not batch:
+            return
+
+        INFERENCE_BATCH_SIZE.observe(len(batch))
+
+        try:
+            results: list[ScoreVector | Exception] = await self._backend.predict_batch(
+                [pending.data for pending in batch]
+            )
+        except Exception as error:  # noqa: BLE001
+            results = [error] * len(batch)
+
+        duration: float = time.perf_counter() - started_at
+        self._batch_duration = (
+            duration if not self._batch_duration
+            else self._batch_duration + _BATCH_DURATION_ALPHA * (duration - self._batch_duration)
+        )
+
+        for pending, result in zip(batch, results):
+            if pending.future.done():
+                continue
+
+            if isinstance(result, Exception):
+                pending.future.set_exception(result)
+            else:
+                pending.future.set_result(result)
+
+    def __reject_expired(self, batch: list[_PendingImage], started_at: float) -> list[_PendingImage]:
+        admitted: list[_PendingImage] = []
+
+        for pending in batch:
+            if started_at - pending.enqueued_at <= self._max_queue_wait:
+                admitted.append(pending)
+                continue
+
+            EXPIRED_REJECTIONS.inc()
+            pending.future.set_exception(
+                self.__overloaded(f"Image waited {started_at - pending.enqueued_at:.1f}s for the model")
+            )
+
+        return admitted
+
+    def __overloaded(self, reason: str) -> InferenceOverloadedError:
+        return InferenceOverloadedError(
+            f"Local model is overloaded: {reason}. Please try again later.",
+            retry_after_seconds=max(1, math.ceil(self.expected_queue_wait)),
+        )
+
+    def __on_batch_processed(self, task: asyncio.Task[None]) -> None:
+        self._batches_in_progress.discard(task)
+        self._free_workers.release()
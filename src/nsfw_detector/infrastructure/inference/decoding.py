@@ -0,0 +1,144 @@
+import io
+import logging
+import math
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Final
+
+from PIL import Image
+
+from nsfw_detector.infrastructure.metrics.instruments import DECODE_DURATION, Observer
+
+logger: Final[logging.Logger] = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, slots=True)
+class DecodeStatsSnapshot:
+    images: int = 0
+    reduced_images: int = 0
+    decode_seconds: float = 0.0
+    sampled_images: int = 0
+    sampled_full_decode_seconds: float = 0.0
+    sampled_reduced_decode_seconds: float = 0.0
+
+    @property
+    def estimated_saved_seconds(self) -> float:
+        """Decode time saved for all images, extrapolated from images decoded both ways"""
+        if not self.sampled_images:
+            return 0.0
+
+        saved_per_image: float = (
+            self.sampled_full_decode_seconds - self.sampled_reduced_decode_seconds
+        ) / self.sampled_images
+        return saved_per_image * self.images
+
+
+def log_decode_stats(stats: DecodeStatsSnapshot) -> None:
+    logger.info(
+        "Decoded %s images (%s at reduced resolution) in %.3fs, estimated saved decode time: %.3fs",
+        stats.images,
+        stats.reduced_images,
+        stats.decode_seconds,
+        stats.estimated_saved_seconds,
+    )
+
+
+class DecodeStats:
+    """Thread-safe counters of decoding, shared by threads of the inference backend"""
+
+    def __init__(self) -> None:
+        self._lock: Final[threading.Lock] = threading.Lock()
+        self._snapshot: DecodeStatsSnapshot = DecodeStatsSnapshot()
+
+    def snapshot(self, reset: bool = False) -> DecodeStatsSnapshot:
+        with self._lock:
+            snapshot: DecodeStatsSnapshot = self._snapshot
+            if reset:
+                self._snapshot = DecodeStatsSnapshot()
+            return snapshot
+
+    def merge(self, other: DecodeStatsSnapshot) -> None:
+        with self._lock:
+            current: DecodeStatsSnapshot = self._snapshot
+            self._snapshot = DecodeStatsSnapshot(
+                images=current.images + other.images,
+                reduced_images=current.reduced_images + other.reduced_images,
+                decode_seconds=current.decode_seconds + other.decode_seconds,
+                sampled_images=current.sampled_images + other.sampled_images,
+                sampled_full_decode_seconds=current.sampled_full_decode_seconds + other.sampled_full_decode_seconds,
+                sampled_reduced_decode_seconds=(
+                    current.sampled_reduced_decode_seconds + other.sampled_reduced_decode_seconds
+                ),
+            )
+
+
+class ImageDecoder:
+    """
+    Decodes images only at the resolution the model needs.
+
+    JPEG is decoded with DCT scaling (draft mode), so a 12MP photo is never decoded in full.
+    Other formats are decoded in full and then shrunk with cheap ``reduce()``, so the model
+    preprocessing resizes a small image. Shorter side of the result is never less than ``target_size``.
+
+    Small share of images is also decoded in full resolution to measure how much time is saved.
+    """
+
+    def __init__(
+            self,
+            target_size: int,
+            sample_rate: float,
+            stats: DecodeStats,
+            duration: Observer = DECODE_DURATION,
+    ) -> None:
+        self._target_size: Final[int] = target_size
+        self._sample_rate: Final[float] = sample_rate
+        self._stats: Final[DecodeStats] = stats
+        self._duration: Final[Observer] = duration
+
+    def decode(self, data: bytes | memoryview) -> Image.Image:
+        started_at: float = time.perf_counter()
+        image, reduced = self.__decode_reduced(data)
+        decode_seconds: float = time.perf_counter() - started_at
+        self._duration.observe(decode_seconds)
+
+        sampled_full_decode_seconds: float = 0.0
+        is_sampled: bool = self._sample_rate > 0 and random.random() < self._sample_rate  # noqa: S311
+
+        if is_sampled:
+            started_at = time.perf_counter()
+            Image.open(io.BytesIO(data)).convert("RGB")
+            sampled_full_decode_seconds = time.perf_counter() - started_at
+
+        self._stats.merge(
+            DecodeStatsSnapshot(
+                images=1,
+                reduced_images=int(reduced),
+                decode_seconds=decode_seconds,
+                sampled_images=int(is_sampled),
+                sampled_full_decode_seconds=sampled_full_decode_seconds,
+                sampled_reduced_decode_seconds=decode_seconds if is_sampled else 0.0,
+            )
+        )
+
+        return image
+
+    def __decode_reduced(self, data: bytes | memoryview) -> tuple[Image.Image, bool]:
+        image: Image.Image = Image.open(io.BytesIO(data))
+        width, height = image.size
+        scale: float = self._target_size / min(width, height)
+
+        if scale >= 1:
+            return image.convert("RGB"), False
+
+        if image.format == "JPEG":
+            # Draft picks the smallest DCT scale which is still not smaller than requested size
+            image.draft("RGB", (math.ceil(width * scale), math.ceil(height * scale)))
+            return image.convert("RGB"), image.size != (width, height)
+
+        factor: int = int(1 / scale)
+        if factor < 2:
+            return image.convert("RGB"), False
+
+        return image.convert("RGB").reduce(factor), True
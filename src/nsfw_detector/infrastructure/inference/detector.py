@@ -0,0 +1,53 @@
+import time
+from typing import Sequence, cast
+
+from PIL import Image
+from nsfw_image_detector import NSFWDetector, NSFWLevel
+
+from nsfw_detector.infrastructure.inference.base import ScoreVector
+from nsfw_detector.infrastructure.inference.decoding import ImageDecoder
+from nsfw_detector.infrastructure.metrics.instruments import INFERENCE_DURATION, Observer
+
+
+def predict_with_detector(
+        detector: NSFWDetector,
+        decoder: ImageDecoder,
+        batch: Sequence[bytes | memoryview],
+        inference_duration: Observer = INFERENCE_DURATION,
+) -> list[ScoreVector | Exception]:
+    """
+    Decodes images and runs one forward pass for all of them.
+    Images which failed to decode don't break the whole batch, they get their own exception.
+    """
+    results: list[ScoreVector | Exception] = []
+    images: list[Image.Image] = []
+    positions: list[int] = []
+
+    for position, data in enumerate(batch):
+        try:
+            images.append(decoder.decode(data))
+        except Exception as error:  # noqa: BLE001
+            results.append(error)
+        else:
+            results.append(RuntimeError("Image was decoded, but not predicted"))
+            positions.append(position)
+
+    if not images:
+        return results
+
+    started_at: float = time.perf_counter()
+    probabilities: list[dict[NSFWLevel, float]] = cast(
+        list[dict[NSFWLevel, float]],
+        detector.predict_proba(images)
+    )
+    inference_duration.observe(time.perf_counter() - started_at)
+
+    for position, dictionary_with_labels in zip(positions, probabilities):
+        results[position] = ScoreVector(
+            neutral=dictionary_with_labels[NSFWLevel.NEUTRAL],
+            low=dictionary_with_labels[NSFWLevel.LOW],
+            medium=dictionary_with_labels[NSFWLevel.MEDIUM],
+            high=dictionary_with_labels[NSFWLevel.HIGH],
+        )
+
+    return results
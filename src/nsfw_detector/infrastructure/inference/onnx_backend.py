@@ -0,0 +1,184 @@
+import asyncio
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Final, Sequence
+
+import numpy as np
+from PIL import Image
+from typing_extensions import override
+
+from nsfw_detector.infrastructure.inference.base import InferenceBackend, ScoreVector
+from nsfw_detector.infrastructure.inference.decoding import (
+    DecodeStats,
+    DecodeStatsSnapshot,
+    ImageDecoder,
+    log_decode_stats,
+)
+from nsfw_detector.infrastructure.metrics.instruments import INFERENCE_DURATION
+from nsfw_detector.setup.configs import InferenceConfig
+
+logger: Final[logging.Logger] = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, slots=True)
+class OnnxModelMetadata:
+    """
+    Preprocessing of the exported model, stored next to it as ``<model>.json``.
+    Defaults are the eval transform of ``eva02_base_patch14_448``, which ``nsfw_image_detector`` uses.
+    """
+
+    input_size: int = 448
+    mean: tuple[float, float, float] = (0.48145466, 0.4578275, 0.40821073)
+    std: tuple[float, float, float] = (0.26862954, 0.26130258, 0.27577711)
+
+    @classmethod
+    def load(cls, model_path: Path) -> "OnnxModelMetadata":
+        metadata_path: Path = metadata_path_for(model_path)
+        if not metadata_path.exists():
+            logger.warning("No metadata found at %s, using default preprocessing", metadata_path)
+            return cls()
+
+        raw: dict[str, Any] = json.loads(metadata_path.read_text())
+        return cls(input_size=raw["input_size"], mean=tuple(raw["mean"]), std=tuple(raw["std"]))
+
+    def as_dict(self) -> dict[str, Any]:
+        return {"input_size": self.input_size, "mean": list(self.mean), "std": list(self.std)}
+
+
+def metadata_path_for(model_path: Path) -> Path:
+    return model_path.with_suffix(".json")
+
+
+def preprocess(image: Image.Image, metadata: OnnxModelMetadata) -> np.ndarray:
+    """
+    Same as the eval transform of the PyTorch model: bicubic resize of the shorter side,
+    center crop and normalization, but without torch. Returns CHW float32 array.
+    """
+    size: int = metadata.input_size
+    width, height = image.size
+
+    if width <= height:
+        resized: tuple[int, int] = (size, int(size * height / width))
+    else:
+        resized = (int(size * width / height), size)
+
+    image = image.resize(resized, Image.Resampling.BICUBIC)
+    left: int = int(round((resized[0] - size) / 2.0))
+    top: int = int(round((resized[1] - size) / 2.0))
+    image = image.crop((left, top, left + size, top + size))
+
+    pixels: np.ndarray = np.asarray(image, dtype=np.float32) / 255.0
+    pixels = (pixels - np.asarray(metadata.mean, dtype=np.float32)) / np.asarray(metadata.std, dtype=np.float32)
+    return pixels.transpose(2, 0, 1)
+
+
+def scores_from_probabilities(probabilities: np.ndarray) -> list[ScoreVector]:
+    """
+    Converts class probabilities to scores of ``nsfw_image_detector``: each level except neutral
+    is the probability of this level or a more dangerous one.
+    """
+    cumulative: np.ndarray = np.cumsum(probabilities[:, ::-1], axis=1)[:, ::-1]
+    return [
+        ScoreVector(
+            neutral=float(row_probabilities[0]),
+            low=float(row_cumulative[1]),
+            medium=float(row_cumulative[2]),
+            high=float(row_cumulative[3]),
+        )
+        for row_probabilities, row_cumulative in zip(probabilities, cumulative)
+    ]
+
+
+class OnnxInferenceBackend(InferenceBackend):
+    """
+    Runs the exported, optionally int8-quantized, ONNX model with ONNX Runtime on a pool of threads.
+
+    Preprocessing is done with numpy, so neither torch nor the model package is imported.
+    ONNX Runtime releases the GIL while running, so threads of the pool run forward passes in parallel.
+    """
+
+    def __init__(self, config: InferenceConfig) -> None:
+        self._model_path: Final[Path] = Path(config.onnx_model_path)
+        self._threads_per_worker: Final[int] = config.threads_per_worker
+        self._thread_pool_executor: Final[ThreadPoolExecutor] = ThreadPoolExecutor(
+            max_workers=config.workers,
+            thread_name_prefix="onnx-inference",
+        )
+        self._decode_stats: Final[DecodeStats] = DecodeStats()
+        self._decoder: Final[ImageDecoder] = ImageDecoder(
+            target_size=config.decode_size,
+            sample_rate=config.decode_sample_rate,
+            stats=self._decode_stats,
+        )
+        self._metadata: OnnxModelMetadata = OnnxModelMetadata()
+        self._session: Any = None
+        self._input_name: str = ""
+
+    @property
+    @override
+    def decode_stats(self) -> DecodeStatsSnapshot:
+        return self._decode_stats.snapshot()
+
+    @override
+    async def start(self) -> None:
+        await asyncio.get_running_loop().run_in_executor(self._thread_pool_executor, self.__load_session)
+
+    @override
+    async def close(self) -> None:
+        self._thread_pool_executor.shutdown(wait=False, cancel_futures=True)
+        log_decode_stats(self.decode_stats)
+
+    @override
+    async def predict_batch(self, batch: Sequence[bytes]) -> list[ScoreVector | Exception]:
+        return await asyncio.get_running_loop().run_in_executor(
+            self._thread_pool_executor,
+            self.__predict,
+            batch,
+        )
+
+    def __load_session(self) -> None:
+        import onnxruntime
+
+        options: onnxruntime.SessionOptions = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = self._threads_per_worker
+        options.inter_op_num_threads = 1
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+
+        self._metadata = OnnxModelMetadata.load(self._model_path)
+        self._session = onnxruntime.InferenceSession(
+            str(self._model_path),
+            sess_options=options,
+            providers=["CPUExecutionProvider"],
+        )
+        self._input_name = self._session.get_inputs()[0].name
+        logger.info("Loaded ONNX model from %s", self._model_path)
+
+    def __predict(self, batch: Sequence[bytes]) -> list[ScoreVector | Exception]:
+        results: list[ScoreVector | Exception] = []
+        inputs: list[np.ndarray] = []
+        positions: list[int] = []
+
+        for position, data in enumerate(batch):
+            try:
+                inputs.append(preprocess(self._decoder.decode(data), self._metadata))
+            except Exception as error:  # noqa: BLE001
+                results.append(error)
+            else:
+                results.append(RuntimeError("Image was decoded, but not predicted"))
+                positions.append(position)
+
+        if not inputs:
+            return results
+
+        started_at: float = time.perf_counter()
+        probabilities: np.ndarray = self._session.run(None, {self._input_name: np.stack(inputs)})[0]
+        INFERENCE_DURATION.observe(time.perf_counter() - started_at)
+
+        for position, scores in zip(positions, scores_from_probabilities(probabilities)):
+            results[position] = scores
+
+        return results
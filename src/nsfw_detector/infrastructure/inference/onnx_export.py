@@ -0,0 +1,106 @@
+"""
+One-time export of the ``nsfw_image_detector`` PyTorch model to ONNX.
+Needs torch and the model package, which the ``onnx`` backend itself doesn't need at runtime.
+"""
+import json
+import logging
+import random
+from pathlib import Path
+from typing import Any, Final
+
+from nsfw_detector.infrastructure.inference.onnx_backend import (
+    OnnxModelMetadata,
+    metadata_path_for,
+    preprocess,
+    scores_from_probabilities,
+)
+
+logger: Final[logging.Logger] = logging.getLogger(__name__)
+
+_VERIFICATION_IMAGES: Final[int] = 8
+
+
+def export_onnx(
+        output_path: Path,
+        model_name: str = "Freepik/nsfw_image_detector",
+        quantize: bool = True,
+        opset: int = 17,
+        verify: bool = True,
+) -> Path:
+    """
+    Exports the model with dynamic batch size and writes preprocessing metadata next to it.
+
+    :param output_path: path of the resulting model
+    :param model_name: name of the model on Hugging Face
+    :param quantize: whether to apply dynamic int8 quantization of weights
+    :param opset: ONNX opset version
+    :param verify: whether to compare scores of the exported model with the PyTorch model
+    :return: path of the resulting model
+    """
+    import torch
+    from nsfw_image_detector import NSFWDetector
+
+    detector: NSFWDetector = NSFWDetector(model_name=model_name, device="cpu", dtype=torch.float32)
+    metadata: OnnxModelMetadata = OnnxModelMetadata()
+
+    class ProbabilitiesModel(torch.nn.Module):
+        def __init__(self, model: Any) -> None:
+            super().__init__()
+            self.model = model
+
+        def forward(self, pixel_values: Any) -> Any:
+            return torch.softmax(self.model(pixel_values).logits, dim=-1)
+
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    float_path: Path = output_path.with_suffix(".float32.onnx") if quantize else output_path
+
+    logger.info("Exporting %s to %s", model_name, float_path)
+    torch.onnx.export(
+        ProbabilitiesModel(detector.model).eval(),
+        (torch.zeros(1, 3, metadata.input_size, metadata.input_size),),
+        str(float_path),
+        input_names=["pixel_values"],
+        output_names=["probabilities"],
+        dynamic_axes={"pixel_values": {0: "batch"}, "probabilities": {0: "batch"}},
+        opset_version=opset,
+    )
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        logger.info("Quantizing weights to int8 into %s", output_path)
+        quantize_dynamic(str(float_path), str(output_path), weight_type=QuantType.QInt8)
+        float_path.unlink()
+
+    metadata_path_for(output_path).write_text(json.dumps(metadata.as_dict(), indent=2))
+
+    if verify:
+        _verify(detector, output_path, metadata)
+
+    return output_path
+
+
+def _verify(detector: Any, model_path: Path, metadata: OnnxModelMetadata) -> None:
+    """Logs the largest difference of neutral score between PyTorch and ONNX models on synthetic images"""
+    import numpy as np
+    import onnxruntime
+    from nsfw_image_detector import NSFWLevel
+    from PIL import Image
+
+    generator: random.Random = random.Random(0)  # noqa: S311
+    images: list[Image.Image] = [
+        Image.frombytes("RGB", (32, 24), generator.randbytes(32 * 24 * 3)).resize((640, 480), Image.Resampling.BICUBIC)
+        for _ in range(_VERIFICATION_IMAGES)
+    ]
+
+    expected: list[float] = [scores[NSFWLevel.NEUTRAL] for scores in detector.predict_proba(images)]
+
+    session: Any = onnxruntime.InferenceSession(str(model_path), providers=["CPUExecutionProvider"])
+    pixel_values: Any = np.stack([preprocess(image, metadata) for image in images])
+    probabilities: Any = session.run(None, {"pixel_values": pixel_values})
+    actual: list[float] = [scores.neutral for scores in scores_from_probabilities(probabilities[0])]
+
+    logger.info(
+        "Largest difference of neutral score between PyTorch and ONNX models: %.4f",
+        max(abs(left - right) for left, right in zip(expected, actual)),
+    )
@@ -0,0 +1,184 @@
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing.shared_memory import SharedMemory
+from typing import Final, Sequence
+
+from typing_extensions import override
+
+from nsfw_detector.infrastructure.inference.base import InferenceBackend, ScoreVector
+from nsfw_detector.infrastructure.inference.decoding import (
+    DecodeStats,
+    DecodeStatsSnapshot,
+    ImageDecoder,
+    log_decode_stats,
+)
+from nsfw_detector.infrastructure.metrics.instruments import DECODE_DURATION, INFERENCE_DURATION
+from nsfw_detector.setup.configs import InferenceConfig
+
+logger: Final[logging.Logger] = logging.getLogger(__name__)
+
+# Stage durations of a batch, sent from a worker process to the parent one: (decode, inference)
+_StageDurations = tuple[list[float], list[float]]
+
+
+class _Durations(list[float]):
+    """Collects durations in a worker process instead of a histogram, which lives only in the parent process"""
+
+    def observe(self, amount: float) -> None:
+        self.append(amount)
+
+
+# Model and decoder of the current worker process, they are created once by the pool initializer.
+_worker_detector = None
+_worker_decoder: ImageDecoder | None = None
+_worker_decode_stats: DecodeStats = DecodeStats()
+_worker_decode_durations: _Durations = _Durations()
+
+
+def _initialize_worker(threads_per_worker: int, decode_size: int, decode_sample_rate: float) -> None:
+    global _worker_detector, _worker_decoder  # noqa: PLW0603
+
+    import torch
+    from nsfw_image_detector import NSFWDetector
+
+    torch.set_num_threads(threads_per_worker)
+    _worker_detector = NSFWDetector()
+    _worker_decoder = ImageDecoder(
+        target_size=decode_size,
+        sample_rate=decode_sample_rate,
+        stats=_worker_decode_stats,
+        duration=_worker_decode_durations,
+    )
+
+
+def _ping_worker() -> bool:
+    return _worker_detector is not None
+
+
+def _predict_shared_batch(
+        shared_memory_name: str,
+        slices: list[tuple[int, int]],
+) -> tuple[list[tuple[float, ...] | Exception], DecodeStatsSnapshot, _StageDurations]:
+    from nsfw_detector.infrastructure.inference.detector import predict_with_detector
+
+    inference_durations: _Durations = _Durations()
+    shared_memory: SharedMemory = SharedMemory(name=shared_memory_name)
+    try:
+        views: list[memoryview] = [shared_memory.buf[offset:offset + length] for offset, length in slices]
+        try:
+            results: list[ScoreVector | Exception] = predict_with_detector(
+                _worker_detector,
+                _worker_decoder,
+                views,
+                inference_duration=inference_durations,
+            )
+        finally:
+            for view in views:
+                view.release()
+    finally:
+        shared_memory.close()
+
+    # Plain tuples are the most compact to pickle back to the parent process.
+    # Decode counters of the worker are sent as increments and summed up by the parent process,
+    # stage durations are sent as is and observed by histograms of the parent process.
+    decode_durations: list[float] = list(_worker_decode_durations)
+    _worker_decode_durations.clear()
+    return (
+        [result if isinstance(result, Exception) else tuple(result) for result in results],
+        _worker_decode_stats.snapshot(reset=True),
+        (decode_durations, list(inference_durations)),
+    )
+
+
+class ProcessPoolInferenceBackend(InferenceBackend):
+    """
+    Runs the model in separate worker processes, so decoding and python parts of the model
+    don't contend on the GIL of the API process.
+
+    Each worker loads the model once on startup. Images of a batch are passed to a worker
+    through one shared memory block instead of being pickled, and scores come back as tuples.
+
+    A worker which died, for example killed by the OOM killer, breaks the whole pool,
+    so the broken pool is replaced by a new one and only batches in progress fail.
+    """
+
+    def __init__(self, config: InferenceConfig) -> None:
+        self._config: Final[InferenceConfig] = config
+        self._workers: Final[int] = config.workers
+        self._process_pool_executor: ProcessPoolExecutor = self.__create_pool()
+        self._decode_stats: Final[DecodeStats] = DecodeStats()
+
+    @property
+    @override
+    def decode_stats(self) -> DecodeStatsSnapshot:
+        return self._decode_stats.snapshot()
+
+    @override
+    async def start(self) -> None:
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        logger.info("Starting %s inference worker processes", self._workers)
+        await asyncio.gather(*(
+            loop.run_in_executor(self._process_pool_executor, _ping_worker)
+            for _ in range(self._workers)
+        ))
+
+    @override
+    async def close(self) -> None:
+        # Waiting for worker processes to exit blocks, so it is done outside of the event loop
+        await asyncio.to_thread(self._process_pool_executor.shutdown, wait=True, cancel_futures=True)
+        log_decode_stats(self.decode_stats)
+
+    @override
+    async def predict_batch(self, batch: Sequence[bytes]) -> list[ScoreVector | Exception]:
+        slices: list[tuple[int, int]] = []
+        offset: int = 0
+        for data in batch:
+            slices.append((offset, len(data)))
+            offset += len(data)
+
+        shared_memory: SharedMemory = SharedMemory(create=True, size=max(offset, 1))
+        try:
+            for data, (start, length) in zip(batch, slices):
+                shared_memory.buf[start:start + length] = data
+
+            process_pool_executor: ProcessPoolExecutor = self._process_pool_executor
+            try:
+                results, decode_stats, (decode_durations, inference_durations) = await asyncio.get_running_loop().run_in_executor(
+                    process_pool_executor,
+                    _predict_shared_batch,
+                    shared_memory.name,
+                    slices,
+                )
+            except BrokenProcessPool:
+                self.__replace_broken_pool(process_pool_executor)
+                raise
+        finally:
+            shared_memory.close()
+            shared_memory.unlink()
+
+        self._decode_stats.merge(decode_stats)
+        for duration in decode_durations:
+            DECODE_DURATION.observe(duration)
+        for duration in inference_durations:
+            INFERENCE_DURATION.observe(duration)
+        return [result if isinstance(result, Exception) else ScoreVector(*result) for result in results]
+
+    def __create_pool(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self._config.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_initialize_worker,
+            initargs=(self._config.threads_per_worker, self._config.decode_size, self._config.decode_sample_rate),
+        )
+
+    def __replace_broken_pool(self, broken: ProcessPoolExecutor) -> None:
+        # Concurrent batches of the broken pool fail together, the pool is replaced only once
+        if self._process_pool_executor is not broken:
+            return
+
+        logger.error("Inference worker process died, starting a new pool of %s processes", self._workers)
+        self._process_pool_executor = self.__create_pool()
+        broken.shutdown(wait=False, cancel_futures=True)
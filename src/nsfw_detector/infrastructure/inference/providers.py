@@ -0,0 +1,40 @@
+from typing import AsyncIterator
+
+from nsfw_detector.infrastructure.inference.base import InferenceBackend
+from nsfw_detector.infrastructure.inference.batcher import InferenceBatcher
+from nsfw_detector.infrastructure.inference.process_pool_backend import ProcessPoolInferenceBackend
+from nsfw_detector.infrastructure.metrics.instruments import IN_FLIGHT, INFERENCE_QUEUE_DEPTH, INFERENCE_QUEUE_LIMIT
+from nsfw_detector.setup.configs import InferenceConfig
+
+
+async def get_process_pool_inference_backend(config: InferenceConfig) -> AsyncIterator[InferenceBackend]:
+    backend: ProcessPoolInferenceBackend = ProcessPoolInferenceBackend(config=config)
+    await backend.start()
+    try:
+        yield backend
+    finally:
+        await backend.close()
+
+
+async def get_onnx_inference_backend(config: InferenceConfig) -> AsyncIterator[InferenceBackend]:
+    # numpy and ONNX Runtime are optional dependencies, they are imported only when the backend is selected
+    from nsfw_detector.infrastructure.inference.onnx_backend import OnnxInferenceBackend
+
+    backend: OnnxInferenceBackend = OnnxInferenceBackend(config=config)
+    await backend.start()
+    try:
+        yield backend
+    finally:
+        await backend.close()
+
+
+async def get_inference_batcher(backend: InferenceBackend, config: InferenceConfig) -> AsyncIterator[InferenceBatcher]:
+    batcher: InferenceBatcher = InferenceBatcher(backend=backend, config=config)
+    batcher.start()
+    INFERENCE_QUEUE_DEPTH.set_function(lambda: batcher.queue_depth)
+    INFERENCE_QUEUE_LIMIT.set(config.max_queue_depth)
+    IN_FLIGHT.labels("inference_batches").set_function(lambda: batcher.batches_in_progress)
+    try:
+        yield batcher
+    finally:
+        await batcher.close()
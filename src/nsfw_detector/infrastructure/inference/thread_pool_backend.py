@@ -0,0 +1,57 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Final, Sequence
+
+from nsfw_image_detector import NSFWDetector
+from typing_extensions import override
+
+from nsfw_detector.infrastructure.inference.base import InferenceBackend, ScoreVector
+from nsfw_detector.infrastructure.inference.decoding import (
+    DecodeStats,
+    DecodeStatsSnapshot,
+    ImageDecoder,
+    log_decode_stats,
+)
+from nsfw_detector.infrastructure.inference.detector import predict_with_detector
+from nsfw_detector.setup.configs import InferenceConfig
+
+
+class ThreadPoolInferenceBackend(InferenceBackend):
+    """Runs the model, loaded in the current process, on a pool of threads"""
+
+    def __init__(self, detector: NSFWDetector, config: InferenceConfig) -> None:
+        self._detector: Final[NSFWDetector] = detector
+        self._thread_pool_executor: Final[ThreadPoolExecutor] = ThreadPoolExecutor(
+            max_workers=config.workers,
+            thread_name_prefix="inference",
+        )
+        self._decode_stats: Final[DecodeStats] = DecodeStats()
+        self._decoder: Final[ImageDecoder] = ImageDecoder(
+            target_size=config.decode_size,
+            sample_rate=config.decode_sample_rate,
+            stats=self._decode_stats,
+        )
+
+    @property
+    @override
+    def decode_stats(self) -> DecodeStatsSnapshot:
+        return self._decode_stats.snapshot()
+
+    @override
+    async def start(self) -> None:
+        ...
+
+    @override
+    async def close(self) -> None:
+        self._thread_pool_executor.shutdown(wait=False, cancel_futures=True)
+        log_decode_stats(self.decode_stats)
+
+    @override
+    async def predict_batch(self, batch: Sequence[bytes]) -> list[ScoreVector | Exception]:
+        return await asyncio.get_running_loop().run_in_executor(
+            self._thread_pool_executor,
+            predict_with_detector,
+            self._detector,
+            self._decoder,
+            batch,
+        )
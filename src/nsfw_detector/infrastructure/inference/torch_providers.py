@@ -0,0 +1,65 @@
+"""
+Providers of the eager PyTorch backend. They import torch through the model package,
+so this module is imported only when the backend is selected.
+"""
+import logging
+from typing import AsyncIterator, Final
+
+import torch
+from nsfw_image_detector import NSFWDetector
+from PIL import Image
+
+from nsfw_detector.infrastructure.inference.base import InferenceBackend
+from nsfw_detector.infrastructure.inference.thread_pool_backend import ThreadPoolInferenceBackend
+from nsfw_detector.setup.configs import InferenceConfig
+
+logger: Final[logging.Logger] = logging.getLogger(__name__)
+
+# Model loaded by the prefork parent process, worker processes share its weights copy-on-write
+_preloaded_detector: NSFWDetector | None = None
+
+
+def preload_nsfw_detector(warmup_iterations: int) -> NSFWDetector:
+    """
+    Loads the model before worker processes are forked and runs forward passes of a dummy image.
+
+    Passes run on a single thread: threads of the intra-op pool don't survive fork,
+    so the parent process must not start them.
+
+    :param warmup_iterations: amount of forward passes, zero disables warmup
+    :return: loaded model, which ``get_nsfw_detector`` returns in forked processes
+    """
+    global _preloaded_detector  # noqa: PLW0603
+
+    torch.set_num_threads(1)
+    detector: NSFWDetector = NSFWDetector()
+    image: Image.Image = Image.new("RGB", (640, 480), color=(128, 128, 128))
+
+    with torch.inference_mode():
+        for _ in range(warmup_iterations):
+            detector.predict_proba([image])
+
+    logger.info("Model is preloaded for worker processes")
+    _preloaded_detector = detector
+    return detector
+
+
+def get_nsfw_detector(config: InferenceConfig) -> NSFWDetector:
+    if _preloaded_detector is None:
+        return NSFWDetector()
+
+    # Several processes share cores, so each one is limited like workers of the process backend
+    torch.set_num_threads(config.threads_per_worker)
+    return _preloaded_detector
+
+
+async def get_thread_pool_inference_backend(
+        detector: NSFWDetector,
+        config: InferenceConfig,
+) -> AsyncIterator[InferenceBackend]:
+    backend: ThreadPoolInferenceBackend = ThreadPoolInferenceBackend(detector=detector, config=config)
+    await backend.start()
+    try:
+        yield backend
+    finally:
+        await backend.close()
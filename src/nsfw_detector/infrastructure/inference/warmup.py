@@ -0,0 +1,41 @@
+import asyncio
+import io
+import logging
+from typing import Final
+
+from PIL import Image
+
+from nsfw_detector.infrastructure.inference.batcher import InferenceBatcher
+
+logger: Final[logging.Logger] = logging.getLogger(__name__)
+
+_WARMUP_IMAGE_SIZE: Final[tuple[int, int]] = (640, 480)
+
+
+def _dummy_image() -> bytes:
+    buffer: io.BytesIO = io.BytesIO()
+    Image.new("RGB", _WARMUP_IMAGE_SIZE, color=(128, 128, 128)).save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+async def warm_up_batcher(batcher: InferenceBatcher, iterations: int, batch_size: int) -> None:
+    """
+    Runs forward passes of a dummy image through the whole inference path: decoding, batching and the model.
+
+    First passes allocate memory, pick kernels and fill caches of the runtime, so they are much slower
+    than the following ones. Each iteration runs a single image and a full batch, so both shapes are
+    warm before the first real request.
+
+    :param batcher: started batcher of the local model
+    :param iterations: amount of iterations, zero disables warmup
+    :param batch_size: amount of images in the full batch
+    """
+    if iterations <= 0:
+        return
+
+    data: bytes = _dummy_image()
+
+    for iteration in range(iterations):
+        await batcher.predict(data)
+        await asyncio.gather(*(batcher.predict(data) for _ in range(batch_size)))
+        logger.debug("Warmup iteration %s of %s is done", iteration + 1, iterations)
@@ -0,0 +1,233 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Final
+
+from redis.asyncio import Redis
+from redis.asyncio.client import Pipeline
+from redis.exceptions import RedisError, ResponseError
+
+from nsfw_detector.application.common.errors.base import ApplicationError
+from nsfw_detector.application.queries.images.check_image_is_nsfw import CheckImageIsNSFWQuery
+from nsfw_detector.application.queries.images.policies import ModerationPolicies
+from nsfw_detector.infrastructure.adapters.jobs.redis_stream_job_gateway import image_key, job_key
+from nsfw_detector.setup.configs import JobsConfig
+
+logger: Final[logging.Logger] = logging.getLogger(__name__)
+
+ImageCheck = Callable[[CheckImageIsNSFWQuery], Awaitable[bool]]
+StreamEntry = tuple[bytes, dict[bytes, bytes]]
+
+
+class ModerationJobWorker:
+    """
+    Consumes moderation jobs from the Redis Stream as a member of the consumer group.
+
+    Each entry is delivered to one worker of the group. Entry is acknowledged and deleted only
+    after the result of the job is stored, in the same transaction, so a crashed worker loses nothing:
+    its pending entries are taken over with ``XAUTOCLAIM`` by another worker after ``claim_idle_ms``.
+    While an image is checked, the worker renews its claim every half of ``claim_idle_ms``,
+    so a check longer than ``claim_idle_ms`` is not taken over and done twice.
+
+    Rejected images fail the job at once. Other errors leave the entry pending, so it is retried
+    after ``claim_idle_ms``, until ``max_attempts`` is reached. Entries whose job has already expired,
+    e.g. after a long outage of workers, are dropped without checking the image, nobody can read the result.
+    """
+
+    def __init__(
+            self,
+            redis: Redis,
+            jobs_config: JobsConfig,
+            check: ImageCheck,
+            policies: ModerationPolicies,
+            consumer: str,
+    ) -> None:
+        self._redis: Final[Redis] = redis
+        self._config: Final[JobsConfig] = jobs_config
+        self._check: Final[ImageCheck] = check
+        self._policies: Final[ModerationPolicies] = policies
+        self._consumer: Final[str] = consumer
+        self._in_progress: Final[set[asyncio.Task[None]]] = set()
+        self._stopping: Final[asyncio.Event] = asyncio.Event()
+        self._claimed_at: float = 0.0
+
+    def stop(self) -> None:
+        """Stops reading new jobs, jobs in progress are finished"""
+        self._stopping.set()
+
+    async def run(self) -> None:
+        await self.__ensure_group()
+        logger.info(
+            "Worker %s consumes stream %s as a member of group %s",
+            self._consumer,
+            self._config.stream,
+            self._config.group,
+        )
+
+        try:
+            while not self._stopping.is_set():
+                free_slots: int = self._config.worker_concurrency - len(self._in_progress)
+                if free_slots <= 0:
+                    await asyncio.wait(self._in_progress, return_when=asyncio.FIRST_COMPLETED)
+                    continue
+
+                entries: list[StreamEntry] = await self.__claim_stale(free_slots) or await self.__read(free_slots)
+
+                for entry_id, fields in entries:
+                    task: asyncio.Task[None] = asyncio.create_task(self.__process_safely(entry_id, fields))
+                    self._in_progress.add(task)
+                    task.add_done_callback(self._in_progress.discard)
+        finally:
+            await asyncio.gather(*self._in_progress, return_exceptions=True)
+            logger.info("Worker %s is stopped", self._consumer)
+
+    async def __ensure_group(self) -> None:
+        try:
+            await self._redis.xgroup_create(self._config.stream, self._config.group, id="0", mkstream=True)
+        except ResponseError as error:
+            # Group is created by the first worker, others join it
+            if "BUSYGROUP" not in str(error):
+                raise
+
+    async def __read(self, count: int) -> list[StreamEntry]:
+        response: Any = await self._redis.xreadgroup(
+            self._config.group,
+            self._consumer,
+            {self._config.stream: ">"},
+            count=count,
+            block=self._config.read_block_ms,
+        )
+        return [entry for _, stream_entries in response or [] for entry in stream_entries]
+
+    async def __claim_stale(self, count: int) -> list[StreamEntry]:
+        # Pending entries can't become stale faster than claim_idle_ms, so they are looked up that often
+        if time.monotonic() - self._claimed_at < self._config.claim_idle_ms / 1000:
+            return []
+
+        response: Any = await self._redis.xautoclaim(
+            self._config.stream,
+            self._config.group,
+            self._consumer,
+            min_idle_time=self._config.claim_idle_ms,
+            start_id="0-0",
+            count=count,
+        )
+        entries: list[StreamEntry] = [(entry_id, fields) for entry_id, fields in response[1] if fields]
+
+        # Cursor is not kept: fewer entries than requested means all stale entries are claimed
+        if len(response[1]) < count:
+            self._claimed_at = time.monotonic()
+
+        if entries:
+            logger.info("Worker %s took over %s stale jobs", self._consumer, len(entries))
+        return entries
+
+    async def __process_safely(self, entry_id: bytes, fields: dict[bytes, bytes]) -> None:
+        try:
+            await self.__process(entry_id, fields)
+        except Exception:
+            # Entry stays pending, so the job is retried when it is claimed
+            logger.exception("Entry %s of stream %s can't be processed", entry_id, self._config.stream)
+
+    async def __process(self, entry_id: bytes, fields: dict[bytes, bytes]) -> None:
+        job_id: str = fields[b"job_id"].decode()
+        content_hash: str = fields[b"content_hash"].decode()
+        filename: str = fields[b"filename"].decode()
+        policy_name: str | None = fields.get(b"policy", b"").decode() or None
+
+        # HINCRBY creates a missing hash, so the job is checked for existence in the same transaction
+        # and its TTL is renewed, a job must never outlive result_ttl
+        pipeline: Pipeline
+        async with self._redis.pipeline(transaction=True) as pipeline:
+            pipeline.exists(job_key(job_id))
+            pipeline.hincrby(job_key(job_id), "attempts", 1)
+            pipeline.expire(job_key(job_id), self._config.result_ttl)
+            exists, attempts, _ = await pipeline.execute()
+
+        if not exists:
+            await self.__drop(entry_id, job_id)
+            return
+
+        if attempts > self._config.max_attempts:
+            await self.__finish(entry_id, job_id, {"status": "failed", "error": "Too many attempts"})
+            return
+
+        renewal: asyncio.Task[None] = asyncio.create_task(self.__keep_claimed(entry_id))
+        try:
+            await self.__check(entry_id, job_id, content_hash, filename, policy_name, attempts)
+        finally:
+            renewal.cancel()
+
+    async def __check(
+            self,
+            entry_id: bytes,
+            job_id: str,
+            content_hash: str,
+            filename: str,
+            policy_name: str | None,
+            attempts: int,
+    ) -> None:
+        await self._redis.hset(job_key(job_id), "status", "processing")
+        data: bytes | None = await self._redis.get(image_key(content_hash))
+
+        if data is None:
+            await self.__finish(entry_id, job_id, {"status": "failed", "error": "Image expired before it was checked"})
+            return
+
+        try:
+            is_allowed: bool = await self._check(
+                CheckImageIsNSFWQuery(
+                    content_of_image=data,
+                    filename_with_extension=filename,
+                    content_hash=content_hash,
+                    policy=self._policies.get(policy_name),
+                )
+            )
+        except ApplicationError as error:
+            await self.__finish(entry_id, job_id, {"status": "failed", "error": str(error)})
+        except Exception:
+            logger.exception("Attempt %s of job %s failed", attempts, job_id)
+
+            if attempts >= self._config.max_attempts:
+                await self.__finish(entry_id, job_id, {"status": "failed", "error": "Image can't be checked"})
+            else:
+                await self._redis.hset(job_key(job_id), "status", "queued")
+        else:
+            await self.__finish(entry_id, job_id, {"status": "done", "is_allowed": int(is_allowed)})
+
+    async def __keep_claimed(self, entry_id: bytes) -> None:
+        # XCLAIM resets idle time of the entry, JUSTID keeps the counter of deliveries as is
+        while True:
+            await asyncio.sleep(self._config.claim_idle_ms / 1000 / 2)
+            try:
+                await self._redis.xclaim(
+                    self._config.stream,
+                    self._config.group,
+                    self._consumer,
+                    min_idle_time=0,
+                    message_ids=[entry_id],
+                    justid=True,
+                )
+            except RedisError as error:
+                logger.warning("Failed to renew claim of entry %s: %s", entry_id, error)
+
+    async def __finish(self, entry_id: bytes, job_id: str, result: dict[str, Any]) -> None:
+        pipeline: Pipeline
+        async with self._redis.pipeline(transaction=True) as pipeline:
+            pipeline.hset(job_key(job_id), mapping={**result, "finished_at": time.time()})
+            pipeline.expire(job_key(job_id), self._config.result_ttl)
+            pipeline.xack(self._config.stream, self._config.group, entry_id)
+            pipeline.xdel(self._config.stream, entry_id)
+            await pipeline.execute()
+
+        logger.debug("Job %s is %s", job_id, result["status"])
+
+    async def __drop(self, entry_id: bytes, job_id: str) -> None:
+        pipeline: Pipeline
+        async with self._redis.pipeline(transaction=True) as pipeline:
+            pipeline.delete(job_key(job_id))
+            pipeline.xack(self._config.stream, self._config.group, entry_id)
+            pipeline.xdel(self._config.stream, entry_id)
+            await pipeline.execute()
+
+        logger.warning("Job %s expired before it was checked, its entry is dropped", job_id)
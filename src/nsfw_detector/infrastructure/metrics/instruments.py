@@ -0,0 +1,144 @@
+"""
+Metrics of the service. Children of labelled metrics used on the hot path are resolved here once,
+so instrumented code only observes values.
+"""
+from typing import Final, Protocol
+
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, disable_created_metrics
+
+# ``*_created`` series double the exposition and are not used by dashboards
+disable_created_metrics()
+
+REGISTRY: Final[CollectorRegistry] = CollectorRegistry()
+
+_DURATION_BUCKETS: Final[tuple[float, ...]] = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+class Observer(Protocol):
+    """Histogram or anything else which collects observed values, e.g. to send them to another process"""
+
+    def observe(self, amount: float) -> None:
+        ...
+
+
+STAGE_DURATION: Final[Histogram] = Histogram(
+    "nsfw_stage_duration_seconds",
+    "Duration of stages of an image check",
+    labelnames=("stage",),
+    buckets=_DURATION_BUCKETS,
+    registry=REGISTRY,
+)
+UPLOAD_READ_DURATION: Final[Histogram] = STAGE_DURATION.labels("upload_read")
+HASH_DURATION: Final[Histogram] = STAGE_DURATION.labels("hash")
+PERCEPTUAL_HASH_DURATION: Final[Histogram] = STAGE_DURATION.labels("perceptual_hash")
+CACHE_LOOKUP_DURATION: Final[Histogram] = STAGE_DURATION.labels("cache_lookup")
+QUEUE_WAIT_DURATION: Final[Histogram] = STAGE_DURATION.labels("queue_wait")
+DECODE_DURATION: Final[Histogram] = STAGE_DURATION.labels("decode")
+INFERENCE_DURATION: Final[Histogram] = STAGE_DURATION.labels("inference")
+REMOTE_CALL_DURATION: Final[Histogram] = STAGE_DURATION.labels("remote_call")
+
+HTTP_REQUEST_DURATION: Final[Histogram] = Histogram(
+    "nsfw_http_request_duration_seconds",
+    "Duration of HTTP requests",
+    labelnames=("method", "status"),
+    buckets=_DURATION_BUCKETS,
+    registry=REGISTRY,
+)
+
+INFERENCE_BATCH_SIZE: Final[Histogram] = Histogram(
+    "nsfw_inference_batch_size",
+    "Amount of images in one forward pass of the model",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128),
+    registry=REGISTRY,
+)
+
+ANIMATION_FRAMES: Final[Histogram] = Histogram(
+    "nsfw_animation_frames_checked",
+    "Amount of frames of an animated image checked by the model",
+    buckets=(1, 2, 4, 8, 16, 32, 64),
+    registry=REGISTRY,
+)
+
+CACHE_REQUESTS: Final[Counter] = Counter(
+    "nsfw_cache_requests_total",
+    "Lookups of verdicts in the cache",
+    labelnames=("layer", "result"),
+    registry=REGISTRY,
+)
+
+CACHE_HIT_RATIO: Final[Gauge] = Gauge(
+    "nsfw_cache_hit_ratio",
+    "Share of cache lookups which found a value since start",
+    labelnames=("layer",),
+    registry=REGISTRY,
+)
+
+IN_FLIGHT: Final[Gauge] = Gauge(
+    "nsfw_in_flight",
+    "Amount of operations in progress",
+    labelnames=("operation",),
+    registry=REGISTRY,
+)
+HTTP_REQUESTS_IN_FLIGHT: Final[Gauge] = IN_FLIGHT.labels("http_requests")
+
+INFERENCE_QUEUE_DEPTH: Final[Gauge] = Gauge(
+    "nsfw_inference_queue_depth",
+    "Amount of images waiting for a batch",
+    registry=REGISTRY,
+)
+
+INFERENCE_QUEUE_LIMIT: Final[Gauge] = Gauge(
+    "nsfw_inference_queue_limit",
+    "Amount of images waiting for a batch above which new images are rejected",
+    registry=REGISTRY,
+)
+
+INFERENCE_REJECTIONS: Final[Counter] = Counter(
+    "nsfw_inference_rejections_total",
+    "Images rejected by admission control of the local model",
+    labelnames=("reason",),
+    registry=REGISTRY,
+)
+
+BACKEND_ERRORS: Final[Counter] = Counter(
+    "nsfw_backend_errors_total",
+    "Failed checks of images by backend and type of error",
+    labelnames=("backend", "error"),
+    registry=REGISTRY,
+)
+
+STARTUP_DURATION: Final[Gauge] = Gauge(
+    "nsfw_startup_duration_seconds",
+    "Duration of startup phases of the app",
+    labelnames=("phase",),
+    registry=REGISTRY,
+)
+
+EXACT_CACHE_HITS: Final[Counter] = CACHE_REQUESTS.labels("exact", "hit")
+EXACT_CACHE_MISSES: Final[Counter] = CACHE_REQUESTS.labels("exact", "miss")
+PERCEPTUAL_CACHE_HITS: Final[Counter] = CACHE_REQUESTS.labels("perceptual", "hit")
+PERCEPTUAL_CACHE_MISSES: Final[Counter] = CACHE_REQUESTS.labels("perceptual", "miss")
+# Hit is an image confirmed to be unchanged by a conditional request
+URL_CACHE_HITS: Final[Counter] = CACHE_REQUESTS.labels("url", "hit")
+URL_CACHE_MISSES: Final[Counter] = CACHE_REQUESTS.labels("url", "miss")
+
+QUEUE_FULL_REJECTIONS: Final[Counter] = INFERENCE_REJECTIONS.labels("queue_full")
+EXPECTED_WAIT_REJECTIONS: Final[Counter] = INFERENCE_REJECTIONS.labels("expected_wait")
+EXPIRED_REJECTIONS: Final[Counter] = INFERENCE_REJECTIONS.labels("expired")
+
+
+def _hit_ratio(layer: str) -> float:
+    requests: dict[str, float] = {
+        sample.labels["result"]: sample.value
+        for metric in CACHE_REQUESTS.collect()
+        for sample in metric.samples
+        if sample.labels.get("layer") == layer
+    }
+    total: float = sum(requests.values())
+    return requests.get("hit", 0.0) / total if total else 0.0
+
+
+CACHE_HIT_RATIO.labels("exact").set_function(lambda: _hit_ratio("exact"))
+CACHE_HIT_RATIO.labels("perceptual").set_function(lambda: _hit_ratio("perceptual"))
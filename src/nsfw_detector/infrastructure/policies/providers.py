@@ -0,0 +1,8 @@
+from nsfw_detector.application.queries.images.policies import ModerationPolicies
+from nsfw_detector.setup.configs import ModerationConfig
+
+
+def get_moderation_policies(moderation_config: ModerationConfig) -> ModerationPolicies:
+    return ModerationPolicies.from_thresholds(
+        {name: policy.model_dump() for name, policy in moderation_config.policies.items()}
+    )
@@ -0,0 +1,144 @@
+import enum
+import logging
+import time
+from dataclasses import dataclass
+from typing import Final
+
+from nsfw_detector.setup.configs import RoutingConfig
+
+logger: Final[logging.Logger] = logging.getLogger(__name__)
+
+
+class CircuitState(enum.Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+@dataclass(frozen=True, slots=True)
+class BackendHealthSnapshot:
+    name: str
+    latency_seconds: float
+    in_flight: int
+    error_rate: float
+    circuit_state: CircuitState
+    expected_latency_seconds: float
+
+
+class BackendHealth:
+    """
+    Live health of one backend: smoothed latency, requests in flight, smoothed error rate
+    and a circuit breaker.
+
+    Expected latency of the next request grows with the amount of requests already in flight,
+    relative to how many of them the backend serves at once, so a saturated backend loses
+    traffic before its measured latency grows.
+
+    The circuit opens after ``failure_threshold`` consecutive failures or when the error rate
+    exceeds ``error_rate_threshold``. After ``open_seconds`` one probe request is let through:
+    its success closes the circuit, its failure opens it again.
+    """
+
+    def __init__(self, name: str, initial_latency_seconds: float, capacity: int, config: RoutingConfig) -> None:
+        self._name: Final[str] = name
+        self._capacity: Final[int] = capacity
+        self._alpha: Final[float] = config.ewma_alpha
+        self._failure_threshold: Final[int] = config.failure_threshold
+        self._error_rate_threshold: Final[float] = config.error_rate_threshold
+        self._open_seconds: Final[float] = config.open_seconds
+        self._latency: float = initial_latency_seconds
+        self._error_rate: float = 0.0
+        self._consecutive_failures: int = 0
+        self._in_flight: int = 0
+        self._state: CircuitState = CircuitState.CLOSED
+        self._opened_at: float = 0.0
+        self._probe_in_flight: bool = False
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def expected_latency(self) -> float:
+        return self._latency * (1 + self._in_flight / self._capacity)
+
+    def snapshot(self) -> BackendHealthSnapshot:
+        return BackendHealthSnapshot(
+            name=self._name,
+            latency_seconds=self._latency,
+            in_flight=self._in_flight,
+            error_rate=self._error_rate,
+            circuit_state=self._state,
+            expected_latency_seconds=self.expected_latency,
+        )
+
+    def is_available(self) -> bool:
+        if self._state is CircuitState.OPEN and time.monotonic() - self._opened_at >= self._open_seconds:
+            self._state = CircuitState.HALF_OPEN
+            self._probe_in_flight = False
+            logger.info("Circuit of backend %s is half open, probing it", self._name)
+
+        if self._state is CircuitState.HALF_OPEN:
+            return not self._probe_in_flight
+
+        return self._state is CircuitState.CLOSED
+
+    def on_start(self) -> None:
+        self._in_flight += 1
+        if self._state is CircuitState.HALF_OPEN:
+            self._probe_in_flight = True
+
+    def on_success(self, latency_seconds: float) -> None:
+        self._in_flight -= 1
+        self._latency += self._alpha * (latency_seconds - self._latency)
+        self._error_rate *= 1 - self._alpha
+        self._consecutive_failures = 0
+
+        if self._state is not CircuitState.CLOSED:
+            # Recovered backend starts clean, otherwise errors before the outage would open it again at once
+            logger.info("Circuit of backend %s is closed", self._name)
+            self._state = CircuitState.CLOSED
+            self._error_rate = 0.0
+
+    def on_failure(self) -> None:
+        self._in_flight -= 1
+        self._error_rate += self._alpha * (1 - self._error_rate)
+        self._consecutive_failures += 1
+
+        if self._state is CircuitState.HALF_OPEN or (
+                self._state is CircuitState.CLOSED and (
+                    self._consecutive_failures >= self._failure_threshold
+                    or self._error_rate > self._error_rate_threshold
+                )
+        ):
+            logger.warning(
+                "Circuit of backend %s is open for %ss after %s consecutive failures, error rate %.2f",
+                self._name,
+                self._open_seconds,
+                self._consecutive_failures,
+                self._error_rate,
+            )
+            self._state = CircuitState.OPEN
+            self._opened_at = time.monotonic()
+            self._probe_in_flight = False
+
+    def on_cancel(self) -> None:
+        self._in_flight -= 1
+        self._probe_in_flight = False
+
+
+class BackendHealthRegistry:
+    """App-wide health of routed backends, shared by gateways of all requests"""
+
+    def __init__(self, backends: list[BackendHealth]) -> None:
+        self._backends: Final[dict[str, BackendHealth]] = {backend.name: backend for backend in backends}
+
+    def __getitem__(self, name: str) -> BackendHealth:
+        return self._backends[name]
+
+    def snapshot(self) -> list[BackendHealthSnapshot]:
+        return [backend.snapshot() for backend in self._backends.values()]
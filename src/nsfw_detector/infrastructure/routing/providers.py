@@ -0,0 +1,46 @@
+from typing import Final
+
+from nsfw_detector.application.common.ports.images.query_gateway import ImageQueryGateway
+from nsfw_detector.infrastructure.adapters.images.gen_ai_query_gateway import GenAIImageQueryGateway
+from nsfw_detector.infrastructure.adapters.images.nsfw_detector_query_gateway import NSFWDetectorImageQueryGateway
+from nsfw_detector.infrastructure.adapters.images.routing_query_gateway import RoutingImageQueryGateway
+from nsfw_detector.infrastructure.metrics.instruments import IN_FLIGHT
+from nsfw_detector.infrastructure.routing.health import BackendHealth, BackendHealthRegistry
+from nsfw_detector.setup.configs import RoutingConfig
+
+LOCAL_BACKEND: Final[str] = "local"
+REMOTE_BACKEND: Final[str] = "remote"
+
+
+def get_backend_health_registry(routing_config: RoutingConfig) -> BackendHealthRegistry:
+    registry: BackendHealthRegistry = BackendHealthRegistry([
+        BackendHealth(
+            name=LOCAL_BACKEND,
+            initial_latency_seconds=routing_config.local_initial_latency_ms / 1000,
+            capacity=routing_config.local_capacity,
+            config=routing_config,
+        ),
+        BackendHealth(
+            name=REMOTE_BACKEND,
+            initial_latency_seconds=routing_config.remote_initial_latency_ms / 1000,
+            capacity=routing_config.remote_capacity,
+            config=routing_config,
+        ),
+    ])
+
+    for name in (LOCAL_BACKEND, REMOTE_BACKEND):
+        health: BackendHealth = registry[name]
+        IN_FLIGHT.labels(f"{name}_backend").set_function(lambda health=health: health.in_flight)
+
+    return registry
+
+
+def get_routing_image_query_gateway(
+        local: NSFWDetectorImageQueryGateway,
+        remote: GenAIImageQueryGateway,
+        health: BackendHealthRegistry,
+) -> ImageQueryGateway:
+    return RoutingImageQueryGateway(backends=[
+        (local, health[LOCAL_BACKEND]),
+        (remote, health[REMOTE_BACKEND]),
+    ])
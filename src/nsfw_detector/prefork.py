@@ -0,0 +1,186 @@
+import gc
+import logging
+import os
+import signal
+import socket
+import time
+from types import FrameType
+from typing import Callable, Final
+
+from nsfw_detector.setup.configs import Configs
+
+logger: Final[logging.Logger] = logging.getLogger(__name__)
+
+ServeWorker = Callable[[socket.socket], None]
+
+_SHUTDOWN_TIMEOUT_SECONDS: Final[float] = 30.0
+_MIN_UPTIME_SECONDS: Final[float] = 5.0
+_MAX_RESTART_DELAY_SECONDS: Final[float] = 30.0
+_POLL_INTERVAL_SECONDS: Final[float] = 0.1
+
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    """
+    Binds the listening socket, which is inherited by all worker processes.
+
+    ``SO_REUSEPORT`` lets a new instance bind the same port while the old one drains,
+    so the server is restarted without refusing connections.
+    """
+    family: socket.AddressFamily = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock: socket.socket = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if hasattr(socket, "SO_REUSEPORT"):
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    sock.listen(socket.SOMAXCONN)
+    sock.set_inheritable(True)
+    return sock
+
+
+def preload_local_model(configs: Configs) -> None:
+    """
+    Loads the local model in the parent process, so forked workers share its weights copy-on-write.
+
+    Only the eager PyTorch model can be shared: ONNX Runtime sessions own thread pools,
+    which don't survive fork, so each worker loads the ONNX model itself.
+    """
+    if configs.routing.mode == "remote":
+        return
+
+    if configs.inference.backend == "process":
+        raise RuntimeError("INFERENCE_BACKEND=process starts its own model processes, use it with one API worker")
+
+    if configs.inference.backend == "onnx":
+        logger.info("ONNX model is loaded by each worker, it can't be shared across fork")
+        return
+
+    from nsfw_detector.infrastructure.inference.torch_providers import preload_nsfw_detector
+
+    started_at: float = time.perf_counter()
+    preload_nsfw_detector(warmup_iterations=configs.inference.warmup_iterations)
+    logger.info("Model is loaded and warmed up in %.2fs before fork", time.perf_counter() - started_at)
+
+
+class PreforkSupervisor:
+    """
+    Forks worker processes, which serve the inherited listening socket, and keeps their amount.
+
+    A crashed worker is replaced at once, unless it crashed shortly after start: then restarts
+    are delayed exponentially, so a broken deployment doesn't fork in a loop.
+    SIGINT and SIGTERM are forwarded to workers, which finish requests in progress;
+    workers still running after the shutdown timeout are killed.
+    """
+
+    def __init__(self, sock: socket.socket, workers: int, serve_worker: ServeWorker) -> None:
+        self._sock: Final[socket.socket] = sock
+        self._workers: Final[int] = workers
+        self._serve_worker: Final[ServeWorker] = serve_worker
+        self._processes: Final[dict[int, float]] = {}
+        self._stopping_at: float | None = None
+        self._restart_delay: float = 0.0
+
+    def run(self) -> None:
+        for signal_number in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signal_number, self.__stop)
+
+        # Objects created so far, including the model, are never collected, so collections
+        # in workers don't write to their pages and memory stays shared
+        gc.collect()
+        gc.freeze()
+
+        for _ in range(self._workers):
+            self.__spawn()
+
+        while self._processes:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+
+            if pid == 0:
+                self.__kill_after_timeout()
+                time.sleep(_POLL_INTERVAL_SECONDS)
+                continue
+
+            started_at: float | None = self._processes.pop(pid, None)
+            if started_at is None or self._stopping_at is not None:
+                continue
+
+            logger.warning("Worker %s exited with code %s, starting a new one", pid, os.waitstatus_to_exitcode(status))
+            self.__delay_restart(uptime=time.monotonic() - started_at)
+            if self._stopping_at is None:
+                self.__spawn()
+
+        logger.info("All workers are stopped")
+
+    def __spawn(self) -> None:
+        pid: int = os.fork()
+
+        if pid == 0:
+            self.__run_worker()
+
+        self._processes[pid] = time.monotonic()
+        logger.info("Started worker %s", pid)
+
+    def __run_worker(self) -> None:
+        # Server of the worker installs its own handlers for graceful shutdown
+        for signal_number in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signal_number, signal.SIG_DFL)
+
+        exit_code: int = 0
+        try:
+            self._serve_worker(self._sock)
+        except BaseException:
+            logger.exception("Worker %s failed", os.getpid())
+            exit_code = 1
+        finally:
+            # Never return into the loop of the supervisor
+            os._exit(exit_code)
+
+    def __delay_restart(self, uptime: float) -> None:
+        if uptime >= _MIN_UPTIME_SECONDS:
+            self._restart_delay = 0.0
+            return
+
+        self._restart_delay = min(max(self._restart_delay * 2, 1.0), _MAX_RESTART_DELAY_SECONDS)
+        logger.warning("Worker crashed %.2fs after start, next one starts in %ss", uptime, self._restart_delay)
+        time.sleep(self._restart_delay)
+
+    def __stop(self, signal_number: int, _: FrameType | None) -> None:
+        if self._stopping_at is not None:
+            return
+
+        logger.info("Received %s, stopping %s workers", signal.Signals(signal_number).name, len(self._processes))
+        self._stopping_at = time.monotonic()
+        for pid in self._processes:
+            self.__signal(pid, signal.SIGTERM)
+
+    def __kill_after_timeout(self) -> None:
+        if self._stopping_at is None or time.monotonic() - self._stopping_at < _SHUTDOWN_TIMEOUT_SECONDS:
+            return
+
+        for pid in self._processes:
+            logger.warning("Worker %s didn't stop in %ss, killing it", pid, _SHUTDOWN_TIMEOUT_SECONDS)
+            self.__signal(pid, signal.SIGKILL)
+        self._stopping_at = time.monotonic()
+
+    @staticmethod
+    def __signal(pid: int, signal_number: int) -> None:
+        try:
+            os.kill(pid, signal_number)
+        except ProcessLookupError:
+            ...
+
+
+def serve_prefork(configs: Configs, workers: int, serve_worker: ServeWorker) -> None:
+    """
+    Runs the API in ``workers`` forked processes.
+
+    The model is loaded and warmed up once, before fork, so all workers share its weights
+    and memory stays close to one copy, while requests are served by all cores.
+    """
+    preload_local_model(configs)
+    sock: socket.socket = bind_socket(configs.asgi.host, configs.asgi.port)
+    logger.info("Running API in %s workers on %s:%s", workers, configs.asgi.host, configs.asgi.port)
+
+    try:
+        PreforkSupervisor(sock=sock, workers=workers, serve_worker=serve_worker).run()
+    finally:
+        sock.close()
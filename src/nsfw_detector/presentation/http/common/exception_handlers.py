@@ -10,10 +10,26 @@ from fastapi.requests import Request
 from fastapi.responses import ORJSONResponse
 
 from nsfw_detector.application.common.errors.base import ApplicationError
-from nsfw_detector.application.common.errors.images import NotAllowedExtensionOfImage, FailedToProcessImage
+from nsfw_detector.application.common.errors.images import (
+    FailedToFetchImage,
+    FailedToProcessImage,
+    ImageTooLarge,
+    NotAllowedExtensionOfImage,
+    NotAllowedImageUrl,
+    TooManyImagesInBatch,
+    UnknownModerationPolicy,
+)
+from nsfw_detector.application.common.errors.jobs import ModerationJobNotFound, ModerationJobQueueIsFull
 from nsfw_detector.infrastructure.errors.base import (
     InfrastructureError,
 )
+from nsfw_detector.infrastructure.errors.http import (
+    RemoteRequestFailedError,
+    RemoteRequestTimeoutError,
+    ServiceUnAvailableError,
+)
+from nsfw_detector.infrastructure.errors.inference import InferenceOverloadedError
+from nsfw_detector.infrastructure.errors.routing import NoAvailableBackendError
 
 logger: Final[logging.Logger] = logging.getLogger(__name__)
 
@@ -33,14 +49,32 @@ class ExceptionHandler:
     _ERROR_MAPPING: Final[MappingProxyType[type[Exception], int]] = MappingProxyType({
         # 400
         FailedToProcessImage: status.HTTP_400_BAD_REQUEST,
+        # 404
+        ModerationJobNotFound: status.HTTP_404_NOT_FOUND,
+        # 413
+        ImageTooLarge: status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
         # 422
         pydantic.ValidationError: status.HTTP_422_UNPROCESSABLE_ENTITY,
         NotAllowedExtensionOfImage: status.HTTP_422_UNPROCESSABLE_ENTITY,
+        NotAllowedImageUrl: status.HTTP_422_UNPROCESSABLE_ENTITY,
+        FailedToFetchImage: status.HTTP_422_UNPROCESSABLE_ENTITY,
+        TooManyImagesInBatch: status.HTTP_422_UNPROCESSABLE_ENTITY,
+        UnknownModerationPolicy: status.HTTP_422_UNPROCESSABLE_ENTITY,
+        # 429
+        InferenceOverloadedError: status.HTTP_429_TOO_MANY_REQUESTS,
 
         # 500
         ApplicationError: status.HTTP_500_INTERNAL_SERVER_ERROR,
         InfrastructureError: status.HTTP_500_INTERNAL_SERVER_ERROR,
         Exception: status.HTTP_500_INTERNAL_SERVER_ERROR,
+        # 502
+        RemoteRequestFailedError: status.HTTP_502_BAD_GATEWAY,
+        # 503
+        ServiceUnAvailableError: status.HTTP_503_SERVICE_UNAVAILABLE,
+        ModerationJobQueueIsFull: status.HTTP_503_SERVICE_UNAVAILABLE,
+        NoAvailableBackendError: status.HTTP_503_SERVICE_UNAVAILABLE,
+        # 504
+        RemoteRequestTimeoutError: status.HTTP_504_GATEWAY_TIMEOUT,
     })
 
     def __init__(self, app: FastAPI):
@@ -75,9 +109,14 @@ class ExceptionHandler:
         else:
             logger.warning("Exception '%s' occurred: '%s'.", type(exc).__name__, exc)
 
+        headers: dict[str, str] | None = None
+        if isinstance(exc, InferenceOverloadedError):
+            headers = {"Retry-After": str(exc.retry_after_seconds)}
+
         return ORJSONResponse(
             status_code=status_code,
             content=response,
+            headers=headers,
         )
 
     def setup_handlers(self) -> None:
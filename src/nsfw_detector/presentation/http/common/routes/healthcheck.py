@@ -1,11 +1,17 @@
 from typing import Final
 
-from fastapi import APIRouter, status
+from dishka import FromDishka
+from dishka.integrations.fastapi import DishkaRoute
+from fastapi import APIRouter, Response, status
+
+from nsfw_detector.infrastructure.metrics.instruments import REGISTRY
+from nsfw_detector.setup.configs import InferenceConfig
 
 router: Final[APIRouter] = APIRouter(
     prefix="/healthcheck",
     tags=["Healthcheck"],
     include_in_schema=True,
+    route_class=DishkaRoute,
 )
 
 
@@ -23,4 +29,32 @@ async def get_status() -> dict[str, str]:
         - Returns HTTP 200 OK when service is operational
         - Included in OpenAPI schema documentation
     """
-    return {"message": "ok", "status": "success"}
\ No newline at end of file
+    return {"message": "ok", "status": "success"}
+
+
+@router.get("/ready", status_code=status.HTTP_200_OK)
+async def get_readiness(
+        response: Response,
+        inference_config: FromDishka[InferenceConfig],
+) -> dict[str, str | float]:
+    """Readiness endpoint for load balancers.
+
+    Returns:
+        dict[str, str | float]: Response with keys:
+            - "status": "ready" or "overloaded"
+            - "queue_depth": Images waiting for the local model
+            - "queue_limit": Images waiting for the local model above which new images are rejected
+
+    Notes:
+        - Returns HTTP 503 when the queue of the local model is filled to INFERENCE_READY_QUEUE_RATIO,
+          so load balancer sheds load before requests are rejected or latency grows
+        - Without the local model the queue limit is zero and the instance is always ready
+    """
+    queue_depth: float = REGISTRY.get_sample_value("nsfw_inference_queue_depth") or 0.0
+    queue_limit: float = REGISTRY.get_sample_value("nsfw_inference_queue_limit") or 0.0
+
+    if queue_limit and queue_depth >= queue_limit * inference_config.ready_queue_ratio:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+        return {"status": "overloaded", "queue_depth": queue_depth, "queue_limit": queue_limit}
+
+    return {"status": "ready", "queue_depth": queue_depth, "queue_limit": queue_limit}
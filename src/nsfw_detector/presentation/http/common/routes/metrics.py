@@ -0,0 +1,22 @@
+from typing import Final
+
+from fastapi import APIRouter, Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+from nsfw_detector.infrastructure.metrics.instruments import REGISTRY
+
+router: Final[APIRouter] = APIRouter(
+    prefix="/metrics",
+    tags=["Metrics"],
+    include_in_schema=False,
+)
+
+
+@router.get("")
+async def get_metrics() -> Response:
+    """Metrics of the service in Prometheus text exposition format.
+
+    Returns:
+        Response: Stage latency histograms, cache hit ratios, in-flight gauges and error counters.
+    """
+    return Response(content=generate_latest(REGISTRY), media_type=CONTENT_TYPE_LATEST)
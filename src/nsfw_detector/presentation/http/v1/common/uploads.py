@@ -0,0 +1,52 @@
+import hashlib
+import time
+from dataclasses import dataclass
+
+from fastapi import UploadFile
+
+from nsfw_detector.application.common.errors.images import ImageTooLarge
+from nsfw_detector.infrastructure.metrics.instruments import HASH_DURATION, UPLOAD_READ_DURATION
+
+
+@dataclass(frozen=True, slots=True)
+class UploadedImage:
+    content: bytes
+    content_hash: str
+    filename: str | None
+
+
+async def read_upload(upload: UploadFile, max_bytes: int, chunk_size: int) -> UploadedImage:
+    """
+    Reads uploaded file in chunks without blocking the event loop.
+    SHA-256 of the content is computed while reading, so it is not hashed again later.
+
+    :param upload: uploaded file from the request
+    :param max_bytes: reading stops as soon as the file crosses this size
+    :param chunk_size: size of one read
+    :raises ImageTooLarge: if file is larger than ``max_bytes``
+    """
+    if upload.size is not None and upload.size > max_bytes:
+        raise ImageTooLarge(f"{upload.filename} is larger than {max_bytes} bytes")
+
+    started_at: float = time.perf_counter()
+    hash_seconds: float = 0.0
+    digest = hashlib.sha256()
+    content: bytearray = bytearray()
+
+    while chunk := await upload.read(chunk_size):
+        if len(content) + len(chunk) > max_bytes:
+            raise ImageTooLarge(f"{upload.filename} is larger than {max_bytes} bytes")
+
+        hash_started_at: float = time.perf_counter()
+        digest.update(chunk)
+        hash_seconds += time.perf_counter() - hash_started_at
+        content += chunk
+
+    HASH_DURATION.observe(hash_seconds)
+    UPLOAD_READ_DURATION.observe(time.perf_counter() - started_at - hash_seconds)
+
+    return UploadedImage(
+        content=bytes(content),
+        content_hash=digest.hexdigest(),
+        filename=upload.filename,
+    )
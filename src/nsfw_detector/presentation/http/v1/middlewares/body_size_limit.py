@@ -0,0 +1,76 @@
+from typing import Final
+
+from fastapi import status
+from fastapi.responses import ORJSONResponse
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+class RequestBodyTooLargeError(Exception):
+    ...
+
+
+class BodySizeLimitMiddleware:
+    """
+    Rejects requests with body larger than ``max_body_bytes`` with 413.
+
+    Declared ``Content-Length`` is checked before the body is read. Chunked bodies are counted
+    while they are received, and the request is cut off as soon as it crosses the limit,
+    so hostile uploads don't get spooled completely.
+    """
+
+    def __init__(self, app: ASGIApp, max_body_bytes: int) -> None:
+        self._app: Final[ASGIApp] = app
+        self._max_body_bytes: Final[int] = max_body_bytes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self._app(scope, receive, send)
+            return
+
+        content_length: str | None = Headers(scope=scope).get("content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > self._max_body_bytes:
+            await self.__reject(scope, receive, send)
+            return
+
+        received_bytes: int = 0
+        exceeded: bool = False
+        response_started: bool = False
+
+        async def limited_receive() -> Message:
+            nonlocal received_bytes, exceeded
+            message: Message = await receive()
+
+            if message["type"] == "http.request":
+                received_bytes += len(message.get("body", b""))
+                if received_bytes > self._max_body_bytes:
+                    exceeded = True
+                    raise RequestBodyTooLargeError
+
+            return message
+
+        async def guarded_send(message: Message) -> None:
+            nonlocal response_started
+            if exceeded:
+                # The application failed to parse the cut off body, its response is replaced with 413
+                if not response_started:
+                    response_started = True
+                    await self.__reject(scope, receive, send)
+                return
+
+            response_started = response_started or message["type"] == "http.response.start"
+            await send(message)
+
+        try:
+            await self._app(scope, limited_receive, guarded_send)
+        except RequestBodyTooLargeError:
+            if not response_started:
+                response_started = True
+                await self.__reject(scope, receive, send)
+
+    async def __reject(self, scope: Scope, receive: Receive, send: Send) -> None:
+        response: ORJSONResponse = ORJSONResponse(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            content={"description": f"Request body is larger than {self._max_body_bytes} bytes"},
+        )
+        await response(scope, receive, send)
@@ -5,6 +5,15 @@ from fastapi import APIRouter
 from nsfw_detector.presentation.http.v1.routes.images.check_image_nsfw.handler import (
     router as check_image_nsfw_router,
 )
+from nsfw_detector.presentation.http.v1.routes.images.check_image_nsfw_by_url.handler import (
+    router as check_image_nsfw_by_url_router,
+)
+from nsfw_detector.presentation.http.v1.routes.images.check_images_nsfw_batch.handler import (
+    router as check_images_nsfw_batch_router,
+)
+from nsfw_detector.presentation.http.v1.routes.images.moderation_jobs.handler import (
+    router as moderation_jobs_router,
+)
 
 router: Final[APIRouter] = APIRouter(
     prefix="/images",
@@ -13,6 +22,9 @@ router: Final[APIRouter] = APIRouter(
 
 users_sub_routers: tuple[APIRouter, ...] = (
     check_image_nsfw_router,
+    check_image_nsfw_by_url_router,
+    check_images_nsfw_batch_router,
+    moderation_jobs_router,
 )
 
 for sub_router in users_sub_routers:
@@ -3,16 +3,19 @@ from typing import Final, Annotated
 
 from dishka import FromDishka
 from dishka.integrations.fastapi import DishkaRoute
-from fastapi import APIRouter, UploadFile, File
+from fastapi import APIRouter, UploadFile, File, Header
 from starlette import status
 
 from nsfw_detector.application.queries.images.check_image_is_nsfw import (
     CheckImageIsNSFWQueryHandler,
     CheckImageIsNSFWQuery
 )
+from nsfw_detector.application.queries.images.policies import ModerationPolicies
+from nsfw_detector.presentation.http.v1.common.uploads import UploadedImage, read_upload
 from nsfw_detector.presentation.http.v1.routes.images.check_image_nsfw.schemas import (
     CheckImageIsNSFWResponseSchema
 )
+from nsfw_detector.setup.configs import ModerationConfig
 
 logger: Final[logging.Logger] = logging.getLogger(__name__)
 router: Final[APIRouter] = APIRouter(route_class=DishkaRoute)
@@ -22,19 +25,36 @@ router: Final[APIRouter] = APIRouter(route_class=DishkaRoute)
     "/moderate",
     summary="Moderate image for nsfw",
     status_code=status.HTTP_200_OK,
-    description="Api handler for moderating image if it has nsfw content. Returns True if nsfw score > 0.7",
+    description=(
+        "Api handler for moderating image if it has nsfw content. "
+        "Image is rejected if its scores don't pass the moderation policy, by default if neutral score <= 0.7"
+    ),
     response_model_exclude_none=True,
 )
 async def handle_check_image_nsfw(
         image: Annotated[UploadFile, File(
-            description="File with jpg and png extension",
+            description="File with jpg, png, gif and webp extension",
             examples=["super.jpg", "puper.png"]
         )],
-        interactor: FromDishka[CheckImageIsNSFWQueryHandler]
+        interactor: FromDishka[CheckImageIsNSFWQueryHandler],
+        moderation_config: FromDishka[ModerationConfig],
+        policies: FromDishka[ModerationPolicies],
+        x_moderation_policy: str | None = Header(
+            default=None,
+            description="Name of the moderation policy from MODERATION_POLICIES, the default policy is used without it",
+        ),
 ) -> CheckImageIsNSFWResponseSchema:
+    uploaded_image: UploadedImage = await read_upload(
+        upload=image,
+        max_bytes=moderation_config.max_image_bytes,
+        chunk_size=moderation_config.upload_chunk_size,
+    )
+
     query: CheckImageIsNSFWQuery = CheckImageIsNSFWQuery(
-        content_of_image=image.file.read(),
-        filename_with_extension=image.filename
+        content_of_image=uploaded_image.content,
+        filename_with_extension=image.filename,
+        content_hash=uploaded_image.content_hash,
+        policy=policies.get(x_moderation_policy),
     )
 
     response_from_interactor: bool | None = await interactor(query)
@@ -0,0 +1,57 @@
+import logging
+from typing import Final
+
+from dishka import FromDishka
+from dishka.integrations.fastapi import DishkaRoute
+from fastapi import APIRouter, Header
+from starlette import status
+
+from nsfw_detector.application.queries.images.check_image_by_url import (
+    CheckImageIsNSFWByUrlQuery,
+    CheckImageIsNSFWByUrlQueryHandler,
+)
+from nsfw_detector.application.queries.images.policies import ModerationPolicies
+from nsfw_detector.presentation.http.v1.routes.images.check_image_nsfw.schemas import (
+    CheckImageIsNSFWResponseSchema
+)
+from nsfw_detector.presentation.http.v1.routes.images.check_image_nsfw_by_url.schemas import (
+    CheckImageIsNSFWByUrlRequestSchema
+)
+
+logger: Final[logging.Logger] = logging.getLogger(__name__)
+router: Final[APIRouter] = APIRouter(route_class=DishkaRoute)
+
+
+@router.post(
+    "/moderate/url",
+    summary="Moderate image by URL for nsfw",
+    status_code=status.HTTP_200_OK,
+    description=(
+        "Api handler for moderating image by its URL, without uploading it. "
+        "Image is downloaded by the service, unchanged images are answered from cache after a conditional request"
+    ),
+    response_model_exclude_none=True,
+)
+async def handle_check_image_nsfw_by_url(
+        body: CheckImageIsNSFWByUrlRequestSchema,
+        interactor: FromDishka[CheckImageIsNSFWByUrlQueryHandler],
+        policies: FromDishka[ModerationPolicies],
+        x_moderation_policy: str | None = Header(
+            default=None,
+            description="Name of the moderation policy from MODERATION_POLICIES, the default policy is used without it",
+        ),
+) -> CheckImageIsNSFWResponseSchema:
+    query: CheckImageIsNSFWByUrlQuery = CheckImageIsNSFWByUrlQuery(
+        url=body.url,
+        policy=policies.get(x_moderation_policy),
+    )
+
+    if await interactor(query):
+        return CheckImageIsNSFWResponseSchema(
+            status="OK"
+        )
+
+    return CheckImageIsNSFWResponseSchema(
+        status="REJECTED",
+        reason="NSFW content"
+    )
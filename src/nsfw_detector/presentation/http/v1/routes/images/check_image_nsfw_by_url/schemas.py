@@ -0,0 +1,10 @@
+from pydantic import BaseModel, Field
+
+
+class CheckImageIsNSFWByUrlRequestSchema(BaseModel):
+    url: str = Field(
+        min_length=1,
+        max_length=2048,
+        description="http or https URL of the image",
+        examples=["https://cdn.example.com/images/super.jpg"],
+    )
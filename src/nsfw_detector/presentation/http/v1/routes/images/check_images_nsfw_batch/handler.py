@@ -0,0 +1,149 @@
+import asyncio
+import logging
+from typing import Final, Annotated, AsyncIterator
+
+from dishka import FromDishka
+from dishka.integrations.fastapi import DishkaRoute
+from fastapi import APIRouter, UploadFile, File, Header
+from fastapi.responses import StreamingResponse
+from starlette import status
+
+from nsfw_detector.application.common.errors.base import ApplicationError
+from nsfw_detector.application.common.errors.images import TooManyImagesInBatch
+from nsfw_detector.application.queries.images.check_image_is_nsfw import (
+    CheckImageIsNSFWQueryHandler,
+    CheckImageIsNSFWQuery
+)
+from nsfw_detector.application.queries.images.policies import ModerationPolicies, ModerationPolicy
+from nsfw_detector.infrastructure.errors.inference import InferenceOverloadedError
+from nsfw_detector.presentation.http.v1.common.uploads import UploadedImage, read_upload
+from nsfw_detector.presentation.http.v1.routes.images.check_images_nsfw_batch.schemas import (
+    CheckImageNSFWBatchItemSchema
+)
+from nsfw_detector.setup.configs import ModerationConfig
+
+logger: Final[logging.Logger] = logging.getLogger(__name__)
+router: Final[APIRouter] = APIRouter(route_class=DishkaRoute)
+
+
+@router.post(
+    "/moderate/batch",
+    summary="Moderate many images for nsfw",
+    status_code=status.HTTP_200_OK,
+    description=(
+        "Api handler for moderating many images in one request. "
+        "Streams one NDJSON line per image as soon as its check is finished, so lines are not ordered. "
+        "Image is rejected if its scores don't pass the moderation policy, by default if neutral score <= 0.7"
+    ),
+    response_class=StreamingResponse,
+)
+async def handle_check_images_nsfw_batch(
+        images: Annotated[list[UploadFile], File(
+            description="Files with jpg, png, gif and webp extension",
+            examples=["super.jpg", "puper.png"]
+        )],
+        interactor: FromDishka[CheckImageIsNSFWQueryHandler],
+        moderation_config: FromDishka[ModerationConfig],
+        policies: FromDishka[ModerationPolicies],
+        x_moderation_policy: str | None = Header(
+            default=None,
+            description="Name of the moderation policy from MODERATION_POLICIES, the default policy is used without it",
+        ),
+) -> StreamingResponse:
+    policy: ModerationPolicy = policies.get(x_moderation_policy)
+
+    if len(images) > moderation_config.batch_max_files:
+        raise TooManyImagesInBatch(
+            f"Batch contains {len(images)} images. Please provide at most {moderation_config.batch_max_files} images"
+        )
+
+    # Files are read before streaming starts, because they are closed after the handler returns
+    queries: list[CheckImageIsNSFWQuery] = []
+    for image in images:
+        uploaded_image: UploadedImage = await read_upload(
+            upload=image,
+            max_bytes=moderation_config.max_image_bytes,
+            chunk_size=moderation_config.upload_chunk_size,
+        )
+        queries.append(
+            CheckImageIsNSFWQuery(
+                content_of_image=uploaded_image.content,
+                filename_with_extension=image.filename,
+                content_hash=uploaded_image.content_hash,
+                policy=policy,
+            )
+        )
+
+    return StreamingResponse(
+        stream_verdicts(
+            queries=queries,
+            interactor=interactor,
+            concurrency=moderation_config.batch_concurrency,
+        ),
+        media_type="application/x-ndjson",
+    )
+
+
+async def stream_verdicts(
+        queries: list[CheckImageIsNSFWQuery],
+        interactor: CheckImageIsNSFWQueryHandler,
+        concurrency: int,
+) -> AsyncIterator[str]:
+    semaphore: asyncio.Semaphore = asyncio.Semaphore(concurrency)
+
+    async def check(index: int, query: CheckImageIsNSFWQuery) -> CheckImageNSFWBatchItemSchema:
+        async with semaphore:
+            return await check_image(index, query, interactor)
+
+    tasks: list[asyncio.Task[CheckImageNSFWBatchItemSchema]] = [
+        asyncio.create_task(check(index, query))
+        for index, query in enumerate(queries)
+    ]
+
+    try:
+        for finished in asyncio.as_completed(tasks):
+            item: CheckImageNSFWBatchItemSchema = await finished
+            yield item.model_dump_json(exclude_none=True) + "\n"
+    finally:
+        # Client may disconnect in the middle of the stream, remaining checks are not needed anymore
+        for task in tasks:
+            task.cancel()
+
+
+async def check_image(
+        index: int,
+        query: CheckImageIsNSFWQuery,
+        interactor: CheckImageIsNSFWQueryHandler,
+) -> CheckImageNSFWBatchItemSchema:
+    try:
+        response_from_interactor: bool = await interactor(query)
+    except (ApplicationError, InferenceOverloadedError) as error:
+        logger.warning("Exception '%s' occurred: '%s'.", type(error).__name__, error)
+        return CheckImageNSFWBatchItemSchema(
+            index=index,
+            filename=query.filename_with_extension,
+            status="ERROR",
+            reason=str(error)[:255],
+        )
+    except Exception as error:  # noqa: BLE001
+        logger.error("Exception '%s' occurred: '%s'.", type(error).__name__, error, exc_info=error)
+        return CheckImageNSFWBatchItemSchema(
+            index=index,
+            filename=query.filename_with_extension,
+            status="ERROR",
+            reason="Internal server error.",
+        )
+
+    if response_from_interactor:
+        return CheckImageNSFWBatchItemSchema(
+            index=index,
+            filename=query.filename_with_extension,
+            status="OK",
+        )
+
+    return CheckImageNSFWBatchItemSchema(
+        index=index,
+        filename=query.filename_with_extension,
+        status="REJECTED",
+        reason="NSFW content",
+    )
@@ -0,0 +1,26 @@
+from typing import Literal
+
+from pydantic import BaseModel, Field
+
+
+class CheckImageNSFWBatchItemSchema(BaseModel):
+    index: int = Field(
+        ge=0,
+        description="Position of the image in the request",
+    )
+    filename: str | None = Field(
+        default=None,
+        description="Name of the image file from the request",
+    )
+    status: Literal["OK", "REJECTED", "ERROR"] = Field(
+        default="OK",
+        min_length=1,
+        max_length=255,
+        description="Status of the check for frontend",
+    )
+    reason: str | None = Field(
+        default=None,
+        min_length=1,
+        max_length=255,
+        description="Reason of the check if it is not OK",
+    )
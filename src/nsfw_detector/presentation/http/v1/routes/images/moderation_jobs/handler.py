@@ -0,0 +1,99 @@
+import logging
+from typing import Final, Annotated
+
+from dishka import FromDishka
+from dishka.integrations.fastapi import DishkaRoute
+from fastapi import APIRouter, UploadFile, File, Header
+from starlette import status
+
+from nsfw_detector.application.commands.images.submit_moderation_job import (
+    SubmitModerationJobCommand,
+    SubmitModerationJobCommandHandler,
+)
+from nsfw_detector.application.queries.images.get_moderation_job import (
+    GetModerationJobQuery,
+    GetModerationJobQueryHandler,
+)
+from nsfw_detector.application.queries.images.view_models import ModerationJobInformation
+from nsfw_detector.presentation.http.v1.common.uploads import UploadedImage, read_upload
+from nsfw_detector.presentation.http.v1.routes.images.moderation_jobs.schemas import (
+    ModerationJobResponseSchema,
+    SubmitModerationJobResponseSchema,
+)
+from nsfw_detector.setup.configs import ModerationConfig
+
+logger: Final[logging.Logger] = logging.getLogger(__name__)
+router: Final[APIRouter] = APIRouter(route_class=DishkaRoute)
+
+
+@router.post(
+    "/moderate/async",
+    summary="Submit image for moderation by workers",
+    status_code=status.HTTP_202_ACCEPTED,
+    description=(
+        "Api handler for moderating image in background. Image is queued for workers and id of the job "
+        "is returned at once. Result is polled with GET /moderate/async/{job_id}"
+    ),
+)
+async def handle_submit_moderation_job(
+        image: Annotated[UploadFile, File(
+            description="File with jpg, png, gif and webp extension",
+            examples=["super.jpg", "puper.png"]
+        )],
+        interactor: FromDishka[SubmitModerationJobCommandHandler],
+        moderation_config: FromDishka[ModerationConfig],
+        x_moderation_policy: str | None = Header(
+            default=None,
+            description="Name of the moderation policy from MODERATION_POLICIES, the default policy is used without it",
+        ),
+) -> SubmitModerationJobResponseSchema:
+    uploaded_image: UploadedImage = await read_upload(
+        upload=image,
+        max_bytes=moderation_config.max_image_bytes,
+        chunk_size=moderation_config.upload_chunk_size,
+    )
+
+    command: SubmitModerationJobCommand = SubmitModerationJobCommand(
+        content_of_image=uploaded_image.content,
+        filename_with_extension=image.filename,
+        content_hash=uploaded_image.content_hash,
+        policy_name=x_moderation_policy,
+    )
+
+    job_id: str = await interactor(command)
+
+    return SubmitModerationJobResponseSchema(job_id=job_id)
+
+
+@router.get(
+    "/moderate/async/{job_id}",
+    summary="Get status and result of moderation job",
+    status_code=status.HTTP_200_OK,
+    description="Api handler for polling result of the moderation job. Result is kept for JOBS_RESULT_TTL seconds",
+    response_model_exclude_none=True,
+)
+async def handle_get_moderation_job(
+        job_id: str,
+        interactor: FromDishka[GetModerationJobQueryHandler],
+) -> ModerationJobResponseSchema:
+    information_about_job: ModerationJobInformation = await interactor(GetModerationJobQuery(job_id=job_id))
+
+    if information_about_job.status == "failed":
+        return ModerationJobResponseSchema(
+            job_id=job_id,
+            status=information_about_job.status,
+            reason=information_about_job.error,
+        )
+
+    if information_about_job.is_allowed is None:
+        return ModerationJobResponseSchema(job_id=job_id, status=information_about_job.status)
+
+    if information_about_job.is_allowed:
+        return ModerationJobResponseSchema(job_id=job_id, status=information_about_job.status, result="OK")
+
+    return ModerationJobResponseSchema(
+        job_id=job_id,
+        status=information_about_job.status,
+        result="REJECTED",
+        reason="NSFW content",
+    )
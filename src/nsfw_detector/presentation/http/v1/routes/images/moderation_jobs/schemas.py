@@ -0,0 +1,33 @@
+from typing import Literal
+
+from pydantic import BaseModel, Field
+
+
+class SubmitModerationJobResponseSchema(BaseModel):
+    job_id: str = Field(
+        min_length=1,
+        description="Id of the job for polling its result",
+    )
+    status: Literal["queued"] = Field(
+        default="queued",
+        description="Status of the job",
+    )
+
+
+class ModerationJobResponseSchema(BaseModel):
+    job_id: str = Field(
+        min_length=1,
+        description="Id of the job",
+    )
+    status: Literal["queued", "processing", "done", "failed"] = Field(
+        description="Status of the job",
+    )
+    result: Literal["OK", "REJECTED"] | None = Field(
+        default=None,
+        description="Status of the check for frontend, when the job is done",
+    )
+    reason: str | None = Field(
+        default=None,
+        min_length=1,
+        description="Reason of the check if it is not OK, or why the job failed",
+    )
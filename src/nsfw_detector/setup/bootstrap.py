@@ -1,25 +1,105 @@
 import logging
+import time
 from functools import lru_cache
+from typing import Any, Final
 
+from dishka import AsyncContainer
 from fastapi import APIRouter, FastAPI
 from starlette.middleware.cors import CORSMiddleware
 
-from nsfw_detector.presentation.http.common.routes import healthcheck, index
+from nsfw_detector.infrastructure.inference.batcher import InferenceBatcher
+from nsfw_detector.infrastructure.inference.warmup import warm_up_batcher
+from nsfw_detector.infrastructure.metrics.instruments import STARTUP_DURATION
+from nsfw_detector.presentation.http.common.routes import healthcheck, index, metrics
 from nsfw_detector.presentation.http.common.exception_handlers import ExceptionHandler
+from nsfw_detector.presentation.http.v1.middlewares.body_size_limit import BodySizeLimitMiddleware
+from nsfw_detector.presentation.http.v1.middlewares.metrics import MetricsMiddleware
 from nsfw_detector.presentation.http.v1.routes import images
 from nsfw_detector.setup.configs import LoggingConfig
 from nsfw_detector.setup.configs import (
+    AnimationConfig,
     ASGIConfig,
+    CacheConfig,
     Configs,
+    GenAPIConfig,
+    HttpClientConfig,
+    InferenceConfig,
+    JobsConfig,
+    ModerationConfig,
+    RedisConfig,
+    RoutingConfig,
+    UrlFetchConfig,
 )
 
+logger: Final[logging.Logger] = logging.getLogger(__name__)
+
 
 @lru_cache(maxsize=1)
 def setup_configs() -> Configs:
     return Configs()
 
 
-def setup_middlewares(app: FastAPI, /, api_config: ASGIConfig) -> None:
+def setup_context(configs: Configs) -> dict[Any, Any]:
+    """
+    Builds context of the Dishka container from configs.
+
+    Args:
+        configs: Application configs
+
+    Returns:
+        dict[Any, Any]: Configs by their types
+    """
+    return {
+        ASGIConfig: configs.asgi,
+        GenAPIConfig: configs.genai,
+        HttpClientConfig: configs.http_client,
+        RedisConfig: configs.redis,
+        CacheConfig: configs.cache,
+        InferenceConfig: configs.inference,
+        AnimationConfig: configs.animation,
+        ModerationConfig: configs.moderation,
+        RoutingConfig: configs.routing,
+        JobsConfig: configs.jobs,
+        UrlFetchConfig: configs.url_fetch,
+    }
+
+
+async def warm_up_local_model(container: AsyncContainer) -> None:
+    """
+    Loads the local model and runs warmup passes, unless images are checked only by GenAI API.
+
+    Args:
+        container: Dishka container of the application
+    """
+    routing_config: RoutingConfig = await container.get(RoutingConfig)
+    if routing_config.mode == "remote":
+        return
+
+    inference_config: InferenceConfig = await container.get(InferenceConfig)
+
+    started_at: float = time.perf_counter()
+    batcher: InferenceBatcher = await container.get(InferenceBatcher)
+    model_load_seconds: float = time.perf_counter() - started_at
+    STARTUP_DURATION.labels("model_load").set(model_load_seconds)
+
+    started_at = time.perf_counter()
+    await warm_up_batcher(
+        batcher,
+        iterations=inference_config.warmup_iterations,
+        # Full batch larger than the queue would be rejected by admission control and fail the startup
+        batch_size=min(inference_config.max_batch_size, inference_config.max_queue_depth),
+    )
+    warmup_seconds: float = time.perf_counter() - started_at
+    STARTUP_DURATION.labels("warmup").set(warmup_seconds)
+
+    logger.info("Local model is loaded in %.2fs and warmed up in %.2fs", model_load_seconds, warmup_seconds)
+
+
+def setup_middlewares(app: FastAPI, /, api_config: ASGIConfig, moderation_config: ModerationConfig) -> None:
+    app.add_middleware(
+        BodySizeLimitMiddleware,
+        max_body_bytes=moderation_config.max_request_bytes,
+    )
     app.add_middleware(
         CORSMiddleware,
         allow_origins=[
@@ -30,6 +110,8 @@ def setup_middlewares(app: FastAPI, /, api_config: ASGIConfig) -> None:
         allow_methods=api_config.allow_methods,
         allow_headers=api_config.allow_headers,
     )
+    # Added last, so it is the outermost one and also counts requests rejected by other middlewares
+    app.add_middleware(MetricsMiddleware)
 
 
 def setup_routes(app: FastAPI, /) -> None:
@@ -44,6 +126,7 @@ def setup_routes(app: FastAPI, /) -> None:
     """
     app.include_router(index.router)
     app.include_router(healthcheck.router)
+    app.include_router(metrics.router)
 
     router_v1: APIRouter = APIRouter(prefix="/v1")
     router_v1.include_router(images.router)
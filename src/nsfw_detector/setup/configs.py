@@ -1,5 +1,5 @@
 import os
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, Json
 from typing import Literal
 
 
@@ -41,18 +41,737 @@ class RedisConfig(BaseModel):
         description="Redis db",
         validate_default=True
     )
+    max_connections: int = Field(
+        alias="REDIS_MAX_CONNECTIONS",
+        default=64,
+        ge=1,
+        description="Maximum amount of connections in the pool, commands wait for a free one above it",
+        validate_default=True
+    )
+    pool_timeout: float = Field(
+        alias="REDIS_POOL_TIMEOUT",
+        default=5.0,
+        gt=0,
+        description="How long a command waits for a free connection of the pool, in seconds",
+        validate_default=True
+    )
 
     @property
     def url(self) -> str:
         return f"redis://{self.host}:{self.port}/0"
 
 
+class CacheConfig(BaseModel):
+    """Configuration container for caching of moderation results.
+
+    Attributes:
+        ttl: How long results of checks are stored in Redis, in seconds.
+        l1_max_entries: Maximum amount of entries in the in-process cache.
+        l1_max_ttl: Maximum lifetime of entries in the in-process cache, in seconds.
+        codec: Format of values stored in Redis.
+        compress_threshold: Values of at least this size are compressed by the compact codec.
+        phash_enabled: Reuse verdicts of known images for their near duplicates.
+        phash_max_distance: Maximum Hamming distance between perceptual hashes of near duplicates.
+        phash_max_entries: Maximum amount of perceptual hashes in the index.
+        phash_persist: Persist perceptual hashes in Redis, so the index survives restarts.
+        model_version: Version of the model in cache keys, verdicts of other versions are not reused.
+        version_refresh_seconds: How often the generation of the cache namespace is re-read from Redis.
+        clear_batch_size: Keys scanned and unlinked at once when the cache is cleared by prefix.
+        clear_max_keys_per_second: Rate limit of clearing by prefix, zero disables it.
+    """
+
+    ttl: int = Field(
+        alias="CACHE_TTL",
+        default=50,
+        ge=1,
+        description="How long results of checks are stored in Redis, in seconds.",
+        validate_default=True,
+    )
+    l1_max_entries: int = Field(
+        alias="CACHE_L1_MAX_ENTRIES",
+        default=10_000,
+        ge=1,
+        description="Maximum amount of entries in the in-process cache.",
+        validate_default=True,
+    )
+    l1_max_ttl: int = Field(
+        alias="CACHE_L1_MAX_TTL",
+        default=30,
+        ge=1,
+        description="Maximum lifetime of entries in the in-process cache, in seconds.",
+        validate_default=True,
+    )
+    codec: Literal["compact", "pickle"] = Field(
+        alias="CACHE_CODEC",
+        default="compact",
+        description="Format of values stored in Redis.",
+        validate_default=True,
+    )
+    compress_threshold: int = Field(
+        alias="CACHE_COMPRESS_THRESHOLD",
+        default=256,
+        ge=0,
+        description="Values of at least this size are compressed by the compact codec.",
+        validate_default=True,
+    )
+    phash_enabled: bool = Field(
+        alias="CACHE_PHASH_ENABLED",
+        default=True,
+        description="Reuse verdicts of known images for their near duplicates.",
+        validate_default=True,
+    )
+    phash_max_distance: int = Field(
+        alias="CACHE_PHASH_MAX_DISTANCE",
+        default=4,
+        ge=0,
+        le=16,
+        description="Maximum Hamming distance between perceptual hashes of near duplicates.",
+        validate_default=True,
+    )
+    phash_max_entries: int = Field(
+        alias="CACHE_PHASH_MAX_ENTRIES",
+        default=100_000,
+        ge=1,
+        description="Maximum amount of perceptual hashes in the index.",
+        validate_default=True,
+    )
+    phash_persist: bool = Field(
+        alias="CACHE_PHASH_PERSIST",
+        default=False,
+        description="Persist perceptual hashes in Redis, so the index survives restarts.",
+        validate_default=True,
+    )
+    model_version: str = Field(
+        alias="CACHE_MODEL_VERSION",
+        default="1",
+        min_length=1,
+        description="Version of the model in cache keys, verdicts of other versions are not reused.",
+        validate_default=True,
+    )
+    version_refresh_seconds: float = Field(
+        alias="CACHE_VERSION_REFRESH_SECONDS",
+        default=5.0,
+        ge=0,
+        description="How often the generation of the cache namespace is re-read from Redis.",
+        validate_default=True,
+    )
+    clear_batch_size: int = Field(
+        alias="CACHE_CLEAR_BATCH_SIZE",
+        default=1000,
+        ge=1,
+        description="Keys scanned and unlinked at once when the cache is cleared by prefix.",
+        validate_default=True,
+    )
+    clear_max_keys_per_second: int = Field(
+        alias="CACHE_CLEAR_MAX_KEYS_PER_SECOND",
+        default=50_000,
+        ge=0,
+        description="Rate limit of clearing by prefix, zero disables it.",
+        validate_default=True,
+    )
+
+
 class GenAPIConfig(BaseModel):
+    """Configuration container for GenAI API.
+
+    Attributes:
+        api_key: API key for NSFW content filtering for GenAI.
+        base_url: Base URL of GenAI API.
+        mode: ``sync`` holds the request open until the result is ready,
+            ``async`` submits the image and polls for the result by request id.
+        poll_interval: First delay between polls of the result, in seconds.
+        poll_max_interval: Delay between polls grows up to this value, in seconds.
+        poll_timeout: How long the result is polled before giving up, in seconds.
+    """
+
     api_key: str = Field(
         ...,
         alias="API_KEY_FOR_NSFW_CONTENT",
         description="API key for NSFW content filtering for GenAI",
     )
+    base_url: str = Field(
+        alias="GEN_API_BASE_URL",
+        default="https://api.gen-api.ru",
+        description="Base URL of GenAI API, can point to a local mock server",
+        validate_default=True,
+    )
+    mode: Literal["sync", "async"] = Field(
+        alias="GEN_API_MODE",
+        default="sync",
+        description="sync holds the request open until the result is ready, async submits and polls by request id.",
+        validate_default=True,
+    )
+    poll_interval: float = Field(
+        alias="GEN_API_POLL_INTERVAL",
+        default=0.25,
+        gt=0,
+        description="First delay between polls of the result, in seconds.",
+        validate_default=True,
+    )
+    poll_max_interval: float = Field(
+        alias="GEN_API_POLL_MAX_INTERVAL",
+        default=2.0,
+        gt=0,
+        description="Delay between polls grows up to this value, in seconds.",
+        validate_default=True,
+    )
+    poll_timeout: float = Field(
+        alias="GEN_API_POLL_TIMEOUT",
+        default=120.0,
+        gt=0,
+        description="How long the result is polled before giving up, in seconds.",
+        validate_default=True,
+    )
+
+
+class HttpClientConfig(BaseModel):
+    """Configuration container for the shared HTTP client of outgoing requests.
+
+    Attributes:
+        limit: Maximum amount of open connections in the pool.
+        limit_per_host: Maximum amount of open connections to one host.
+        ttl_dns_cache: How long resolved addresses are cached, in seconds.
+        keepalive_timeout: How long idle connection is kept open for reuse, in seconds.
+        connect_timeout: Timeout of acquiring connection, including TCP and TLS handshakes, in seconds.
+        sock_read_timeout: Timeout between two reads from the socket, in seconds.
+        total_timeout: Timeout of the whole request, in seconds.
+    """
+
+    limit: int = Field(
+        alias="HTTP_CLIENT_LIMIT",
+        default=100,
+        ge=0,
+        description="Maximum amount of open connections in the pool, 0 means no limit.",
+        validate_default=True,
+    )
+    limit_per_host: int = Field(
+        alias="HTTP_CLIENT_LIMIT_PER_HOST",
+        default=32,
+        ge=0,
+        description="Maximum amount of open connections to one host, 0 means no limit.",
+        validate_default=True,
+    )
+    ttl_dns_cache: int = Field(
+        alias="HTTP_CLIENT_TTL_DNS_CACHE",
+        default=300,
+        ge=0,
+        description="How long resolved addresses are cached, in seconds.",
+        validate_default=True,
+    )
+    keepalive_timeout: float = Field(
+        alias="HTTP_CLIENT_KEEPALIVE_TIMEOUT",
+        default=30.0,
+        gt=0,
+        description="How long idle connection is kept open for reuse, in seconds.",
+        validate_default=True,
+    )
+    connect_timeout: float = Field(
+        alias="HTTP_CLIENT_CONNECT_TIMEOUT",
+        default=5.0,
+        gt=0,
+        description="Timeout of acquiring connection, including TCP and TLS handshakes, in seconds.",
+        validate_default=True,
+    )
+    sock_read_timeout: float = Field(
+        alias="HTTP_CLIENT_SOCK_READ_TIMEOUT",
+        default=30.0,
+        gt=0,
+        description="Timeout between two reads from the socket, in seconds.",
+        validate_default=True,
+    )
+    total_timeout: float = Field(
+        alias="HTTP_CLIENT_TOTAL_TIMEOUT",
+        default=60.0,
+        gt=0,
+        description="Timeout of the whole request, in seconds.",
+        validate_default=True,
+    )
+
+
+class InferenceConfig(BaseModel):
+    """Configuration container for local model inference.
+
+    Attributes:
+        backend: How forward passes are executed: eager PyTorch model in threads of the API process
+            or in separate processes, or exported ONNX model with ONNX Runtime.
+        max_batch_size: Maximum amount of images in one forward pass.
+        max_batch_wait_ms: How long the batch waits for more images after the first one arrived.
+        max_queue_depth: Images waiting for a batch above which new images are rejected.
+        max_queue_wait_ms: Images which would wait for a batch longer than this are rejected.
+        ready_queue_ratio: Share of ``max_queue_depth`` from which the instance reports it is not ready.
+        workers: Amount of threads or processes which execute forward passes concurrently.
+        threads_per_worker: Amount of intra-op threads of each worker: torch threads or ONNX Runtime threads.
+        decode_size: Images are decoded so that their shorter side is not less than this size.
+        decode_sample_rate: Share of images additionally decoded in full resolution to measure saved time.
+        onnx_model_path: Path of the exported ONNX model, used by ``onnx`` backend.
+        warmup_iterations: Forward passes of a dummy image, single and in a full batch,
+            run on startup before the app accepts requests.
+    """
+
+    backend: Literal["thread", "process", "onnx"] = Field(
+        alias="INFERENCE_BACKEND",
+        default="thread",
+        description="How forward passes are executed: PyTorch in threads or processes, or ONNX Runtime.",
+        validate_default=True,
+    )
+
+    max_batch_size: int = Field(
+        alias="INFERENCE_MAX_BATCH_SIZE",
+        default=16,
+        ge=1,
+        description="Maximum amount of images in one forward pass.",
+        validate_default=True,
+    )
+    max_batch_wait_ms: float = Field(
+        alias="INFERENCE_MAX_BATCH_WAIT_MS",
+        default=5.0,
+        ge=0,
+        description="How long the batch waits for more images after the first one arrived.",
+        validate_default=True,
+    )
+    max_queue_depth: int = Field(
+        alias="INFERENCE_MAX_QUEUE_DEPTH",
+        default=512,
+        ge=1,
+        description="Images waiting for a batch above which new images are rejected.",
+        validate_default=True,
+    )
+    max_queue_wait_ms: float = Field(
+        alias="INFERENCE_MAX_QUEUE_WAIT_MS",
+        default=5000.0,
+        gt=0,
+        description="Images which would wait for a batch longer than this are rejected.",
+        validate_default=True,
+    )
+    ready_queue_ratio: float = Field(
+        alias="INFERENCE_READY_QUEUE_RATIO",
+        default=0.8,
+        gt=0,
+        le=1,
+        description="Share of max queue depth from which the instance reports it is not ready.",
+        validate_default=True,
+    )
+    workers: int = Field(
+        alias="INFERENCE_WORKERS",
+        default=4,
+        ge=1,
+        description="Amount of threads or processes which execute forward passes concurrently.",
+        validate_default=True,
+    )
+    threads_per_worker: int = Field(
+        alias="INFERENCE_THREADS_PER_WORKER",
+        default=1,
+        ge=1,
+        description="Amount of intra-op threads of each worker: torch threads or ONNX Runtime threads.",
+        validate_default=True,
+    )
+    decode_size: int = Field(
+        alias="INFERENCE_DECODE_SIZE",
+        default=448,
+        ge=1,
+        description="Images are decoded so that their shorter side is not less than this size.",
+        validate_default=True,
+    )
+    decode_sample_rate: float = Field(
+        alias="INFERENCE_DECODE_SAMPLE_RATE",
+        default=0.01,
+        ge=0,
+        le=1,
+        description="Share of images additionally decoded in full resolution to measure saved time.",
+        validate_default=True,
+    )
+    onnx_model_path: str = Field(
+        alias="INFERENCE_ONNX_MODEL_PATH",
+        default="models/nsfw_image_detector.int8.onnx",
+        description="Path of the exported ONNX model, used by onnx backend.",
+        validate_default=True,
+    )
+    warmup_iterations: int = Field(
+        alias="INFERENCE_WARMUP_ITERATIONS",
+        default=2,
+        ge=0,
+        description="Forward passes of a dummy image, single and in a full batch, run on startup.",
+        validate_default=True,
+    )
+
+
+class AnimationConfig(BaseModel):
+    """Configuration container for moderation of animated GIF and WebP images.
+
+    Attributes:
+        keyframes: Frames checked in the first pass: the first frame, scene cuts and evenly spaced frames.
+        max_frames: Maximum amount of frames checked for one animation.
+        early_exit_neutral: Checking stops as soon as a frame has neutral score not above this.
+        uncertain_neutral: Neighbourhood of a frame with neutral score below this is sampled more densely.
+        scene_cut_threshold: Mean difference of pixels between consecutive frames, from 0 to 1,
+            above which a frame starts a new scene.
+        max_scan_frames: Animations with more frames are rejected without decoding.
+        max_scan_pixels: Animations with more pixels in all frames together are rejected without decoding.
+    """
+
+    keyframes: int = Field(
+        alias="ANIMATION_KEYFRAMES",
+        default=8,
+        ge=1,
+        description="Frames checked in the first pass: the first frame, scene cuts and evenly spaced frames.",
+        validate_default=True,
+    )
+    max_frames: int = Field(
+        alias="ANIMATION_MAX_FRAMES",
+        default=32,
+        ge=1,
+        description="Maximum amount of frames checked for one animation.",
+        validate_default=True,
+    )
+    early_exit_neutral: float = Field(
+        alias="ANIMATION_EARLY_EXIT_NEUTRAL",
+        default=0.3,
+        ge=0,
+        le=1,
+        description="Checking stops as soon as a frame has neutral score not above this.",
+        validate_default=True,
+    )
+    uncertain_neutral: float = Field(
+        alias="ANIMATION_UNCERTAIN_NEUTRAL",
+        default=0.9,
+        ge=0,
+        le=1,
+        description="Neighbourhood of a frame with neutral score below this is sampled more densely.",
+        validate_default=True,
+    )
+    scene_cut_threshold: float = Field(
+        alias="ANIMATION_SCENE_CUT_THRESHOLD",
+        default=0.15,
+        gt=0,
+        le=1,
+        description="Mean difference of pixels between consecutive frames above which a frame starts a new scene.",
+        validate_default=True,
+    )
+    max_scan_frames: int = Field(
+        alias="ANIMATION_MAX_SCAN_FRAMES",
+        default=1000,
+        ge=1,
+        description="Animations with more frames are rejected without decoding.",
+        validate_default=True,
+    )
+    max_scan_pixels: int = Field(
+        alias="ANIMATION_MAX_SCAN_PIXELS",
+        default=200_000_000,
+        ge=1,
+        description="Animations with more pixels in all frames together are rejected without decoding.",
+        validate_default=True,
+    )
+
+
+class RoutingConfig(BaseModel):
+    """Configuration container for selection of the backend which checks images.
+
+    Attributes:
+        mode: ``local`` uses the local model, ``remote`` uses GenAI API,
+            ``routed`` sends each image to the backend expected to answer fastest.
+        ewma_alpha: Weight of the newest sample in smoothed latency and error rate.
+        failure_threshold: Consecutive failures which open the circuit of a backend.
+        error_rate_threshold: Smoothed error rate which opens the circuit of a backend.
+        open_seconds: How long a backend with open circuit gets no traffic before it is probed.
+        local_capacity: How many images the local model checks at once without queueing.
+        local_initial_latency_ms: Expected latency of the local model before it is measured.
+        remote_capacity: How many images the remote API checks at once without queueing.
+        remote_initial_latency_ms: Expected latency of the remote API before it is measured.
+    """
+
+    mode: Literal["local", "remote", "routed"] = Field(
+        alias="ROUTING_MODE",
+        default="local",
+        description="local uses the local model, remote uses GenAI API, routed picks the fastest backend.",
+        validate_default=True,
+    )
+    ewma_alpha: float = Field(
+        alias="ROUTING_EWMA_ALPHA",
+        default=0.2,
+        gt=0,
+        le=1,
+        description="Weight of the newest sample in smoothed latency and error rate.",
+        validate_default=True,
+    )
+    failure_threshold: int = Field(
+        alias="ROUTING_FAILURE_THRESHOLD",
+        default=5,
+        ge=1,
+        description="Consecutive failures which open the circuit of a backend.",
+        validate_default=True,
+    )
+    error_rate_threshold: float = Field(
+        alias="ROUTING_ERROR_RATE_THRESHOLD",
+        default=0.5,
+        gt=0,
+        le=1,
+        description="Smoothed error rate which opens the circuit of a backend.",
+        validate_default=True,
+    )
+    open_seconds: float = Field(
+        alias="ROUTING_OPEN_SECONDS",
+        default=10.0,
+        gt=0,
+        description="How long a backend with open circuit gets no traffic before it is probed.",
+        validate_default=True,
+    )
+    local_capacity: int = Field(
+        alias="ROUTING_LOCAL_CAPACITY",
+        default=64,
+        ge=1,
+        description="How many images the local model checks at once without queueing.",
+        validate_default=True,
+    )
+    local_initial_latency_ms: float = Field(
+        alias="ROUTING_LOCAL_INITIAL_LATENCY_MS",
+        default=100.0,
+        gt=0,
+        description="Expected latency of the local model before it is measured.",
+        validate_default=True,
+    )
+    remote_capacity: int = Field(
+        alias="ROUTING_REMOTE_CAPACITY",
+        default=32,
+        ge=1,
+        description="How many images the remote API checks at once without queueing.",
+        validate_default=True,
+    )
+    remote_initial_latency_ms: float = Field(
+        alias="ROUTING_REMOTE_INITIAL_LATENCY_MS",
+        default=1000.0,
+        gt=0,
+        description="Expected latency of the remote API before it is measured.",
+        validate_default=True,
+    )
+
+
+class ModerationPolicyConfig(BaseModel):
+    """Thresholds of one moderation policy. Scores are probabilities, so thresholds are within 0..1.
+
+    Attributes:
+        min_neutral: Neutral score of an allowed image must be above it.
+        max_low: Low score of an allowed image must not be above it.
+        max_medium: Medium score of an allowed image must not be above it.
+        max_high: High score of an allowed image must not be above it.
+    """
+
+    # Misspelled threshold must fail the startup instead of being silently ignored
+    model_config = ConfigDict(extra="forbid")
+
+    min_neutral: float | None = Field(
+        default=0.7,
+        ge=0,
+        le=1,
+        description="Neutral score of an allowed image must be above it.",
+    )
+    max_low: float | None = Field(
+        default=None,
+        ge=0,
+        le=1,
+        description="Low score of an allowed image must not be above it.",
+    )
+    max_medium: float | None = Field(
+        default=None,
+        ge=0,
+        le=1,
+        description="Medium score of an allowed image must not be above it.",
+    )
+    max_high: float | None = Field(
+        default=None,
+        ge=0,
+        le=1,
+        description="High score of an allowed image must not be above it.",
+    )
+
+
+class ModerationConfig(BaseModel):
+    """Configuration container for moderation endpoints.
+
+    Attributes:
+        batch_max_files: Maximum amount of images in one batch request.
+        batch_concurrency: How many images of one batch request are checked at the same time.
+        max_image_bytes: Maximum size of one uploaded image.
+        max_request_bytes: Maximum size of the whole request body, checked while it is received.
+        upload_chunk_size: Size of chunks in which uploaded images are read.
+        policies: Moderation policies by name, as JSON. Each policy has optional thresholds
+            ``min_neutral``, ``max_low``, ``max_medium`` and ``max_high``. Policy is selected
+            by ``X-Moderation-Policy`` header, ``default`` is used without it.
+    """
+
+    batch_max_files: int = Field(
+        alias="MODERATION_BATCH_MAX_FILES",
+        default=500,
+        ge=1,
+        description="Maximum amount of images in one batch request.",
+        validate_default=True,
+    )
+    batch_concurrency: int = Field(
+        alias="MODERATION_BATCH_CONCURRENCY",
+        default=16,
+        ge=1,
+        description="How many images of one batch request are checked at the same time.",
+        validate_default=True,
+    )
+    max_image_bytes: int = Field(
+        alias="MODERATION_MAX_IMAGE_BYTES",
+        default=10 * 1024 * 1024,
+        ge=1,
+        description="Maximum size of one uploaded image.",
+        validate_default=True,
+    )
+    max_request_bytes: int = Field(
+        alias="MODERATION_MAX_REQUEST_BYTES",
+        default=256 * 1024 * 1024,
+        ge=1,
+        description="Maximum size of the whole request body, checked while it is received.",
+        validate_default=True,
+    )
+    upload_chunk_size: int = Field(
+        alias="MODERATION_UPLOAD_CHUNK_SIZE",
+        default=64 * 1024,
+        ge=1,
+        description="Size of chunks in which uploaded images are read.",
+        validate_default=True,
+    )
+    policies: Json[dict[str, ModerationPolicyConfig]] = Field(
+        alias="MODERATION_POLICIES",
+        default='{"default": {"min_neutral": 0.7}}',
+        description="Moderation policies by name with their thresholds, as JSON.",
+        validate_default=True,
+    )
+
+
+class JobsConfig(BaseModel):
+    """Configuration container for asynchronous moderation jobs.
+
+    Attributes:
+        stream: Redis Stream which holds unfinished jobs.
+        group: Consumer group of workers reading the stream.
+        consumer: Name of the worker in the group, defaults to host name and pid.
+        image_ttl: How long submitted images are kept in Redis, in seconds.
+        result_ttl: How long statuses and results of jobs are kept in Redis, in seconds.
+        worker_concurrency: How many jobs one worker checks at the same time.
+        read_block_ms: How long a worker waits for new jobs in one read.
+        claim_idle_ms: Jobs not acknowledged for this long are taken over by another worker.
+            Worker renews its claim while it checks the image, so a long check is not taken over.
+        max_attempts: Attempts to check an image before its job is failed.
+        stream_max_length: Unfinished jobs in the stream at which new jobs are rejected.
+    """
+
+    stream: str = Field(
+        alias="JOBS_STREAM",
+        default="nsfw_image_jobs",
+        description="Redis Stream which holds unfinished jobs.",
+        validate_default=True,
+    )
+    group: str = Field(
+        alias="JOBS_GROUP",
+        default="nsfw_image_workers",
+        description="Consumer group of workers reading the stream.",
+        validate_default=True,
+    )
+    consumer: str = Field(
+        alias="JOBS_CONSUMER",
+        default="",
+        description="Name of the worker in the group, defaults to host name and pid.",
+        validate_default=True,
+    )
+    image_ttl: int = Field(
+        alias="JOBS_IMAGE_TTL",
+        default=24 * 60 * 60,
+        ge=1,
+        description="How long submitted images are kept in Redis, in seconds.",
+        validate_default=True,
+    )
+    result_ttl: int = Field(
+        alias="JOBS_RESULT_TTL",
+        default=7 * 24 * 60 * 60,
+        ge=1,
+        description="How long statuses and results of jobs are kept in Redis, in seconds.",
+        validate_default=True,
+    )
+    worker_concurrency: int = Field(
+        alias="JOBS_WORKER_CONCURRENCY",
+        default=32,
+        ge=1,
+        description="How many jobs one worker checks at the same time.",
+        validate_default=True,
+    )
+    read_block_ms: int = Field(
+        alias="JOBS_READ_BLOCK_MS",
+        default=5000,
+        ge=1,
+        description="How long a worker waits for new jobs in one read.",
+        validate_default=True,
+    )
+    claim_idle_ms: int = Field(
+        alias="JOBS_CLAIM_IDLE_MS",
+        default=60000,
+        ge=1,
+        description="Jobs not acknowledged for this long are taken over by another worker.",
+        validate_default=True,
+    )
+    max_attempts: int = Field(
+        alias="JOBS_MAX_ATTEMPTS",
+        default=3,
+        ge=1,
+        description="Attempts to check an image before its job is failed.",
+        validate_default=True,
+    )
+    stream_max_length: int = Field(
+        alias="JOBS_STREAM_MAX_LENGTH",
+        default=100_000,
+        ge=1,
+        description="Unfinished jobs in the stream at which new jobs are rejected.",
+        validate_default=True,
+    )
+
+
+class UrlFetchConfig(BaseModel):
+    """Configuration container for moderation of images by URL.
+
+    Attributes:
+        timeout: Maximum time of downloading the image, including waiting for a free slot of its host, in seconds.
+        max_concurrency_per_host: Maximum amount of images downloaded from one host at once.
+        max_redirects: Maximum amount of redirects followed, each target is validated like the original URL.
+        cache_ttl: How long verdicts are stored by URL with ETag and Last-Modified of the image, in seconds.
+        allow_private_hosts: Allow URLs with loopback, private and link-local addresses.
+    """
+
+    timeout: float = Field(
+        alias="URL_FETCH_TIMEOUT",
+        default=10.0,
+        gt=0,
+        description="Maximum time of downloading the image, including waiting for a free slot of its host, in seconds.",
+        validate_default=True,
+    )
+    max_concurrency_per_host: int = Field(
+        alias="URL_FETCH_MAX_CONCURRENCY_PER_HOST",
+        default=8,
+        ge=1,
+        description="Maximum amount of images downloaded from one host at once.",
+        validate_default=True,
+    )
+    max_redirects: int = Field(
+        alias="URL_FETCH_MAX_REDIRECTS",
+        default=3,
+        ge=0,
+        description="Maximum amount of redirects followed, each target is validated like the original URL.",
+        validate_default=True,
+    )
+    cache_ttl: int = Field(
+        alias="URL_FETCH_CACHE_TTL",
+        default=86_400,
+        ge=1,
+        description="How long verdicts are stored by URL with ETag and Last-Modified of the image, in seconds.",
+        validate_default=True,
+    )
+    allow_private_hosts: bool = Field(
+        alias="URL_FETCH_ALLOW_PRIVATE_HOSTS",
+        default=False,
+        description="Allow URLs with loopback, private and link-local addresses.",
+        validate_default=True,
+    )
 
 
 class ASGIConfig(BaseModel):
@@ -61,6 +780,7 @@ class ASGIConfig(BaseModel):
     Attributes:
         host: Interface to bind the server to (e.g., '0.0.0.0' or 'localhost').
         port: TCP port to listen on.
+        workers: Amount of forked server processes, which share the listening socket and the preloaded model.
     """
 
     host: str = Field(
@@ -75,6 +795,13 @@ class ASGIConfig(BaseModel):
         description="TCP port to listen on.",
         validate_default=True,
     )
+    workers: int = Field(
+        alias="UVICORN_WORKERS",
+        default=1,
+        ge=1,
+        description="Amount of forked server processes, which share the listening socket and the preloaded model.",
+        validate_default=True,
+    )
     fastapi_debug: bool = Field(
         alias="FASTAPI_DEBUG",
         default=True,
@@ -108,7 +835,39 @@ class Configs(BaseModel):
         default_factory=lambda: RedisConfig(**os.environ),
         description="Redis configuration.",
     )
+    cache: CacheConfig = Field(
+        default_factory=lambda: CacheConfig(**os.environ),
+        description="Cache configuration.",
+    )
     genai: GenAPIConfig = Field(
         default_factory=lambda: GenAPIConfig(**os.environ),
         description="GenAI configuration.",
     )
+    http_client: HttpClientConfig = Field(
+        default_factory=lambda: HttpClientConfig(**os.environ),
+        description="HTTP client configuration.",
+    )
+    inference: InferenceConfig = Field(
+        default_factory=lambda: InferenceConfig(**os.environ),
+        description="Inference configuration.",
+    )
+    animation: AnimationConfig = Field(
+        default_factory=lambda: AnimationConfig(**os.environ),
+        description="Animated images configuration.",
+    )
+    routing: RoutingConfig = Field(
+        default_factory=lambda: RoutingConfig(**os.environ),
+        description="Routing configuration.",
+    )
+    moderation: ModerationConfig = Field(
+        default_factory=lambda: ModerationConfig(**os.environ),
+        description="Moderation endpoints configuration.",
+    )
+    jobs: JobsConfig = Field(
+        default_factory=lambda: JobsConfig(**os.environ),
+        description="Asynchronous moderation jobs configuration.",
+    )
+    url_fetch: UrlFetchConfig = Field(
+        default_factory=lambda: UrlFetchConfig(**os.environ),
+        description="Moderation by URL configuration.",
+    )
@@ -3,17 +3,71 @@ from typing import Final, Iterable
 
 from aiohttp import ClientSession
 from dishka import Provider, Scope
-from nsfw_image_detector import NSFWDetector
 
-from nsfw_detector.application.common.ports.images.query_gateway import ImageQueryGateway
+from nsfw_detector.application.commands.images.submit_moderation_job import SubmitModerationJobCommandHandler
+from nsfw_detector.application.common.ports.images.query_gateway import BackendImageQueryGateway, ImageQueryGateway
+from nsfw_detector.application.common.ports.jobs.moderation_job_gateway import ModerationJobGateway
+from nsfw_detector.application.common.ports.images.url_query_gateway import ImageUrlQueryGateway
+from nsfw_detector.application.queries.images.check_image_by_url import CheckImageIsNSFWByUrlQueryHandler
 from nsfw_detector.application.queries.images.check_image_is_nsfw import CheckImageIsNSFWQueryHandler
+from nsfw_detector.application.queries.images.get_moderation_job import GetModerationJobQueryHandler
+from nsfw_detector.application.queries.images.policies import ModerationPolicies
+from nsfw_detector.application.queries.images.view_models import NSFWImageInformation
 from nsfw_detector.infrastructure.adapters.images.cached_query_gateway import ImageCachedQueryGateway
+from nsfw_detector.infrastructure.adapters.images.gen_ai_query_gateway import GenAIImageQueryGateway
+from nsfw_detector.infrastructure.adapters.images.near_duplicate_query_gateway import ImageNearDuplicateQueryGateway
 from nsfw_detector.infrastructure.adapters.images.nsfw_detector_query_gateway import NSFWDetectorImageQueryGateway
-from nsfw_detector.infrastructure.cache.providers import get_redis_pool, get_redis
+from nsfw_detector.infrastructure.adapters.images.url_query_gateway import HttpImageUrlQueryGateway
+from nsfw_detector.infrastructure.adapters.jobs.redis_stream_job_gateway import RedisStreamModerationJobGateway
+from nsfw_detector.infrastructure.cache.base import CacheStore
+from nsfw_detector.infrastructure.cache.codecs import CacheCodec
+from nsfw_detector.infrastructure.cache.impl import RedisCacheStore
+from nsfw_detector.infrastructure.cache.memory import InMemoryCacheStore
+from nsfw_detector.infrastructure.cache.namespaces import CacheNamespace
+from nsfw_detector.infrastructure.cache.perceptual import PerceptualHashIndex
+from nsfw_detector.infrastructure.cache.providers import (
+    get_cache_codec,
+    get_cache_store,
+    get_image_cache_namespace,
+    get_in_memory_cache_store,
+    get_perceptual_hash_index,
+    get_redis,
+    get_redis_pool,
+    get_single_flight,
+)
+from nsfw_detector.infrastructure.concurrency.host_limiter import PerHostLimiter
+from nsfw_detector.infrastructure.concurrency.single_flight import SingleFlight
 from nsfw_detector.infrastructure.clients.http.base import HttpClient
 from nsfw_detector.infrastructure.clients.http.impl import AioHTTPClient
-from nsfw_detector.infrastructure.clients.http.providers import get_client
-from nsfw_detector.setup.configs import ASGIConfig, GenAPIConfig, RedisConfig
+from nsfw_detector.infrastructure.clients.http.providers import get_client, get_host_limiter, get_url_fetch_client
+from nsfw_detector.infrastructure.inference.animation import AnimatedImageSampler
+from nsfw_detector.infrastructure.inference.base import InferenceBackend
+from nsfw_detector.infrastructure.inference.batcher import InferenceBatcher
+from nsfw_detector.infrastructure.inference.providers import (
+    get_inference_batcher,
+    get_onnx_inference_backend,
+    get_process_pool_inference_backend,
+)
+from nsfw_detector.infrastructure.policies.providers import get_moderation_policies
+from nsfw_detector.infrastructure.routing.health import BackendHealthRegistry
+from nsfw_detector.infrastructure.routing.providers import (
+    get_backend_health_registry,
+    get_routing_image_query_gateway,
+)
+from nsfw_detector.setup.configs import (
+    AnimationConfig,
+    ASGIConfig,
+    CacheConfig,
+    Configs,
+    GenAPIConfig,
+    HttpClientConfig,
+    InferenceConfig,
+    JobsConfig,
+    ModerationConfig,
+    RedisConfig,
+    RoutingConfig,
+    UrlFetchConfig,
+)
 
 
 def configs_provider() -> Provider:
@@ -25,52 +79,159 @@ def configs_provider() -> Provider:
     provider: Final[Provider] = Provider()
     provider.from_context(provides=ASGIConfig, scope=Scope.APP)
     provider.from_context(provides=GenAPIConfig, scope=Scope.APP)
+    provider.from_context(provides=HttpClientConfig, scope=Scope.APP)
     provider.from_context(provides=RedisConfig, scope=Scope.APP)
+    provider.from_context(provides=CacheConfig, scope=Scope.APP)
+    provider.from_context(provides=InferenceConfig, scope=Scope.APP)
+    provider.from_context(provides=AnimationConfig, scope=Scope.APP)
+    provider.from_context(provides=ModerationConfig, scope=Scope.APP)
+    provider.from_context(provides=RoutingConfig, scope=Scope.APP)
+    provider.from_context(provides=JobsConfig, scope=Scope.APP)
+    provider.from_context(provides=UrlFetchConfig, scope=Scope.APP)
     return provider
 
 
 def http_provider() -> Provider:
-    provider: Final[Provider] = Provider(scope=Scope.REQUEST)
+    # One session for the whole app, so connections to remote APIs are pooled and reused
+    provider: Final[Provider] = Provider(scope=Scope.APP)
     provider.provide(get_client, provides=ClientSession)
+    provider.provide(get_url_fetch_client)
     provider.provide(AioHTTPClient, provides=HttpClient)
+    provider.provide(get_host_limiter, provides=PerHostLimiter)
     return provider
 
 
-def gateways_provider() -> Provider:
-    provider: Final[Provider] = Provider(scope=Scope.REQUEST)
-    provider.provide(NSFWDetector, provides=NSFWDetector, scope=Scope.APP)
-    provider.provide(NSFWDetectorImageQueryGateway, provides=ImageQueryGateway)
+def inference_provider(inference_config: InferenceConfig) -> Provider:
+    """Creates a Provider for local model inference.
+
+    Args:
+        inference_config: Configuration which selects the inference backend.
+
+    Returns:
+        Provider: Provider with the selected backend and the batcher in front of it.
+    """
+    provider: Final[Provider] = Provider(scope=Scope.APP)
+
+    if inference_config.backend == "process":
+        # Model is loaded in worker processes only, API process doesn't need it
+        provider.provide(get_process_pool_inference_backend, provides=InferenceBackend)
+    elif inference_config.backend == "onnx":
+        provider.provide(get_onnx_inference_backend, provides=InferenceBackend)
+    else:
+        # torch is imported only when the model runs in the API process
+        from nsfw_image_detector import NSFWDetector
+
+        from nsfw_detector.infrastructure.inference.torch_providers import (
+            get_nsfw_detector,
+            get_thread_pool_inference_backend,
+        )
+
+        provider.provide(get_nsfw_detector, provides=NSFWDetector)
+        provider.provide(get_thread_pool_inference_backend, provides=InferenceBackend)
+
+    provider.provide(get_inference_batcher, provides=InferenceBatcher)
+    provider.provide(AnimatedImageSampler)
     return provider
 
 
-def cache_provider() -> Provider:
+def gateways_provider(routing_config: RoutingConfig) -> Provider:
+    """Creates a Provider for the gateway which checks images.
+
+    Args:
+        routing_config: Configuration which selects the local model, the remote API or routing between them.
+
+    Returns:
+        Provider: Provider with the selected image gateway.
+    """
     provider: Final[Provider] = Provider(scope=Scope.REQUEST)
-    provider.provide(get_redis_pool, scope=Scope.APP)
+
+    if routing_config.mode == "remote":
+        provider.provide(GenAIImageQueryGateway, provides=BackendImageQueryGateway)
+    elif routing_config.mode == "routed":
+        # Health of backends outlives requests, so routing decisions are based on all recent traffic
+        provider.provide(get_backend_health_registry, provides=BackendHealthRegistry, scope=Scope.APP)
+        provider.provide(NSFWDetectorImageQueryGateway)
+        provider.provide(GenAIImageQueryGateway)
+        provider.provide(get_routing_image_query_gateway, provides=BackendImageQueryGateway)
+    else:
+        provider.provide(NSFWDetectorImageQueryGateway, provides=BackendImageQueryGateway)
+
+    # Cache decorators wrap the alias, so the backend itself stays available to the cache warmer
+    provider.alias(source=BackendImageQueryGateway, provides=ImageQueryGateway)
+
+    # Downloaded images are checked by the decorated gateway, so they are cached by content as well
+    provider.provide(HttpImageUrlQueryGateway, provides=ImageUrlQueryGateway)
+    return provider
+
+
+def cache_provider(cache_config: CacheConfig) -> Provider:
+    """Creates a Provider for caching of moderation results.
+
+    Args:
+        cache_config: Configuration which enables optional cache layers.
+
+    Returns:
+        Provider: Provider with cache stores and caching decorators of the image gateway.
+    """
+    provider: Final[Provider] = Provider(scope=Scope.APP)
+    provider.provide(get_redis_pool)
     provider.provide(get_redis)
-    provider.decorate(ImageCachedQueryGateway, provides=NSFWDetectorImageQueryGateway)
+    provider.provide(get_cache_codec, provides=CacheCodec)
+    provider.provide(RedisCacheStore)
+    provider.provide(get_in_memory_cache_store, provides=InMemoryCacheStore)
+    provider.provide(get_cache_store, provides=CacheStore)
+    provider.provide(get_image_cache_namespace, provides=CacheNamespace)
+    provider.provide(get_single_flight, provides=SingleFlight[str, NSFWImageInformation])
+
+    # Decorators are applied in order of registration, so exact cache is checked first
+    if cache_config.phash_enabled:
+        provider.provide(get_perceptual_hash_index, provides=PerceptualHashIndex)
+        provider.decorate(ImageNearDuplicateQueryGateway, provides=ImageQueryGateway)
+
+    provider.decorate(ImageCachedQueryGateway, provides=ImageQueryGateway)
+    return provider
+
+
+def jobs_provider() -> Provider:
+    # Gateway only holds the shared Redis client, so it lives as long as the app
+    provider: Final[Provider] = Provider(scope=Scope.APP)
+    provider.provide(RedisStreamModerationJobGateway, provides=ModerationJobGateway)
     return provider
 
 
 def interactors_provider() -> Provider:
     provider: Final[Provider] = Provider(scope=Scope.REQUEST)
+    provider.provide(get_moderation_policies, provides=ModerationPolicies, scope=Scope.APP)
 
     provider.provide_all(
         CheckImageIsNSFWQueryHandler,
+        CheckImageIsNSFWByUrlQueryHandler,
+        SubmitModerationJobCommandHandler,
+        GetModerationJobQueryHandler,
     )
 
     return provider
 
 
-def setup_providers() -> Iterable[Provider]:
+def setup_providers(configs: Configs) -> Iterable[Provider]:
     """Assembles all dependency providers for the application.
 
+    Args:
+        configs: Application configs, used to select implementations.
+
     Returns:
         Iterable[Provider]: Tuple of all configured providers.
     """
-    return (
+    providers: list[Provider] = [
         configs_provider(),
         http_provider(),
         interactors_provider(),
-        gateways_provider(),
-        cache_provider()
-    )
+        gateways_provider(configs.routing),
+        cache_provider(configs.cache),
+        jobs_provider(),
+    ]
+    # Without the local model neither the model package nor torch is imported
+    if configs.routing.mode != "remote":
+        providers.append(inference_provider(configs.inference))
+
+    return tuple(providers)
@@ -1,7 +1,8 @@
 import logging
+import time
 from collections.abc import AsyncIterator
 from contextlib import asynccontextmanager
-from typing import Any, Final, cast
+from typing import Final, cast
 
 from dishka import AsyncContainer, make_async_container
 from dishka.integrations.fastapi import setup_dishka
@@ -9,16 +10,16 @@ from fastapi import FastAPI
 from fastapi.responses import ORJSONResponse
 
 import nsfw_detector
+from nsfw_detector.infrastructure.metrics.instruments import STARTUP_DURATION
 from nsfw_detector.setup.bootstrap import (
     setup_configs,
+    setup_context,
     setup_exc_handlers,
     setup_middlewares,
-    setup_routes
-)
-from nsfw_detector.setup.configs import (
-    ASGIConfig,
-    Configs, GenAPIConfig, RedisConfig,
+    setup_routes,
+    warm_up_local_model,
 )
+from nsfw_detector.setup.configs import Configs
 from nsfw_detector.setup.ioc import setup_providers
 
 logger: Final[logging.Logger] = logging.getLogger(__name__)
@@ -39,14 +40,22 @@ async def lifespan(app: FastAPI, /) -> AsyncIterator[None]:
         None: Indicates successful entry into the context.
 
     Note:
+        The local model is loaded and warmed up before yield, so the server starts
+            accepting connections only when the first request is served at full speed.
         The actual resource cleanup (Dishka container closure)
             happens after yield, during the application shutdown phase.
     """
+    container: AsyncContainer = cast("AsyncContainer", app.state.dishka_container)
+    await warm_up_local_model(container)
+    STARTUP_DURATION.labels("total").set(time.perf_counter() - app.state.started_at)
+    logger.info("App started in %.2fs", time.perf_counter() - app.state.started_at)
+
     yield None
-    await cast("AsyncContainer", app.state.dishka_container).close()
+    await container.close()
 
 
 def create_app_tests() -> FastAPI:
+    started_at: float = time.perf_counter()
     app: FastAPI = FastAPI(
         lifespan=lifespan,
         default_response_class=ORJSONResponse,
@@ -55,16 +64,12 @@ def create_app_tests() -> FastAPI:
         debug=True,
     )
     configs: Configs = setup_configs()
-    context: dict[Any, Any] = {
-        ASGIConfig: configs.asgi,
-        GenAPIConfig: configs.genai,
-        RedisConfig: configs.redis,
-    }
-    container: AsyncContainer = make_async_container(*setup_providers(), context=context)
+    container: AsyncContainer = make_async_container(*setup_providers(configs), context=setup_context(configs))
     setup_routes(app)
     setup_exc_handlers(app)
-    setup_middlewares(app, api_config=configs.asgi)
+    setup_middlewares(app, api_config=configs.asgi, moderation_config=configs.moderation)
     setup_dishka(container, app)
+    app.state.started_at = started_at
     logger.info("App created")
     return app
 
@@ -89,6 +94,7 @@ def create_app_production() -> FastAPI:  # pragma: no cover
         - Configures global application state
         - Registers all route handlers
     """
+    started_at: float = time.perf_counter()
     configs: Configs = setup_configs()
 
     app: FastAPI = FastAPI(
@@ -98,15 +104,11 @@ def create_app_production() -> FastAPI:  # pragma: no cover
         root_path="/api",
         debug=configs.asgi.fastapi_debug,
     )
-    context: dict[Any, Any] = {
-        ASGIConfig: configs.asgi,
-        GenAPIConfig: configs.genai,
-        RedisConfig: configs.redis,
-    }
-    container: AsyncContainer = make_async_container(*setup_providers(), context=context)
+    container: AsyncContainer = make_async_container(*setup_providers(configs), context=setup_context(configs))
     setup_routes(app)
     setup_exc_handlers(app)
-    setup_middlewares(app, api_config=configs.asgi)
+    setup_middlewares(app, api_config=configs.asgi, moderation_config=configs.moderation)
     setup_dishka(container, app)
+    app.state.started_at = started_at
     logger.info("App created")
     return app
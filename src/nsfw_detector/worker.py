@@ -0,0 +1,58 @@
+import asyncio
+import logging
+import os
+import signal
+import socket
+from typing import Final
+
+from dishka import AsyncContainer, make_async_container
+from redis.asyncio import Redis
+
+from nsfw_detector.application.queries.images.check_image_is_nsfw import (
+    CheckImageIsNSFWQuery,
+    CheckImageIsNSFWQueryHandler,
+)
+from nsfw_detector.application.queries.images.policies import ModerationPolicies
+from nsfw_detector.infrastructure.jobs.worker import ModerationJobWorker
+from nsfw_detector.setup.bootstrap import setup_configs, setup_context, setup_logging, warm_up_local_model
+from nsfw_detector.setup.configs import Configs
+from nsfw_detector.setup.ioc import setup_providers
+
+logger: Final[logging.Logger] = logging.getLogger(__name__)
+
+
+async def run_worker() -> None:
+    """
+    Runs worker of asynchronous moderation jobs until SIGINT or SIGTERM.
+
+    Worker uses the same container as the API, so images are checked by the same gateways,
+    caches and local model. Any amount of workers on any nodes can consume the same stream.
+    """
+    configs: Configs = setup_configs()
+    setup_logging(logger_config=configs.logging)
+
+    container: AsyncContainer = make_async_container(*setup_providers(configs), context=setup_context(configs))
+
+    async def check(query: CheckImageIsNSFWQuery) -> bool:
+        async with container() as request_container:
+            interactor: CheckImageIsNSFWQueryHandler = await request_container.get(CheckImageIsNSFWQueryHandler)
+            return await interactor(query)
+
+    try:
+        await warm_up_local_model(container)
+
+        worker: ModerationJobWorker = ModerationJobWorker(
+            redis=await container.get(Redis),
+            jobs_config=configs.jobs,
+            check=check,
+            policies=await container.get(ModerationPolicies),
+            consumer=configs.jobs.consumer or f"{socket.gethostname()}-{os.getpid()}",
+        )
+
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        for signal_number in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signal_number, worker.stop)
+
+        await worker.run()
+    finally:
+        await container.close()
@@ -0,0 +1,80 @@
+import pytest
+
+from nsfw_detector.application.common.errors.images import UnknownModerationPolicy
+from nsfw_detector.application.queries.images.policies import (
+    DEFAULT_MODERATION_POLICY,
+    ModerationPolicies,
+    ModerationPolicy,
+)
+from nsfw_detector.application.queries.images.view_models import NSFWImageInformation, NSFWScores
+
+
+def scored(neutral: float, low: float = 0.0, medium: float = 0.0, high: float = 0.0) -> NSFWImageInformation:
+    return NSFWImageInformation(
+        request_id="test",
+        status="success",
+        output=str(neutral),
+        scores=NSFWScores(neutral=neutral, low=low, medium=medium, high=high),
+    )
+
+
+def neutral_only(neutral: float) -> NSFWImageInformation:
+    return NSFWImageInformation(request_id="test", status="success", output=str(neutral))
+
+
+@pytest.mark.parametrize(
+    ("information", "is_allowed"),
+    [
+        (scored(0.9), True),
+        (scored(0.7), False),
+        (scored(0.5), False),
+        (neutral_only(0.9), True),
+        (neutral_only(0.7), False),
+    ],
+)
+def test_default_policy_checks_neutral_score(information: NSFWImageInformation, is_allowed: bool) -> None:
+    assert DEFAULT_MODERATION_POLICY.is_allowed(information) is is_allowed
+
+
+@pytest.mark.parametrize(
+    ("information", "is_allowed"),
+    [
+        (scored(0.95, low=0.1), True),
+        (scored(0.95, low=0.2), True),
+        (scored(0.95, low=0.3), False),
+        (scored(0.95, high=0.5), False),
+        (scored(0.8, low=0.1), False),
+    ],
+)
+def test_policy_checks_each_threshold(information: NSFWImageInformation, is_allowed: bool) -> None:
+    policy: ModerationPolicy = ModerationPolicy(min_neutral=0.9, max_low=0.2, max_high=0.4)
+
+    assert policy.is_allowed(information) is is_allowed
+
+
+def test_policy_with_level_limits_rejects_neutral_only_scores() -> None:
+    policy: ModerationPolicy = ModerationPolicy(min_neutral=0.5, max_low=0.2)
+
+    assert not policy.is_allowed(neutral_only(0.99))
+
+
+def test_policy_without_thresholds_allows_everything() -> None:
+    policy: ModerationPolicy = ModerationPolicy(min_neutral=None)
+
+    assert policy.is_allowed(scored(0.0, low=1.0, medium=1.0, high=1.0))
+    assert policy.is_allowed(neutral_only(0.0))
+
+
+def test_policies_are_selected_by_name() -> None:
+    policies: ModerationPolicies = ModerationPolicies.from_thresholds(
+        {"default": {"min_neutral": 0.5}, "kids": {"min_neutral": 0.9, "max_low": 0.1}},
+    )
+
+    assert policies.get(None) == ModerationPolicy(min_neutral=0.5)
+    assert policies.get("kids") == ModerationPolicy(min_neutral=0.9, max_low=0.1)
+    with pytest.raises(UnknownModerationPolicy):
+        policies.get("adults")
+
+
+def test_default_policy_is_used_when_not_configured() -> None:
+    assert ModerationPolicies(policies={}).get(None) == DEFAULT_MODERATION_POLICY
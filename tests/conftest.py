@@ -0,0 +1,7 @@
+import pytest
+from fakeredis import FakeAsyncRedis
+
+
+@pytest.fixture
+def redis() -> FakeAsyncRedis:
+    return FakeAsyncRedis()
@@ -0,0 +1,142 @@
+import asyncio
+import json
+import types
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from typing import Any
+
+import pytest
+from aiohttp import ClientSession, web
+from aiohttp.test_utils import TestServer
+
+from nsfw_detector.application.queries.images.view_models import NSFWImageInformation
+from nsfw_detector.infrastructure.adapters.images import gen_ai_query_gateway
+from nsfw_detector.infrastructure.adapters.images.gen_ai_query_gateway import GenAIImageQueryGateway
+from nsfw_detector.infrastructure.clients.http.impl import AioHTTPClient
+from nsfw_detector.infrastructure.errors.http import RemoteRequestFailedError, RemoteRequestTimeoutError
+from nsfw_detector.setup.configs import GenAPIConfig
+
+PROCESSING: web.Response = web.json_response({"request_id": 7, "status": "processing"})
+
+
+class FakeGenAPI:
+    """Accepts images asynchronously and answers polls with prepared responses, repeating the last one"""
+
+    def __init__(self, *polls: web.Response) -> None:
+        self.inputs: list[Any] = []
+        self.polls: int = 0
+        self._responses: list[web.Response] = list(polls)
+
+    def application(self) -> web.Application:
+        application: web.Application = web.Application()
+        application.router.add_post("/api/v1/networks/image-nsfw-checker", self.submit)
+        application.router.add_get("/api/v1/request/get/{request_id}", self.poll)
+        return application
+
+    async def submit(self, request: web.Request) -> web.Response:
+        form: Any = await request.post()
+        self.inputs.append(json.loads(form["input"]))
+        return web.json_response({"request_id": 7, "status": "starting"})
+
+    async def poll(self, request: web.Request) -> web.Response:
+        assert request.match_info["request_id"] == "7"
+        self.polls += 1
+        response: web.Response = self._responses[min(self.polls, len(self._responses)) - 1]
+        return web.Response(status=response.status, body=response.body, content_type=response.content_type)
+
+
+@asynccontextmanager
+async def serve(api: FakeGenAPI, **config: Any) -> AsyncIterator[GenAIImageQueryGateway]:
+    async with TestServer(api.application()) as server, ClientSession() as session:
+        yield GenAIImageQueryGateway(
+            http_client=AioHTTPClient(session),
+            api_config=GenAPIConfig(
+                API_KEY_FOR_NSFW_CONTENT="key",
+                GEN_API_BASE_URL=str(server.make_url("")).rstrip("/"),
+                GEN_API_MODE="async",
+                GEN_API_POLL_INTERVAL=0.01,
+                **config,
+            ),
+        )
+
+
+async def test_result_is_polled_until_done() -> None:
+    api: FakeGenAPI = FakeGenAPI(
+        PROCESSING,
+        PROCESSING,
+        web.json_response({"request_id": 7, "status": "success", "result": ["0.93"]}),
+    )
+
+    async with serve(api) as gateway:
+        information: NSFWImageInformation | None = await gateway.check_image_is_nsfw_by_file(b"image")
+
+    assert api.inputs == [{"is_sync": 0}]
+    assert api.polls == 3
+    assert information == NSFWImageInformation(request_id="7", status="success", output="0.93")
+
+
+async def test_delay_between_polls_grows_up_to_max_interval(monkeypatch: pytest.MonkeyPatch) -> None:
+    delays: list[float] = []
+
+    async def sleep(delay: float) -> None:
+        delays.append(delay)
+        await asyncio.sleep(0)
+
+    monkeypatch.setattr(
+        gen_ai_query_gateway,
+        "asyncio",
+        types.SimpleNamespace(sleep=sleep, get_running_loop=asyncio.get_running_loop),
+    )
+    monkeypatch.setattr(gen_ai_query_gateway, "random", types.SimpleNamespace(uniform=lambda low, high: 1.0))
+    api: FakeGenAPI = FakeGenAPI(
+        *[PROCESSING] * 5,
+        web.json_response({"request_id": 7, "status": "success", "result": ["0.93"]}),
+    )
+
+    async with serve(api, GEN_API_POLL_MAX_INTERVAL=0.05) as gateway:
+        await gateway.check_image_is_nsfw_by_file(b"image")
+
+    assert delays == pytest.approx([0.01, 0.02, 0.04, 0.05, 0.05, 0.05])
+
+
+@pytest.mark.parametrize(
+    "response",
+    [
+        web.json_response({"detail": "not found"}, status=404),
+        web.Response(text="<html>busy</html>", content_type="text/html"),
+        web.json_response({"request_id": 7, "status": "failed"}),
+    ],
+)
+async def test_failed_poll_is_not_retried(response: web.Response) -> None:
+    api: FakeGenAPI = FakeGenAPI(response, PROCESSING)
+
+    async with serve(api) as gateway:
+        with pytest.raises(RemoteRequestFailedError):
+            await gateway.check_image_is_nsfw_by_file(b"image")
+
+    assert api.polls == 1
+
+
+async def test_server_errors_are_polled_again() -> None:
+    api: FakeGenAPI = FakeGenAPI(
+        web.json_response({"detail": "unavailable"}, status=503),
+        web.json_response({"request_id": 7, "status": "success", "result": ["0.93"]}),
+    )
+
+    async with serve(api) as gateway:
+        information: NSFWImageInformation | None = await gateway.check_image_is_nsfw_by_file(b"image")
+
+    assert api.polls == 2
+    assert information is not None and information.output == "0.93"
+
+
+async def test_polling_gives_up_after_timeout() -> None:
+    api: FakeGenAPI = FakeGenAPI(PROCESSING)
+
+    async with serve(api, GEN_API_POLL_TIMEOUT=0.1) as gateway:
+        started_at: float = asyncio.get_running_loop().time()
+        with pytest.raises(RemoteRequestTimeoutError):
+            await gateway.check_image_is_nsfw_by_file(b"image")
+
+    assert asyncio.get_running_loop().time() - started_at < 1
+    assert api.polls > 1
@@ -0,0 +1,85 @@
+import io
+
+from fakeredis import FakeAsyncRedis
+from PIL import Image
+
+from nsfw_detector.application.queries.images.view_models import NSFWImageInformation, NSFWScores
+from nsfw_detector.infrastructure.adapters.images.near_duplicate_query_gateway import ImageNearDuplicateQueryGateway
+from nsfw_detector.infrastructure.cache.namespaces import CacheNamespace
+from nsfw_detector.infrastructure.cache.perceptual import PerceptualHashIndex
+
+SCORES: NSFWScores = NSFWScores(neutral=0.9, low=0.1, medium=0.05, high=0.01)
+
+
+class CountingGateway:
+    def __init__(self, status: str = "success") -> None:
+        self.checked: int = 0
+        self._status: str = status
+
+    async def check_image_is_nsfw_by_file(self, data: bytes, content_hash: str | None = None) -> NSFWImageInformation:
+        self.checked += 1
+        return NSFWImageInformation(request_id="request", status=self._status, output="0.9", scores=SCORES)
+
+
+def gradient(image_format: str, size: tuple[int, int] = (64, 64), **options: int) -> bytes:
+    image: Image.Image = Image.new("RGB", size)
+    image.putdata([(x * 4, y * 4, (x + y) * 2) for y in range(size[1]) for x in range(size[0])])
+    buffer: io.BytesIO = io.BytesIO()
+    image.save(buffer, format=image_format, **options)
+    return buffer.getvalue()
+
+
+def build_gateway(redis: FakeAsyncRedis, gateway: CountingGateway) -> ImageNearDuplicateQueryGateway:
+    return ImageNearDuplicateQueryGateway(
+        gateway=gateway,
+        perceptual_hash_index=PerceptualHashIndex(max_distance=4, max_entries=10),
+        cache_namespace=CacheNamespace(redis, name="nsfw_image", model_version="1", refresh_seconds=0),
+    )
+
+
+async def test_near_duplicate_gets_verdict_of_known_image(redis: FakeAsyncRedis) -> None:
+    backend: CountingGateway = CountingGateway()
+    gateway: ImageNearDuplicateQueryGateway = build_gateway(redis, backend)
+
+    await gateway.check_image_is_nsfw_by_file(gradient("PNG"))
+    # Re-encoded and resized copy doesn't match by content, but matches by perceptual hash
+    duplicate: NSFWImageInformation = await gateway.check_image_is_nsfw_by_file(
+        gradient("JPEG", size=(48, 48), quality=80),
+    )
+
+    assert backend.checked == 1
+    assert duplicate.scores == SCORES
+
+
+async def test_failed_verdict_is_not_indexed(redis: FakeAsyncRedis) -> None:
+    backend: CountingGateway = CountingGateway(status="error")
+    gateway: ImageNearDuplicateQueryGateway = build_gateway(redis, backend)
+
+    await gateway.check_image_is_nsfw_by_file(gradient("PNG"))
+    await gateway.check_image_is_nsfw_by_file(gradient("PNG"))
+
+    assert backend.checked == 2
+
+
+async def test_animation_and_broken_image_are_checked_without_index(redis: FakeAsyncRedis) -> None:
+    backend: CountingGateway = CountingGateway()
+    gateway: ImageNearDuplicateQueryGateway = build_gateway(redis, backend)
+    frames: list[Image.Image] = [Image.new("RGB", (8, 8), color) for color in ("black", "white")]
+    buffer: io.BytesIO = io.BytesIO()
+    frames[0].save(buffer, format="GIF", save_all=True, append_images=frames[1:])
+
+    for data in (buffer.getvalue(), buffer.getvalue(), b"not an image", b"not an image"):
+        await gateway.check_image_is_nsfw_by_file(data)
+
+    assert backend.checked == 4
+
+
+async def test_index_is_dropped_when_namespace_is_invalidated(redis: FakeAsyncRedis) -> None:
+    backend: CountingGateway = CountingGateway()
+    gateway: ImageNearDuplicateQueryGateway = build_gateway(redis, backend)
+    await gateway.check_image_is_nsfw_by_file(gradient("PNG"))
+
+    await CacheNamespace(redis, name="nsfw_image", model_version="1", refresh_seconds=0).invalidate()
+    await gateway.check_image_is_nsfw_by_file(gradient("PNG"))
+
+    assert backend.checked == 2
@@ -0,0 +1,75 @@
+import pytest
+
+from nsfw_detector.application.common.errors.images import FailedToProcessImage
+from nsfw_detector.application.queries.images.view_models import NSFWImageInformation
+from nsfw_detector.infrastructure.adapters.images.routing_query_gateway import RoutingImageQueryGateway
+from nsfw_detector.infrastructure.errors.http import ServiceUnAvailableError
+from nsfw_detector.infrastructure.routing.health import BackendHealth
+from nsfw_detector.setup.configs import RoutingConfig
+
+
+class StubGateway:
+    def __init__(self, name: str, error: Exception | None = None) -> None:
+        self.calls: int = 0
+        self._name: str = name
+        self._error: Exception | None = error
+
+    async def check_image_is_nsfw_by_file(self, data: bytes, content_hash: str | None = None) -> NSFWImageInformation:
+        self.calls += 1
+        if self._error is not None:
+            raise self._error
+        return NSFWImageInformation(request_id=self._name, status="success", output="0.9")
+
+
+def health(name: str, latency_seconds: float, capacity: int = 4) -> BackendHealth:
+    return BackendHealth(
+        name=name,
+        initial_latency_seconds=latency_seconds,
+        capacity=capacity,
+        config=RoutingConfig(),
+    )
+
+
+async def test_backend_with_lowest_expected_latency_is_chosen() -> None:
+    local_health: BackendHealth = health("local", latency_seconds=0.1)
+    remote_health: BackendHealth = health("remote", latency_seconds=0.25)
+    gateway: RoutingImageQueryGateway = RoutingImageQueryGateway(
+        [(StubGateway("local"), local_health), (StubGateway("remote"), remote_health)],
+    )
+
+    assert (await gateway.check_image_is_nsfw_by_file(b"image")).request_id == "local"
+
+    # Saturated local backend is expected to answer slower than the idle remote one
+    for _ in range(12):
+        local_health.on_start()
+
+    assert (await gateway.check_image_is_nsfw_by_file(b"image")).request_id == "remote"
+
+
+async def test_failed_backend_falls_back_to_next_one() -> None:
+    local_health: BackendHealth = health("local", latency_seconds=0.1)
+    gateway: RoutingImageQueryGateway = RoutingImageQueryGateway(
+        [
+            (StubGateway("local", ServiceUnAvailableError("down")), local_health),
+            (StubGateway("remote"), health("remote", latency_seconds=0.25)),
+        ],
+    )
+
+    assert (await gateway.check_image_is_nsfw_by_file(b"image")).request_id == "remote"
+    assert local_health.snapshot().error_rate > 0
+    assert local_health.in_flight == 0
+
+
+async def test_errors_of_input_are_not_retried() -> None:
+    remote: StubGateway = StubGateway("remote")
+    gateway: RoutingImageQueryGateway = RoutingImageQueryGateway(
+        [
+            (StubGateway("local", FailedToProcessImage("broken")), health("local", latency_seconds=0.1)),
+            (remote, health("remote", latency_seconds=0.25)),
+        ],
+    )
+
+    with pytest.raises(FailedToProcessImage):
+        await gateway.check_image_is_nsfw_by_file(b"image")
+
+    assert remote.calls == 0
@@ -0,0 +1,89 @@
+from typing import Any
+
+import pytest
+from fakeredis import FakeAsyncRedis
+
+from nsfw_detector.application.common.errors.images import NotAllowedImageUrl
+from nsfw_detector.application.queries.images.view_models import NSFWImageInformation
+from nsfw_detector.infrastructure.adapters.images.url_query_gateway import HttpImageUrlQueryGateway
+from nsfw_detector.infrastructure.cache.codecs import CompactCodec
+from nsfw_detector.infrastructure.cache.impl import RedisCacheStore
+from nsfw_detector.infrastructure.cache.namespaces import CacheNamespace
+from nsfw_detector.infrastructure.clients.http.base import HttpResponse, UrlFetchHttpClient
+from nsfw_detector.infrastructure.concurrency.host_limiter import PerHostLimiter
+from nsfw_detector.infrastructure.errors.http import NotAllowedHostError
+from nsfw_detector.setup.configs import CacheConfig, ModerationConfig, UrlFetchConfig
+
+
+class RedirectingClient:
+    """Redirects each URL to the next one, then responds with an image"""
+
+    def __init__(self, *locations: str) -> None:
+        self.requested: list[str] = []
+        self._locations: list[str] = list(locations)
+
+    async def get_limited(self, url: str, max_bytes: int, **kwargs: Any) -> HttpResponse:
+        self.requested.append(url)
+        if url.startswith("http://rebound."):
+            raise NotAllowedHostError(f"{url} resolves to 127.0.0.1")
+        if self._locations:
+            return HttpResponse(status=302, headers={"Location": self._locations.pop(0)}, body=b"")
+        return HttpResponse(status=200, headers={}, body=b"image")
+
+
+class StubGateway:
+    async def check_image_is_nsfw_by_file(self, data: bytes, content_hash: str | None = None) -> NSFWImageInformation:
+        return NSFWImageInformation(request_id="request", status="success", output="0.9")
+
+
+def build_gateway(redis: FakeAsyncRedis, client: RedirectingClient) -> HttpImageUrlQueryGateway:
+    return HttpImageUrlQueryGateway(
+        http_client=UrlFetchHttpClient(client),
+        gateway=StubGateway(),
+        cache_store=RedisCacheStore(redis, CompactCodec(), CacheConfig()),
+        cache_namespace=CacheNamespace(redis, name="nsfw_image", model_version="1", refresh_seconds=0),
+        host_limiter=PerHostLimiter(limit=1),
+        url_fetch_config=UrlFetchConfig(),
+        moderation_config=ModerationConfig(),
+    )
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        "http://127.0.0.1/image.png",
+        "http://2130706433/image.png",
+        "http://0x7f000001/image.png",
+        "http://127.1/image.png",
+        "http://[::ffff:127.0.0.1]/image.png",
+        "http://localhost/image.png",
+    ],
+)
+async def test_private_addresses_are_not_requested(redis: FakeAsyncRedis, url: str) -> None:
+    client: RedirectingClient = RedirectingClient()
+
+    with pytest.raises(NotAllowedImageUrl):
+        await build_gateway(redis, client).check_image_is_nsfw_by_url(url)
+
+    assert client.requested == []
+
+
+@pytest.mark.parametrize("location", ["http://0x7f000001/image.png", "http://rebound.example.com/image.png"])
+async def test_redirect_to_private_address_is_rejected(redis: FakeAsyncRedis, location: str) -> None:
+    client: RedirectingClient = RedirectingClient("https://cdn.example.com/image.png", location)
+
+    with pytest.raises(NotAllowedImageUrl):
+        await build_gateway(redis, client).check_image_is_nsfw_by_url("https://images.example.com/image.png")
+
+    assert "http://0x7f000001/image.png" not in client.requested
+
+
+async def test_image_is_downloaded_through_redirects(redis: FakeAsyncRedis) -> None:
+    client: RedirectingClient = RedirectingClient("/moved.png")
+
+    information: NSFWImageInformation = await build_gateway(redis, client).check_image_is_nsfw_by_url(
+        "https://images.example.com/image.png",
+    )
+
+    assert information.output == "0.9"
+    assert client.requested == ["https://images.example.com/image.png", "https://images.example.com/moved.png"]
@@ -0,0 +1,54 @@
+from typing import Any
+
+import pytest
+
+from nsfw_detector.infrastructure.cache.codecs import CacheCodec, CompactCodec, PickleZlibCodec
+from nsfw_detector.infrastructure.errors.cache import CacheDecodeError
+
+VALUES: list[Any] = [
+    None,
+    "0.91",
+    "",
+    b"\x00\xff",
+    0,
+    -(2 ** 63),
+    2 ** 70,
+    True,
+    0.1,
+    (0.7, 0.1, 0.05, 0.01),
+    (0.123456789012345, 1e-300),
+    ("etag", "Mon, 01 Jan 2024 00:00:00 GMT", (0.7, 0.2, 0.1, 0.0)),
+    {"key": [1, 2, 3]},
+]
+
+
+@pytest.mark.parametrize("codec", [CompactCodec(), CompactCodec(compress_threshold=1), PickleZlibCodec()])
+@pytest.mark.parametrize("value", VALUES)
+def test_value_round_trips_exactly(codec: CacheCodec, value: Any) -> None:
+    decoded: Any = codec.decode(codec.encode(value))
+
+    assert decoded == value
+    assert type(decoded) is type(value)
+
+
+def test_scores_keep_their_side_of_threshold() -> None:
+    codec: CompactCodec = CompactCodec()
+    # Single precision turns 0.7 into 0.699999988, which is below the default threshold
+    threshold: float = 0.7
+    scores: tuple[float, ...] = (threshold + 1e-12, 0.1, 0.05, 0.01)
+
+    assert codec.decode(codec.encode(scores))[0] > threshold
+
+
+def test_long_values_are_compressed() -> None:
+    codec: CompactCodec = CompactCodec(compress_threshold=16)
+    value: str = "verdict" * 100
+
+    assert len(codec.encode(value)) < len(value)
+    assert codec.decode(codec.encode(value)) == value
+
+
+@pytest.mark.parametrize("data", [b"", b"\x06\x00\x00\x00\x00", b"\x7f", b"\x84\x00", b"\x04\x00"])
+def test_broken_data_raises_decode_error(data: bytes) -> None:
+    with pytest.raises(CacheDecodeError):
+        CompactCodec().decode(data)
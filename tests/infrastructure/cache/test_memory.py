@@ -0,0 +1,91 @@
+import types
+
+import pytest
+
+from nsfw_detector.infrastructure.cache import memory
+from nsfw_detector.infrastructure.cache.base import MISSING, CacheEntry, Key, KeyWithPrefix, Prefix
+from nsfw_detector.infrastructure.cache.memory import CacheStats, InMemoryCacheStore
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now: float = 100.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> Clock:
+    clock: Clock = Clock()
+    monkeypatch.setattr(memory, "time", types.SimpleNamespace(monotonic=clock.monotonic))
+    return clock
+
+
+def key(value: str) -> KeyWithPrefix:
+    return KeyWithPrefix(key=Key(value), prefix=Prefix("nsfw_image:1:0"))
+
+
+async def test_entry_expires_by_ttl(clock: Clock) -> None:
+    store: InMemoryCacheStore = InMemoryCacheStore(max_entries=10)
+    await store.set(key("first"), "0.9", ttl=5)
+
+    clock.now += 4.9
+    assert await store.get(key("first")) == "0.9"
+    assert await store.exists(key("first"))
+
+    clock.now += 0.1
+    assert await store.get(key("first")) is None
+    assert not await store.exists(key("first"))
+    assert store.stats == CacheStats(hits=1, misses=1, evictions=0, entries=0)
+
+
+async def test_least_recently_used_entry_is_evicted_when_full(clock: Clock) -> None:
+    store: InMemoryCacheStore = InMemoryCacheStore(max_entries=2)
+    await store.set(key("first"), "0.1")
+    await store.set(key("second"), "0.2")
+
+    # Reading makes the first entry the most recently used one
+    await store.get(key("first"))
+    await store.set(key("third"), "0.3")
+
+    assert await store.get_many([key("first"), key("second"), key("third")]) == ["0.1", None, "0.3"]
+    assert store.stats.evictions == 1
+    assert store.stats.entries == 2
+
+
+async def test_clear_by_prefix_keeps_other_prefixes(clock: Clock) -> None:
+    store: InMemoryCacheStore = InMemoryCacheStore(max_entries=10)
+    other: KeyWithPrefix = KeyWithPrefix(key=Key("first"), prefix=Prefix("nsfw_image:1:1"))
+    await store.set(key("first"), "0.1")
+    await store.set(other, "0.2")
+
+    await store.clear_by_prefix(Prefix("nsfw_image:1:0"))
+
+    assert await store.get(key("first")) is None
+    assert await store.get(other) == "0.2"
+
+
+async def test_set_many_keeps_ttl_of_each_entry(clock: Clock) -> None:
+    store: InMemoryCacheStore = InMemoryCacheStore(max_entries=10)
+    await store.set_many([
+        CacheEntry(key=key("short"), value="0.1", ttl=5),
+        CacheEntry(key=key("long"), value="0.2", ttl=300),
+    ])
+
+    clock.now += 5
+    assert await store.get_many([key("short"), key("long")], default=MISSING) == [MISSING, "0.2"]
+
+
+async def test_get_many_keeps_order_of_keys(clock: Clock) -> None:
+    store: InMemoryCacheStore = InMemoryCacheStore(max_entries=10)
+    await store.set_many([
+        CacheEntry(key=key("first"), value="0.1"),
+        CacheEntry(key=key("second"), value="0.2"),
+        CacheEntry(key=key("empty"), value=None),
+    ])
+
+    assert await store.get_many(
+        [key("second"), key("missing"), key("first"), key("empty")],
+        default=MISSING,
+    ) == ["0.2", MISSING, "0.1", None]
@@ -0,0 +1,77 @@
+import types
+
+import pytest
+from fakeredis import FakeAsyncRedis
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from nsfw_detector.infrastructure.cache import namespaces
+from nsfw_detector.infrastructure.cache.base import Prefix
+from nsfw_detector.infrastructure.cache.namespaces import CacheNamespace
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now: float = 100.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> Clock:
+    clock: Clock = Clock()
+    monkeypatch.setattr(namespaces, "time", types.SimpleNamespace(monotonic=clock.monotonic))
+    return clock
+
+
+def namespace(redis: FakeAsyncRedis, model_version: str = "1", refresh_seconds: float = 10) -> CacheNamespace:
+    return CacheNamespace(redis, name="nsfw_image", model_version=model_version, refresh_seconds=refresh_seconds)
+
+
+async def test_prefix_includes_model_version_and_generation(redis: FakeAsyncRedis) -> None:
+    assert await namespace(redis).prefix() == Prefix("nsfw_image:1:0")
+    assert await namespace(redis, model_version="2").prefix() == Prefix("nsfw_image:2:0")
+    assert namespace(redis).root == Prefix("nsfw_image")
+
+
+async def test_invalidation_switches_to_next_generation(redis: FakeAsyncRedis) -> None:
+    cache_namespace: CacheNamespace = namespace(redis)
+
+    assert await cache_namespace.invalidate() == Prefix("nsfw_image:1:0")
+    assert await cache_namespace.invalidate() == Prefix("nsfw_image:1:1")
+    assert await cache_namespace.prefix() == Prefix("nsfw_image:1:2")
+    # Counter lives outside of the namespace, so clearing entries by the root prefix keeps it
+    assert await redis.get("cache_generation:nsfw_image") == b"2"
+
+
+async def test_other_instances_pick_up_invalidation_after_refresh_interval(
+        redis: FakeAsyncRedis,
+        clock: Clock,
+) -> None:
+    other: CacheNamespace = namespace(redis)
+    assert await other.prefix() == Prefix("nsfw_image:1:0")
+
+    await namespace(redis).invalidate()
+    clock.now += 9.9
+    assert await other.prefix() == Prefix("nsfw_image:1:0")
+
+    clock.now += 0.1
+    assert await other.prefix() == Prefix("nsfw_image:1:1")
+
+
+async def test_generation_is_kept_when_redis_is_unavailable(
+        redis: FakeAsyncRedis,
+        clock: Clock,
+        monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    await redis.set("cache_generation:nsfw_image", 3)
+    cache_namespace: CacheNamespace = namespace(redis)
+    assert await cache_namespace.prefix() == Prefix("nsfw_image:1:3")
+
+    async def unavailable(*args: object) -> None:
+        raise RedisConnectionError("Redis is down")
+
+    monkeypatch.setattr(redis, "get", unavailable)
+    clock.now += 10
+
+    assert await cache_namespace.prefix() == Prefix("nsfw_image:1:3")
@@ -0,0 +1,125 @@
+import types
+
+import pytest
+from fakeredis import FakeAsyncRedis
+
+from nsfw_detector.infrastructure.cache import perceptual
+from nsfw_detector.infrastructure.cache.perceptual import PerceptualHashIndex
+
+SCORES: tuple[float, ...] = (0.9, 0.1, 0.05, 0.01)
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now: float = 1_000_000.0
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> Clock:
+    clock: Clock = Clock()
+    monkeypatch.setattr(perceptual, "time", types.SimpleNamespace(time=clock.time))
+    return clock
+
+
+async def test_closest_hash_within_distance_is_found() -> None:
+    index: PerceptualHashIndex = PerceptualHashIndex(max_distance=4, max_entries=10)
+    await index.use_namespace("nsfw_image:1")
+    await index.add(0b1111, SCORES)
+
+    assert index.find(0b1111) == SCORES
+    assert index.find(0b0000) == SCORES
+    assert index.find(0b11111 << 20 | 0b1111) is None
+
+
+async def test_full_index_evicts_oldest_hash() -> None:
+    index: PerceptualHashIndex = PerceptualHashIndex(max_distance=0, max_entries=2)
+    await index.use_namespace("nsfw_image:1")
+    await index.add(1, "0.9")
+    await index.add(2, "0.8")
+    # Rewritten hash becomes the newest one
+    await index.add(1, "0.7")
+    await index.add(3, "0.6")
+
+    assert len(index) == 2
+    assert index.find(2) is None
+    assert (index.find(1), index.find(3)) == ("0.7", "0.6")
+
+
+async def test_hash_older_than_ttl_is_miss(clock: Clock) -> None:
+    index: PerceptualHashIndex = PerceptualHashIndex(max_distance=4, max_entries=10, ttl=60)
+    await index.use_namespace("nsfw_image:1")
+    await index.add(0b1111, SCORES)
+
+    clock.now += 59
+    assert index.find(0b0111) == SCORES
+
+    clock.now += 1
+    assert index.find(0b1111) is None
+    assert index.find(0b0111) is None
+
+
+async def test_expired_hashes_are_removed_on_write(redis: FakeAsyncRedis, clock: Clock) -> None:
+    index: PerceptualHashIndex = PerceptualHashIndex(max_distance=4, max_entries=10, redis=redis, ttl=60)
+    await index.use_namespace("nsfw_image:1")
+    await index.add(0xFF, SCORES)
+    clock.now += 30
+    await index.add(0xFF00, SCORES)
+
+    clock.now += 40
+    await index.add(0xFF0000, "0.42")
+
+    assert len(index) == 2
+    assert sorted(await redis.hkeys("nsfw_image:1:phash")) == [b"000000000000ff00", b"0000000000ff0000"]
+
+
+async def test_evicted_hashes_are_deleted_from_redis(redis: FakeAsyncRedis) -> None:
+    index: PerceptualHashIndex = PerceptualHashIndex(max_distance=0, max_entries=1, redis=redis, ttl=60)
+    await index.use_namespace("nsfw_image:1")
+    await index.add(1, "0.9")
+    await index.add(2, "0.8")
+
+    assert await redis.hkeys("nsfw_image:1:phash") == [b"0000000000000002"]
+
+
+async def test_only_newest_unexpired_hashes_are_loaded_on_restart(redis: FakeAsyncRedis, clock: Clock) -> None:
+    index: PerceptualHashIndex = PerceptualHashIndex(max_distance=0, max_entries=10, redis=redis, ttl=50)
+    await index.use_namespace("nsfw_image:1")
+    for dhash in range(1, 5):
+        await index.add(dhash, f"0.{dhash}")
+        clock.now += 15
+
+    restarted: PerceptualHashIndex = PerceptualHashIndex(max_distance=0, max_entries=2, redis=redis, ttl=50)
+    await restarted.use_namespace("nsfw_image:1")
+
+    # First hash is expired, second one is the oldest of those which don't fit
+    assert [restarted.find(dhash) for dhash in range(1, 5)] == [None, None, "0.3", "0.4"]
+    assert b"0000000000000001" not in await redis.hkeys("nsfw_image:1:phash")
+
+
+async def test_persisted_hashes_expire_and_are_loaded_on_restart(redis: FakeAsyncRedis) -> None:
+    index: PerceptualHashIndex = PerceptualHashIndex(max_distance=4, max_entries=10, redis=redis, ttl=60)
+    await index.use_namespace("nsfw_image:1")
+    await index.add(0xFF, SCORES)
+    await index.add(0xFF00, "0.42")
+
+    assert 0 < await redis.ttl("nsfw_image:1:phash") <= 60
+
+    restarted: PerceptualHashIndex = PerceptualHashIndex(max_distance=4, max_entries=10, redis=redis, ttl=60)
+    await restarted.use_namespace("nsfw_image:1")
+
+    assert restarted.find(0xFF) == SCORES
+    assert restarted.find(0xFF00) == "0.42"
+
+
+async def test_hashes_of_previous_namespace_are_dropped(redis: FakeAsyncRedis) -> None:
+    index: PerceptualHashIndex = PerceptualHashIndex(max_distance=4, max_entries=10, redis=redis, ttl=60)
+    await index.use_namespace("nsfw_image:1")
+    await index.add(0xFF, SCORES)
+
+    await index.use_namespace("nsfw_image:2")
+
+    assert len(index) == 0
+    assert index.find(0xFF) is None
@@ -0,0 +1,107 @@
+import types
+
+import pytest
+from fakeredis import FakeAsyncRedis
+
+from nsfw_detector.infrastructure.cache import impl
+from nsfw_detector.infrastructure.cache.base import MISSING, CacheEntry, Key, KeyWithPrefix, Prefix
+from nsfw_detector.infrastructure.cache.codecs import CompactCodec
+from nsfw_detector.infrastructure.cache.impl import RedisCacheStore
+from nsfw_detector.setup.configs import CacheConfig
+
+
+def store(redis: FakeAsyncRedis, **values: int) -> RedisCacheStore:
+    return RedisCacheStore(redis, CompactCodec(), CacheConfig(**values))
+
+
+def key(value: str) -> KeyWithPrefix:
+    return KeyWithPrefix(key=Key(value), prefix=Prefix("nsfw_image:1:0"))
+
+
+async def fill(redis: FakeAsyncRedis, prefix: str, amount: int) -> None:
+    await redis.mset({f"{prefix}:{number}": b"value" for number in range(amount)})
+
+
+async def test_clear_by_prefix_unlinks_only_keys_of_prefix(redis: FakeAsyncRedis) -> None:
+    await fill(redis, "nsfw_image:1:0", 25)
+    await fill(redis, "nsfw_image:1:1", 3)
+    await redis.set("cache_generation:nsfw_image", 1)
+
+    await store(redis, CACHE_CLEAR_BATCH_SIZE=10).clear_by_prefix(Prefix("nsfw_image:1:0"))
+
+    assert sorted(await redis.keys()) == [
+        b"cache_generation:nsfw_image",
+        b"nsfw_image:1:1:0",
+        b"nsfw_image:1:1:1",
+        b"nsfw_image:1:1:2",
+    ]
+
+
+async def test_clear_by_prefix_unlinks_keys_in_batches(redis: FakeAsyncRedis, monkeypatch: pytest.MonkeyPatch) -> None:
+    await fill(redis, "nsfw_image:1:0", 25)
+    unlinked: list[int] = []
+    unlink = redis.unlink
+
+    async def counting_unlink(*keys: bytes) -> int:
+        unlinked.append(len(keys))
+        return await unlink(*keys)
+
+    monkeypatch.setattr(redis, "unlink", counting_unlink)
+
+    await store(redis, CACHE_CLEAR_BATCH_SIZE=10).clear_by_prefix(Prefix("nsfw_image:1:0"))
+
+    assert sum(unlinked) == 25
+    assert max(unlinked) <= 10
+
+
+async def test_clear_by_prefix_is_rate_limited(redis: FakeAsyncRedis, monkeypatch: pytest.MonkeyPatch) -> None:
+    await fill(redis, "nsfw_image:1:0", 20)
+    delays: list[float] = []
+
+    async def sleep(delay: float) -> None:
+        delays.append(delay)
+
+    # Clock stands still, so each batch waits for the whole share of keys deleted before it
+    monkeypatch.setattr(impl, "time", types.SimpleNamespace(monotonic=lambda: 0.0))
+    monkeypatch.setattr(impl, "asyncio", types.SimpleNamespace(sleep=sleep))
+
+    await store(redis, CACHE_CLEAR_BATCH_SIZE=5, CACHE_CLEAR_MAX_KEYS_PER_SECOND=10).clear_by_prefix(
+        Prefix("nsfw_image:1:0"),
+    )
+
+    assert delays == [0.5, 1.0, 1.5]
+    assert await redis.keys("nsfw_image:*") == []
+
+
+@pytest.mark.filterwarnings("error::DeprecationWarning")
+async def test_set_many_keeps_ttl_of_each_entry(redis: FakeAsyncRedis) -> None:
+    await store(redis).set_many([
+        CacheEntry(key=key("short"), value="0.1", ttl=5),
+        CacheEntry(key=key("long"), value="0.2", ttl=300),
+    ])
+
+    assert 0 < await redis.ttl("nsfw_image:1:0:short") <= 5
+    assert 298 < await redis.ttl("nsfw_image:1:0:long") <= 300
+
+
+@pytest.mark.filterwarnings("error::DeprecationWarning")
+async def test_set_keeps_ttl(redis: FakeAsyncRedis) -> None:
+    await store(redis).set(key("first"), "0.1", ttl=5)
+
+    assert 0 < await redis.ttl("nsfw_image:1:0:first") <= 5
+
+
+async def test_get_many_keeps_order_of_keys(redis: FakeAsyncRedis) -> None:
+    cache_store: RedisCacheStore = store(redis)
+    await cache_store.set_many([
+        CacheEntry(key=key("first"), value="0.1"),
+        CacheEntry(key=key("second"), value="0.2"),
+        CacheEntry(key=key("empty"), value=None),
+    ])
+
+    assert await cache_store.get_many(
+        [key("second"), key("missing"), key("first"), key("empty")],
+        default=MISSING,
+    ) == ["0.2", MISSING, "0.1", None]
+    assert await cache_store.get_many([key("missing"), key("first")]) == [None, "0.1"]
+    assert await cache_store.get_many([]) == []
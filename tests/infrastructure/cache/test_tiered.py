@@ -0,0 +1,122 @@
+import types
+from typing import Any, Sequence
+
+import pytest
+from fakeredis import FakeAsyncRedis
+
+from nsfw_detector.infrastructure.cache import memory
+from nsfw_detector.infrastructure.cache.base import MISSING, CacheEntry, Key, KeyWithPrefix, Prefix
+from nsfw_detector.infrastructure.cache.codecs import CompactCodec
+from nsfw_detector.infrastructure.cache.impl import RedisCacheStore
+from nsfw_detector.infrastructure.cache.memory import InMemoryCacheStore
+from nsfw_detector.infrastructure.cache.tiered import TieredCacheStore
+from nsfw_detector.setup.configs import CacheConfig
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now: float = 100.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> Clock:
+    clock: Clock = Clock()
+    monkeypatch.setattr(memory, "time", types.SimpleNamespace(monotonic=clock.monotonic))
+    return clock
+
+
+def key(value: str) -> KeyWithPrefix:
+    return KeyWithPrefix(key=Key(value), prefix=Prefix("nsfw_image:1:0"))
+
+
+def tiered(redis: FakeAsyncRedis, l1_max_ttl: int = 60) -> tuple[TieredCacheStore, InMemoryCacheStore, RedisCacheStore]:
+    l1: InMemoryCacheStore = InMemoryCacheStore(max_entries=100)
+    l2: RedisCacheStore = RedisCacheStore(redis, CompactCodec(), CacheConfig())
+    return TieredCacheStore(l1=l1, l2=l2, l1_max_ttl=l1_max_ttl), l1, l2
+
+
+async def test_l1_entry_doesnt_outlive_l2_entry(redis: FakeAsyncRedis, clock: Clock) -> None:
+    store, l1, l2 = tiered(redis)
+    await l2.set(key("first"), "0.9", ttl=5)
+
+    assert await store.get(key("first")) == "0.9"
+    # L1 keeps the entry for the remaining TTL of Redis rounded down instead of 60 seconds
+    await redis.flushall()
+
+    clock.now += 3.9
+    assert await store.get(key("first")) == "0.9"
+
+    clock.now += 1.1
+    assert await store.get(key("first")) is None
+
+
+async def test_l1_ttl_is_capped_by_l1_max_ttl(redis: FakeAsyncRedis, clock: Clock) -> None:
+    store, l1, l2 = tiered(redis, l1_max_ttl=2)
+    await store.set(key("first"), "0.9", ttl=300)
+
+    assert 298 < await redis.ttl("nsfw_image:1:0:first") <= 300
+
+    clock.now += 2
+    assert await l1.get(key("first")) is None
+    assert await store.get(key("first")) == "0.9"
+
+
+async def test_get_many_reads_misses_of_l1_through_from_l2(
+        redis: FakeAsyncRedis,
+        clock: Clock,
+        monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    store, l1, l2 = tiered(redis)
+    await l1.set(key("memory"), "0.1")
+    await l2.set(key("redis"), "0.2", ttl=30)
+    requested: list[list[KeyWithPrefix]] = []
+    get_many_with_ttl = l2.get_many_with_ttl
+
+    async def record(keys: Sequence[KeyWithPrefix], default: Any | None = None) -> list[tuple[Any, float | None]]:
+        requested.append(list(keys))
+        return await get_many_with_ttl(keys, default=default)
+
+    monkeypatch.setattr(l2, "get_many_with_ttl", record)
+
+    assert await store.get_many([key("redis"), key("memory"), key("missing")], default="-") == ["0.2", "0.1", "-"]
+    assert requested == [[key("redis"), key("missing")]]
+
+    # Entries read through are served from L1 afterwards
+    await redis.flushall()
+    assert await store.get_many([key("redis"), key("memory")]) == ["0.2", "0.1"]
+    assert len(requested) == 1
+
+
+async def test_set_many_keeps_ttl_of_each_entry(redis: FakeAsyncRedis, clock: Clock) -> None:
+    store, l1, l2 = tiered(redis, l1_max_ttl=60)
+    await store.set_many([
+        CacheEntry(key=key("short"), value="0.1", ttl=5),
+        CacheEntry(key=key("long"), value="0.2", ttl=300),
+    ])
+
+    assert 0 < await redis.ttl("nsfw_image:1:0:short") <= 5
+    assert 298 < await redis.ttl("nsfw_image:1:0:long") <= 300
+
+    clock.now += 5
+    assert await l1.get_many([key("short"), key("long")], default=MISSING) == [MISSING, "0.2"]
+    clock.now += 55
+    assert await l1.get(key("long"), default=MISSING) is MISSING
+
+
+async def test_get_many_keeps_order_of_keys(redis: FakeAsyncRedis, clock: Clock) -> None:
+    store, l1, l2 = tiered(redis)
+    await l1.set(key("first"), "0.1")
+    await l2.set_many([
+        CacheEntry(key=key("second"), value="0.2"),
+        CacheEntry(key=key("empty"), value=None),
+    ])
+
+    assert await store.get_many(
+        [key("second"), key("missing"), key("first"), key("empty")],
+        default=MISSING,
+    ) == ["0.2", MISSING, "0.1", None]
+    # Cached None is read through into L1 as well, it is not mistaken for a miss
+    assert await l1.get(key("empty"), default=MISSING) is None
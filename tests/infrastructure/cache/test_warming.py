@@ -0,0 +1,99 @@
+import json
+from pathlib import Path
+
+import pytest
+from fakeredis import FakeAsyncRedis
+
+from nsfw_detector.application.queries.images.view_models import NSFWImageInformation, NSFWScores
+from nsfw_detector.infrastructure.cache.base import CacheStore
+from nsfw_detector.infrastructure.cache.codecs import CompactCodec
+from nsfw_detector.infrastructure.cache.impl import RedisCacheStore
+from nsfw_detector.infrastructure.cache.namespaces import CacheNamespace
+from nsfw_detector.infrastructure.cache.warming import CacheWarmer, CacheWarmingProgress
+from nsfw_detector.setup.configs import CacheConfig
+
+
+class CountingGateway:
+    def __init__(self) -> None:
+        self.checked: list[str] = []
+
+    async def check_image_is_nsfw_by_file(self, data: bytes, content_hash: str | None = None) -> NSFWImageInformation:
+        self.checked.append(data.decode())
+        return NSFWImageInformation(
+            request_id="request",
+            status="success",
+            output="0.9",
+            scores=NSFWScores(neutral=0.9, low=0.1, medium=0.05, high=0.01),
+        )
+
+
+@pytest.fixture
+def corpus(tmp_path: Path) -> Path:
+    source: Path = tmp_path / "corpus"
+    source.mkdir()
+    for number in range(5):
+        (source / f"{number}.png").write_bytes(f"image {number}".encode())
+    return source
+
+
+def build_warmer(redis: FakeAsyncRedis, gateway: CountingGateway, model_version: str = "1") -> CacheWarmer:
+    cache_store: CacheStore = RedisCacheStore(redis, CompactCodec(), CacheConfig())
+    return CacheWarmer(
+        gateway=gateway,
+        cache_store=cache_store,
+        cache_namespace=CacheNamespace(redis, name="nsfw_image", model_version=model_version, refresh_seconds=0),
+        concurrency=2,
+        batch_size=2,
+        max_image_bytes=1024,
+        ttl=600,
+    )
+
+
+async def test_verdicts_are_written_with_warming_ttl(redis: FakeAsyncRedis, corpus: Path) -> None:
+    gateway: CountingGateway = CountingGateway()
+
+    progress: CacheWarmingProgress = await build_warmer(redis, gateway).run(corpus)
+
+    assert (progress.processed, progress.warmed, progress.skipped, progress.failed) == (5, 5, 0, 0)
+    keys: list[bytes] = await redis.keys("nsfw_image:1:0:*")
+    assert len(keys) == 5
+    assert all(500 < ttl <= 600 for ttl in [await redis.ttl(key) for key in keys])
+
+
+async def test_cached_images_are_skipped(redis: FakeAsyncRedis, corpus: Path) -> None:
+    await build_warmer(redis, CountingGateway()).run(corpus)
+    gateway: CountingGateway = CountingGateway()
+
+    progress: CacheWarmingProgress = await build_warmer(redis, gateway).run(corpus)
+
+    assert gateway.checked == []
+    assert (progress.warmed, progress.skipped) == (0, 5)
+
+
+async def test_run_is_resumed_from_checkpoint(redis: FakeAsyncRedis, corpus: Path, tmp_path: Path) -> None:
+    checkpoint: Path = tmp_path / "warm.json"
+    checkpoint.write_text(json.dumps({"source": str(corpus), "prefix": "nsfw_image:1:0", "processed": 2, "warmed": 2}))
+    gateway: CountingGateway = CountingGateway()
+
+    progress: CacheWarmingProgress = await build_warmer(redis, gateway).run(corpus, checkpoint=checkpoint)
+
+    assert gateway.checked == ["image 2", "image 3", "image 4"]
+    assert (progress.processed, progress.warmed) == (5, 5)
+    assert json.loads(checkpoint.read_text())["prefix"] == "nsfw_image:1:0"
+
+
+@pytest.mark.parametrize("prefix", ["nsfw_image:2:0", None])
+async def test_checkpoint_of_another_namespace_is_not_resumed(
+        redis: FakeAsyncRedis,
+        corpus: Path,
+        tmp_path: Path,
+        prefix: str | None,
+) -> None:
+    checkpoint: Path = tmp_path / "warm.json"
+    checkpoint.write_text(json.dumps({"source": str(corpus), "prefix": prefix, "processed": 2}))
+    gateway: CountingGateway = CountingGateway()
+
+    with pytest.raises(ValueError, match="namespace"):
+        await build_warmer(redis, gateway).run(corpus, checkpoint=checkpoint)
+
+    assert gateway.checked == []
@@ -0,0 +1,63 @@
+import socket
+
+import pytest
+from aiohttp import ClientSession, TCPConnector
+from aiohttp.abc import AbstractResolver, ResolveResult
+
+from nsfw_detector.infrastructure.clients.http.resolver import GlobalAddressResolver, is_global_address, parse_address
+from nsfw_detector.infrastructure.errors.http import NotAllowedHostError
+
+
+class StaticResolver(AbstractResolver):
+    def __init__(self, *addresses: str) -> None:
+        self._addresses: tuple[str, ...] = addresses
+
+    async def resolve(self, host: str, port: int = 0, family: socket.AddressFamily = socket.AF_INET) -> list[ResolveResult]:
+        return [
+            ResolveResult(hostname=host, host=address, port=port, family=family, proto=0, flags=0)
+            for address in self._addresses
+        ]
+
+    async def close(self) -> None:
+        ...
+
+
+@pytest.mark.parametrize(
+    "host",
+    ["127.0.0.1", "127.1", "2130706433", "0x7f000001", "0177.0.0.1", "10.1", "[::1]", "::ffff:127.0.0.1", "169.254.169.254"],
+)
+def test_literal_and_short_private_addresses_are_not_global(host: str) -> None:
+    address = parse_address(host)
+
+    assert address is not None
+    assert not is_global_address(address)
+
+
+def test_names_are_not_parsed_as_addresses() -> None:
+    assert parse_address("images.example.com") is None
+    assert is_global_address(parse_address("0x08080808"))
+
+
+async def test_name_resolved_to_global_addresses_is_allowed() -> None:
+    resolver: GlobalAddressResolver = GlobalAddressResolver(StaticResolver("93.184.216.34", "2606:2800:220:1::"))
+
+    assert [address["host"] for address in await resolver.resolve("images.example.com", 443)] == [
+        "93.184.216.34",
+        "2606:2800:220:1::",
+    ]
+
+
+@pytest.mark.parametrize("addresses", [("127.0.0.1",), ("93.184.216.34", "10.0.0.5"), ("fe80::1%eth0",)])
+async def test_name_resolved_to_any_private_address_is_rejected(addresses: tuple[str, ...]) -> None:
+    resolver: GlobalAddressResolver = GlobalAddressResolver(StaticResolver(*addresses))
+
+    with pytest.raises(NotAllowedHostError):
+        await resolver.resolve("images.example.com", 443)
+
+
+async def test_connection_to_name_of_private_address_is_never_opened() -> None:
+    connector: TCPConnector = TCPConnector(resolver=GlobalAddressResolver(StaticResolver("127.0.0.1")))
+
+    async with ClientSession(connector=connector) as session:
+        with pytest.raises(NotAllowedHostError):
+            await session.get("http://rebound.example.com/image.png")
@@ -0,0 +1,86 @@
+import asyncio
+
+import pytest
+
+from nsfw_detector.infrastructure.concurrency.single_flight import SingleFlight
+
+
+class Backend:
+    """Answers once released, counting the calls"""
+
+    def __init__(self, error: Exception | None = None) -> None:
+        self.calls: int = 0
+        self.released: asyncio.Event = asyncio.Event()
+        self._error: Exception | None = error
+
+    async def check(self) -> str:
+        self.calls += 1
+        await self.released.wait()
+        if self._error is not None:
+            raise self._error
+        return f"verdict {self.calls}"
+
+
+async def test_concurrent_callers_share_one_call() -> None:
+    single_flight: SingleFlight[str, str] = SingleFlight()
+    backend: Backend = Backend()
+
+    waiters: list[asyncio.Task[str]] = [
+        asyncio.create_task(single_flight.do("hash", backend.check)) for _ in range(5)
+    ]
+    await asyncio.sleep(0)
+    assert single_flight.in_flight == 1
+
+    backend.released.set()
+
+    assert await asyncio.gather(*waiters) == ["verdict 1"] * 5
+    assert backend.calls == 1
+    assert single_flight.in_flight == 0
+
+
+async def test_calls_with_different_keys_are_not_shared() -> None:
+    single_flight: SingleFlight[str, str] = SingleFlight()
+    backend: Backend = Backend()
+    backend.released.set()
+
+    await asyncio.gather(single_flight.do("first", backend.check), single_flight.do("second", backend.check))
+
+    assert backend.calls == 2
+
+
+async def test_cancelled_waiter_doesnt_cancel_shared_call() -> None:
+    single_flight: SingleFlight[str, str] = SingleFlight()
+    backend: Backend = Backend()
+
+    first: asyncio.Task[str] = asyncio.create_task(single_flight.do("hash", backend.check))
+    second: asyncio.Task[str] = asyncio.create_task(single_flight.do("hash", backend.check))
+    await asyncio.sleep(0)
+
+    first.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await first
+
+    backend.released.set()
+
+    assert await second == "verdict 1"
+    assert backend.calls == 1
+
+
+async def test_exception_reaches_every_waiter_and_is_not_cached() -> None:
+    single_flight: SingleFlight[str, str] = SingleFlight()
+    failing: Backend = Backend(error=ConnectionError("backend is down"))
+
+    waiters: list[asyncio.Task[str]] = [
+        asyncio.create_task(single_flight.do("hash", failing.check)) for _ in range(3)
+    ]
+    await asyncio.sleep(0)
+    failing.released.set()
+
+    results: list[BaseException | str] = await asyncio.gather(*waiters, return_exceptions=True)
+    assert all(isinstance(result, ConnectionError) for result in results)
+    assert failing.calls == 1
+
+    backend: Backend = Backend()
+    backend.released.set()
+
+    assert await single_flight.do("hash", backend.check) == "verdict 1"
@@ -0,0 +1,157 @@
+import asyncio
+import io
+
+import pytest
+from PIL import Image
+
+from nsfw_detector.infrastructure.errors.inference import AnimationTooLargeError
+from nsfw_detector.infrastructure.inference.animation import (
+    AnimatedImageSampler,
+    AnimationTimeline,
+    scan_animation,
+    select_keyframes,
+)
+from nsfw_detector.infrastructure.inference.base import ScoreVector
+from nsfw_detector.setup.configs import AnimationConfig, InferenceConfig
+
+BLACK: tuple[int, int, int] = (0, 0, 0)
+WHITE: tuple[int, int, int] = (255, 255, 255)
+RED: tuple[int, int, int] = (255, 0, 0)
+
+SAFE: ScoreVector = ScoreVector(neutral=0.99, low=0.01, medium=0.0, high=0.0)
+UNCERTAIN: ScoreVector = ScoreVector(neutral=0.6, low=0.3, medium=0.1, high=0.0)
+NSFW: ScoreVector = ScoreVector(neutral=0.05, low=0.1, medium=0.25, high=0.6)
+
+
+def animation(*colors: tuple[int, int, int], size: int = 32) -> bytes:
+    frames: list[Image.Image] = []
+    for index, color in enumerate(colors):
+        frame: Image.Image = Image.new("RGB", (size, size), color)
+        # Identical frames are merged by the encoder, so each frame gets its own pixel
+        frame.putpixel((index % size, index // size), (128, 128, 128))
+        frames.append(frame)
+
+    buffer: io.BytesIO = io.BytesIO()
+    frames[0].save(buffer, format="GIF", save_all=True, append_images=frames[1:], duration=40)
+    return buffer.getvalue()
+
+
+def scan(data: bytes, sample_size: int = 32, max_frames: int = 1000, max_pixels: int = 10**9) -> AnimationTimeline:
+    timeline: AnimationTimeline | None = scan_animation(
+        data,
+        scene_cut_threshold=0.15,
+        sample_size=sample_size,
+        frame_size=16,
+        max_frames=max_frames,
+        max_pixels=max_pixels,
+    )
+    assert timeline is not None
+    return timeline
+
+
+def color_of(frame: bytes) -> tuple[int, int, int]:
+    return Image.open(io.BytesIO(frame)).convert("RGB").getpixel((15, 15))
+
+
+class ColorBatcher:
+    """Scores frames by their color, frames of ``slow_color`` are answered only when released"""
+
+    def __init__(self, scores: dict[tuple[int, int, int], ScoreVector], slow_color: tuple[int, int, int] | None = None):
+        self.predicted: list[tuple[int, int, int]] = []
+        self.cancelled: int = 0
+        self.released: asyncio.Event = asyncio.Event()
+        self._scores: dict[tuple[int, int, int], ScoreVector] = scores
+        self._slow_color: tuple[int, int, int] | None = slow_color
+
+    async def predict(self, data: bytes) -> ScoreVector:
+        color: tuple[int, int, int] = color_of(data)
+        self.predicted.append(color)
+        if color == self._slow_color:
+            try:
+                await self.released.wait()
+            except asyncio.CancelledError:
+                self.cancelled += 1
+                raise
+        return self._scores[color]
+
+
+def sampler(batcher: ColorBatcher, **values: int) -> AnimatedImageSampler:
+    return AnimatedImageSampler(
+        batcher,
+        AnimationConfig(**values),
+        InferenceConfig(INFERENCE_DECODE_SIZE=16),
+    )
+
+
+def test_still_image_is_not_scanned() -> None:
+    buffer: io.BytesIO = io.BytesIO()
+    Image.new("RGB", (8, 8), WHITE).save(buffer, format="GIF")
+
+    assert scan_animation(buffer.getvalue(), 0.15, 8, 16, 1000, 10**9) is None
+
+
+def test_long_animation_is_sampled_evenly() -> None:
+    timeline: AnimationTimeline = scan(animation(*[BLACK] * 6, *[WHITE] * 6), sample_size=4)
+
+    assert timeline.total_frames == 12
+    assert timeline.indices == (0, 3, 6, 9)
+    assert [color_of(frame) for frame in timeline.frames] == [BLACK, BLACK, WHITE, WHITE]
+    # Cut is found at the first sampled frame of the new scene
+    assert timeline.scene_cuts == (2,)
+
+
+def test_frames_are_shrunk_to_frame_size() -> None:
+    timeline: AnimationTimeline = scan(animation(BLACK, WHITE, size=64))
+
+    assert all(Image.open(io.BytesIO(frame)).size == (16, 16) for frame in timeline.frames)
+
+
+@pytest.mark.parametrize(("max_frames", "max_pixels"), [(5, 10**9), (1000, 6 * 32 * 32 - 1)])
+def test_animation_beyond_budget_is_rejected(max_frames: int, max_pixels: int) -> None:
+    with pytest.raises(AnimationTooLargeError):
+        scan(animation(*[BLACK] * 6), max_frames=max_frames, max_pixels=max_pixels)
+
+
+def test_keyframes_are_scene_cuts_filled_with_evenly_spaced_frames() -> None:
+    timeline: AnimationTimeline = AnimationTimeline(
+        total_frames=100,
+        indices=tuple(range(0, 100, 10)),
+        frames=(b"",) * 10,
+        scene_cuts=(7,),
+    )
+
+    assert select_keyframes(timeline, 4) == [0, 2, 5, 7]
+
+
+async def test_safe_animation_is_checked_by_keyframes_only() -> None:
+    batcher: ColorBatcher = ColorBatcher({BLACK: SAFE, WHITE: SAFE})
+
+    scores: ScoreVector | None = await sampler(batcher, ANIMATION_KEYFRAMES=4).predict(
+        animation(*[BLACK] * 10, *[WHITE] * 10),
+    )
+
+    assert scores == SAFE
+    assert len(batcher.predicted) == 4
+
+
+async def test_uncertain_frames_are_sampled_densely_up_to_max_frames() -> None:
+    batcher: ColorBatcher = ColorBatcher({BLACK: SAFE, WHITE: UNCERTAIN})
+
+    scores: ScoreVector | None = await sampler(batcher, ANIMATION_KEYFRAMES=2, ANIMATION_MAX_FRAMES=6).predict(
+        animation(*[BLACK] * 10, *[WHITE] * 10),
+    )
+
+    assert scores == ScoreVector(neutral=UNCERTAIN.neutral, low=UNCERTAIN.low, medium=UNCERTAIN.medium, high=0.0)
+    assert len(batcher.predicted) == 6
+
+
+async def test_pending_frames_are_cancelled_once_frame_is_nsfw() -> None:
+    batcher: ColorBatcher = ColorBatcher({BLACK: SAFE, RED: NSFW}, slow_color=BLACK)
+
+    scores: ScoreVector | None = await asyncio.wait_for(
+        sampler(batcher, ANIMATION_KEYFRAMES=4).predict(animation(*[BLACK] * 6, *[RED] * 2)),
+        timeout=1,
+    )
+
+    assert scores == NSFW
+    assert batcher.cancelled == batcher.predicted.count(BLACK) > 0
@@ -0,0 +1,147 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Sequence
+
+import pytest
+
+from nsfw_detector.infrastructure.errors.inference import InferenceOverloadedError
+from nsfw_detector.infrastructure.inference.base import ScoreVector
+from nsfw_detector.infrastructure.inference.batcher import InferenceBatcher
+from nsfw_detector.infrastructure.inference.decoding import DecodeStatsSnapshot
+from nsfw_detector.setup.configs import InferenceConfig
+
+SCORES: ScoreVector = ScoreVector(neutral=0.9, low=0.1, medium=0.05, high=0.01)
+
+
+class GatedBackend:
+    """Backend whose batches finish only when the test opens the gate"""
+
+    def __init__(self, latency_seconds: float = 0.0) -> None:
+        self.batches: list[int] = []
+        self.gate: asyncio.Event = asyncio.Event()
+        self.gate.set()
+        self._latency_seconds: float = latency_seconds
+
+    @property
+    def decode_stats(self) -> DecodeStatsSnapshot:
+        return DecodeStatsSnapshot()
+
+    async def start(self) -> None:
+        ...
+
+    async def close(self) -> None:
+        ...
+
+    async def predict_batch(self, batch: Sequence[bytes]) -> list[ScoreVector | Exception]:
+        self.batches.append(len(batch))
+        await asyncio.sleep(self._latency_seconds)
+        await self.gate.wait()
+        return [SCORES] * len(batch)
+
+
+class FailingBackend(GatedBackend):
+    async def predict_batch(self, batch: Sequence[bytes]) -> list[ScoreVector | Exception]:
+        raise RuntimeError("Model crashed")
+
+
+def inference_config(**values: int) -> InferenceConfig:
+    return InferenceConfig(INFERENCE_WORKERS=1, INFERENCE_MAX_BATCH_WAIT_MS=5, **values)
+
+
+@asynccontextmanager
+async def running(backend: GatedBackend, config: InferenceConfig) -> AsyncIterator[InferenceBatcher]:
+    batcher: InferenceBatcher = InferenceBatcher(backend, config)
+    batcher.start()
+    try:
+        yield batcher
+    finally:
+        backend.gate.set()
+        await batcher.close()
+
+
+async def wait_for_batches(backend: GatedBackend, count: int) -> None:
+    while len(backend.batches) < count:
+        await asyncio.sleep(0.001)
+
+
+async def test_concurrent_images_share_batch() -> None:
+    backend: GatedBackend = GatedBackend()
+
+    async with running(backend, inference_config(INFERENCE_MAX_BATCH_SIZE=8)) as batcher:
+        scores: list[ScoreVector] = await asyncio.gather(*(batcher.predict(b"image") for _ in range(8)))
+
+    assert scores == [SCORES] * 8
+    assert backend.batches == [8]
+
+
+async def test_image_is_rejected_when_queue_is_full() -> None:
+    backend: GatedBackend = GatedBackend()
+    backend.gate.clear()
+    config: InferenceConfig = inference_config(INFERENCE_MAX_BATCH_SIZE=1, INFERENCE_MAX_QUEUE_DEPTH=2)
+
+    async with running(backend, config) as batcher:
+        # The only worker is busy, so next images wait in the queue
+        in_progress: list[asyncio.Task[ScoreVector]] = [asyncio.create_task(batcher.predict(b"image"))]
+        await wait_for_batches(backend, 1)
+        in_progress += [asyncio.create_task(batcher.predict(b"image")) for _ in range(2)]
+        await asyncio.sleep(0)
+        assert batcher.queue_depth == 2
+
+        with pytest.raises(InferenceOverloadedError) as rejection:
+            await batcher.predict(b"image")
+        assert rejection.value.retry_after_seconds >= 1
+
+        backend.gate.set()
+        assert await asyncio.gather(*in_progress) == [SCORES] * 3
+
+
+async def test_image_is_rejected_when_queue_drains_too_slowly() -> None:
+    backend: GatedBackend = GatedBackend(latency_seconds=0.05)
+    config: InferenceConfig = inference_config(INFERENCE_MAX_BATCH_SIZE=1, INFERENCE_MAX_QUEUE_WAIT_MS=20)
+
+    async with running(backend, config) as batcher:
+        # First batch teaches the batcher how long batches take
+        await batcher.predict(b"image")
+
+        in_progress: asyncio.Task[ScoreVector] = asyncio.create_task(batcher.predict(b"image"))
+        await wait_for_batches(backend, 2)
+        waiting: asyncio.Task[ScoreVector] = asyncio.create_task(batcher.predict(b"image"))
+        await asyncio.sleep(0)
+
+        with pytest.raises(InferenceOverloadedError):
+            await batcher.predict(b"image")
+
+        assert await in_progress == SCORES
+        # Image admitted while the queue was empty still waited longer than allowed
+        with pytest.raises(InferenceOverloadedError):
+            await waiting
+
+
+async def test_image_which_waited_too_long_is_not_checked() -> None:
+    backend: GatedBackend = GatedBackend()
+    backend.gate.clear()
+    config: InferenceConfig = inference_config(INFERENCE_MAX_BATCH_SIZE=1, INFERENCE_MAX_QUEUE_WAIT_MS=20)
+
+    async with running(backend, config) as batcher:
+        in_progress: asyncio.Task[ScoreVector] = asyncio.create_task(batcher.predict(b"image"))
+        await wait_for_batches(backend, 1)
+        # Duration of batches is not known yet, so the image is admitted
+        waiting: asyncio.Task[ScoreVector] = asyncio.create_task(batcher.predict(b"image"))
+        await asyncio.sleep(0.05)
+        backend.gate.set()
+
+        assert await in_progress == SCORES
+        with pytest.raises(InferenceOverloadedError):
+            await waiting
+
+    assert backend.batches == [1]
+
+
+async def test_failed_batch_fails_each_image() -> None:
+    async with running(FailingBackend(), inference_config(INFERENCE_MAX_BATCH_SIZE=4)) as batcher:
+        results: list[ScoreVector | BaseException] = await asyncio.gather(
+            *(batcher.predict(b"image") for _ in range(4)),
+            return_exceptions=True,
+        )
+
+    assert all(isinstance(result, RuntimeError) for result in results)
@@ -0,0 +1,181 @@
+import asyncio
+import hashlib
+
+import pytest
+from fakeredis import FakeAsyncRedis
+
+from nsfw_detector.application.common.errors.images import FailedToProcessImage
+from nsfw_detector.application.common.errors.jobs import ModerationJobQueueIsFull
+from nsfw_detector.application.queries.images.check_image_is_nsfw import CheckImageIsNSFWQuery
+from nsfw_detector.application.queries.images.policies import ModerationPolicies
+from nsfw_detector.application.queries.images.view_models import ModerationJobInformation
+from nsfw_detector.infrastructure.adapters.jobs.redis_stream_job_gateway import (
+    RedisStreamModerationJobGateway,
+    job_key,
+)
+from nsfw_detector.infrastructure.jobs.worker import ImageCheck, ModerationJobWorker
+from nsfw_detector.setup.configs import JobsConfig
+
+IMAGE: bytes = b"image"
+
+
+@pytest.fixture
+def jobs_config() -> JobsConfig:
+    return JobsConfig(JOBS_READ_BLOCK_MS=10, JOBS_CLAIM_IDLE_MS=50, JOBS_MAX_ATTEMPTS=2)
+
+
+@pytest.fixture
+def gateway(redis: FakeAsyncRedis, jobs_config: JobsConfig) -> RedisStreamModerationJobGateway:
+    return RedisStreamModerationJobGateway(redis=redis, jobs_config=jobs_config)
+
+
+async def submit(gateway: RedisStreamModerationJobGateway) -> str:
+    return await gateway.submit(IMAGE, hashlib.sha256(IMAGE).hexdigest(), "image.png")
+
+
+async def run_until_drained(redis: FakeAsyncRedis, jobs_config: JobsConfig, check: ImageCheck) -> None:
+    worker: ModerationJobWorker = ModerationJobWorker(
+        redis=redis,
+        jobs_config=jobs_config,
+        check=check,
+        policies=ModerationPolicies(policies={}),
+        consumer="test",
+    )
+    running: asyncio.Task[None] = asyncio.create_task(worker.run())
+
+    # Finished entries are deleted, so the worker is stopped once the stream is empty
+    for _ in range(500):
+        await asyncio.sleep(0.01)
+        if not await redis.xlen(jobs_config.stream):
+            break
+
+    worker.stop()
+    await asyncio.wait_for(running, timeout=5)
+
+
+async def test_result_is_stored_and_entry_is_deleted(
+        redis: FakeAsyncRedis,
+        jobs_config: JobsConfig,
+        gateway: RedisStreamModerationJobGateway,
+) -> None:
+    job_id: str = await submit(gateway)
+
+    async def check(query: CheckImageIsNSFWQuery) -> bool:
+        assert query.content_of_image == IMAGE
+        return True
+
+    await run_until_drained(redis, jobs_config, check)
+
+    assert await gateway.get(job_id) == ModerationJobInformation(job_id=job_id, status="done", is_allowed=True)
+    assert 0 < await redis.ttl(job_key(job_id)) <= jobs_config.result_ttl
+    assert await redis.xlen(jobs_config.stream) == 0
+
+
+async def test_rejected_image_fails_job_at_once(
+        redis: FakeAsyncRedis,
+        jobs_config: JobsConfig,
+        gateway: RedisStreamModerationJobGateway,
+) -> None:
+    job_id: str = await submit(gateway)
+    attempts: list[CheckImageIsNSFWQuery] = []
+
+    async def check(query: CheckImageIsNSFWQuery) -> bool:
+        attempts.append(query)
+        raise FailedToProcessImage("Image can't be decoded")
+
+    await run_until_drained(redis, jobs_config, check)
+
+    information: ModerationJobInformation | None = await gateway.get(job_id)
+    assert information is not None
+    assert (information.status, information.error) == ("failed", "Image can't be decoded")
+    assert len(attempts) == 1
+
+
+async def test_failing_check_is_retried_until_max_attempts(
+        redis: FakeAsyncRedis,
+        jobs_config: JobsConfig,
+        gateway: RedisStreamModerationJobGateway,
+) -> None:
+    job_id: str = await submit(gateway)
+    attempts: list[CheckImageIsNSFWQuery] = []
+
+    async def check(query: CheckImageIsNSFWQuery) -> bool:
+        attempts.append(query)
+        raise RuntimeError("Model is not available")
+
+    await run_until_drained(redis, jobs_config, check)
+
+    information: ModerationJobInformation | None = await gateway.get(job_id)
+    assert information is not None
+    assert (information.status, information.error) == ("failed", "Image can't be checked")
+    assert len(attempts) == jobs_config.max_attempts
+
+
+async def test_expired_job_is_dropped_without_recreating_it(
+        redis: FakeAsyncRedis,
+        jobs_config: JobsConfig,
+        gateway: RedisStreamModerationJobGateway,
+) -> None:
+    job_id: str = await submit(gateway)
+    await redis.delete(job_key(job_id))
+    attempts: list[CheckImageIsNSFWQuery] = []
+
+    async def check(query: CheckImageIsNSFWQuery) -> bool:
+        attempts.append(query)
+        return True
+
+    await run_until_drained(redis, jobs_config, check)
+
+    assert not await redis.exists(job_key(job_id))
+    assert not attempts
+    assert await redis.xlen(jobs_config.stream) == 0
+
+
+async def test_check_longer_than_claim_idle_time_is_not_taken_over(
+        redis: FakeAsyncRedis,
+        jobs_config: JobsConfig,
+        gateway: RedisStreamModerationJobGateway,
+) -> None:
+    job_id: str = await submit(gateway)
+    attempts: list[str] = []
+
+    def worker(consumer: str) -> ModerationJobWorker:
+        async def check(query: CheckImageIsNSFWQuery) -> bool:
+            attempts.append(consumer)
+            await asyncio.sleep(jobs_config.claim_idle_ms / 1000 * 4)
+            return True
+
+        return ModerationJobWorker(
+            redis=redis,
+            jobs_config=jobs_config,
+            check=check,
+            policies=ModerationPolicies(policies={}),
+            consumer=consumer,
+        )
+
+    workers: list[ModerationJobWorker] = [worker("first"), worker("second")]
+    running: list[asyncio.Task[None]] = [asyncio.create_task(each.run()) for each in workers]
+    while await redis.xlen(jobs_config.stream):
+        await asyncio.sleep(0.01)
+
+    for each in workers:
+        each.stop()
+    await asyncio.wait_for(asyncio.gather(*running), timeout=5)
+
+    assert len(attempts) == 1
+    assert await gateway.get(job_id) == ModerationJobInformation(job_id=job_id, status="done", is_allowed=True)
+
+
+async def test_job_is_rejected_when_backlog_is_full(redis: FakeAsyncRedis) -> None:
+    gateway: RedisStreamModerationJobGateway = RedisStreamModerationJobGateway(
+        redis=redis,
+        jobs_config=JobsConfig(JOBS_STREAM_MAX_LENGTH=3),
+    )
+    job_ids: list[str] = [await submit(gateway) for _ in range(3)]
+
+    with pytest.raises(ModerationJobQueueIsFull):
+        await submit(gateway)
+
+    # Accepted jobs are never trimmed
+    assert await redis.xlen("nsfw_image_jobs") == 3
+    assert None not in [await gateway.get(job_id) for job_id in job_ids]
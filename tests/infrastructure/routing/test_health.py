@@ -0,0 +1,144 @@
+import types
+
+import pytest
+
+from nsfw_detector.infrastructure.routing import health
+from nsfw_detector.infrastructure.routing.health import BackendHealth, CircuitState
+from nsfw_detector.setup.configs import RoutingConfig
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now: float = 100.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> Clock:
+    clock: Clock = Clock()
+    monkeypatch.setattr(health, "time", types.SimpleNamespace(monotonic=clock.monotonic))
+    return clock
+
+
+def backend(failure_threshold: int = 3, error_rate_threshold: float = 0.99) -> BackendHealth:
+    return BackendHealth(
+        name="local",
+        initial_latency_seconds=0.1,
+        capacity=4,
+        config=RoutingConfig(
+            ROUTING_FAILURE_THRESHOLD=failure_threshold,
+            ROUTING_ERROR_RATE_THRESHOLD=error_rate_threshold,
+            ROUTING_OPEN_SECONDS=10,
+        ),
+    )
+
+
+def fail(backend_health: BackendHealth, times: int = 1) -> None:
+    for _ in range(times):
+        backend_health.on_start()
+        backend_health.on_failure()
+
+
+def opened() -> BackendHealth:
+    backend_health: BackendHealth = backend()
+    fail(backend_health, times=3)
+    return backend_health
+
+
+def state(backend_health: BackendHealth) -> CircuitState:
+    return backend_health.snapshot().circuit_state
+
+
+def test_circuit_opens_after_consecutive_failures(clock: Clock) -> None:
+    backend_health: BackendHealth = backend()
+
+    fail(backend_health, times=2)
+    assert backend_health.is_available()
+
+    fail(backend_health)
+    assert not backend_health.is_available()
+    assert state(backend_health) is CircuitState.OPEN
+
+
+def test_circuit_opens_when_error_rate_exceeds_threshold(clock: Clock) -> None:
+    backend_health: BackendHealth = backend(failure_threshold=100, error_rate_threshold=0.3)
+
+    fail(backend_health)
+    backend_health.on_start()
+    backend_health.on_success(0.1)
+    fail(backend_health)
+
+    assert state(backend_health) is CircuitState.OPEN
+
+
+def test_circuit_is_half_open_after_open_seconds(clock: Clock) -> None:
+    backend_health: BackendHealth = opened()
+
+    clock.now += 9.9
+    assert not backend_health.is_available()
+
+    clock.now += 0.1
+    assert backend_health.is_available()
+    assert state(backend_health) is CircuitState.HALF_OPEN
+
+
+def test_only_one_probe_is_let_through(clock: Clock) -> None:
+    backend_health: BackendHealth = opened()
+    clock.now += 10
+
+    assert backend_health.is_available()
+    backend_health.on_start()
+
+    assert not backend_health.is_available()
+    assert backend_health.in_flight == 1
+
+
+def test_successful_probe_closes_circuit(clock: Clock) -> None:
+    backend_health: BackendHealth = opened()
+    clock.now += 10
+    backend_health.is_available()
+
+    backend_health.on_start()
+    backend_health.on_success(0.1)
+
+    assert state(backend_health) is CircuitState.CLOSED
+    assert backend_health.snapshot().error_rate == 0
+    assert backend_health.is_available()
+
+
+def test_failed_probe_opens_circuit_again(clock: Clock) -> None:
+    backend_health: BackendHealth = opened()
+    clock.now += 10
+    backend_health.is_available()
+
+    fail(backend_health)
+
+    assert state(backend_health) is CircuitState.OPEN
+    clock.now += 9.9
+    assert not backend_health.is_available()
+    clock.now += 0.1
+    assert backend_health.is_available()
+
+
+def test_cancelled_probe_lets_next_probe_through(clock: Clock) -> None:
+    backend_health: BackendHealth = opened()
+    clock.now += 10
+    backend_health.is_available()
+
+    backend_health.on_start()
+    backend_health.on_cancel()
+
+    assert state(backend_health) is CircuitState.HALF_OPEN
+    assert backend_health.is_available()
+    assert backend_health.in_flight == 0
+
+
+def test_expected_latency_grows_with_requests_in_flight(clock: Clock) -> None:
+    backend_health: BackendHealth = backend()
+
+    for _ in range(2):
+        backend_health.on_start()
+
+    assert backend_health.expected_latency == pytest.approx(0.1 * 1.5)
@@ -0,0 +1,31 @@
+import pydantic
+import pytest
+
+from nsfw_detector.setup.configs import ModerationConfig, ModerationPolicyConfig
+
+
+def test_policies_are_parsed_from_json() -> None:
+    config: ModerationConfig = ModerationConfig(
+        MODERATION_POLICIES='{"default": {"min_neutral": 0.6}, "kids": {"min_neutral": 0.9, "max_low": 0.2}}',
+    )
+
+    assert config.policies == {
+        "default": ModerationPolicyConfig(min_neutral=0.6),
+        "kids": ModerationPolicyConfig(min_neutral=0.9, max_low=0.2),
+    }
+
+
+@pytest.mark.parametrize(
+    "policies",
+    [
+        '{"default": {"min_neutrl": 0.7}}',
+        '{"default": {"min_neutral": 1.5}}',
+        '{"default": {"max_high": -0.1}}',
+        '{"default": {"min_neutral": "high"}}',
+        '{"default": 0.7}',
+        '{"default": {"min_neutral": 0.7}',
+    ],
+)
+def test_invalid_policies_fail_on_load(policies: str) -> None:
+    with pytest.raises(pydantic.ValidationError):
+        ModerationConfig(MODERATION_POLICIES=policies)